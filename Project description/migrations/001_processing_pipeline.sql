@@ -0,0 +1,31 @@
+-- Обновление существующей БД до схемы конвейера обработки и загрузки видео.
+--
+-- Новые таблицы (source_blobs, source_probes, processing_jobs, youtube_quotas)
+-- создаёт Base.metadata.create_all при запуске, но существующие таблицы он не
+-- меняет. Скрипт добавляет новые колонки в уже созданные таблицы; он
+-- идемпотентен и применяется через backend/scripts/migrate_db.py
+-- (скрипт сначала выполняет create_all, чтобы внешние ключи ссылались на
+-- существующие таблицы).
+
+-- users: профиль кодирования по умолчанию
+ALTER TABLE users ADD COLUMN IF NOT EXISTS default_encoder_profile TEXT;
+
+-- source_assets: content-addressed хранение исходников
+ALTER TABLE source_assets ADD COLUMN IF NOT EXISTS size_bytes BIGINT;
+ALTER TABLE source_assets ADD COLUMN IF NOT EXISTS content_hash TEXT REFERENCES source_blobs (content_hash);
+CREATE INDEX IF NOT EXISTS ix_source_assets_content_hash ON source_assets (content_hash);
+
+-- video_versions: превью, снятые при рендере
+ALTER TABLE video_versions ADD COLUMN IF NOT EXISTS thumbnail_path TEXT;
+ALTER TABLE video_versions ADD COLUMN IF NOT EXISTS contact_sheet_path TEXT;
+
+-- youtube_uploads: resumable upload, квота по каналам, автоматические повторы
+ALTER TABLE youtube_uploads ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE youtube_uploads ADD COLUMN IF NOT EXISTS attempt_history JSONB;
+ALTER TABLE youtube_uploads ADD COLUMN IF NOT EXISTS integration_id UUID REFERENCES integrations (id) ON DELETE SET NULL;
+ALTER TABLE youtube_uploads ADD COLUMN IF NOT EXISTS upload_session_uri TEXT;
+ALTER TABLE youtube_uploads ADD COLUMN IF NOT EXISTS upload_offset BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE youtube_uploads ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ;
+
+-- processing_jobs: отложенные задачи (таблица могла быть создана до появления колонки)
+ALTER TABLE processing_jobs ADD COLUMN IF NOT EXISTS available_at TIMESTAMPTZ;
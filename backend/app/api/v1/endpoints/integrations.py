@@ -68,6 +68,18 @@ async def get_current_user_id(db: AsyncSession = Depends(get_db)) -> uuid.UUID:
 	return user.id
 
 
+def _integration_to_response(integration: Integration) -> IntegrationResponse:
+	"""Ответ API по записи интеграции"""
+	return IntegrationResponse(
+		id=integration.id,
+		kind=integration.kind,
+		is_valid=integration.is_valid,
+		created_at=integration.created_at,
+		account_name=IntegrationService.get_account_name(integration),
+		account_details=IntegrationService.get_account_info(integration) or None,
+	)
+
+
 @router.get("/", response_model=IntegrationListResponse)
 async def list_integrations(
 	db: AsyncSession = Depends(get_db),
@@ -76,17 +88,7 @@ async def list_integrations(
 	"""Получить список всех интеграций пользователя"""
 	integrations = await IntegrationService.get_all_integrations(db, current_user_id)
 	return IntegrationListResponse(
-		integrations=[
-			IntegrationResponse(
-				id=integration.id,
-				kind=integration.kind,
-				is_valid=integration.is_valid,
-				created_at=integration.created_at,
-				account_name=IntegrationService.get_account_name(integration),
-				account_details=IntegrationService.get_account_info(integration) or None,
-			)
-			for integration in integrations
-		]
+		integrations=[_integration_to_response(integration) for integration in integrations]
 	)
 
 
@@ -96,19 +98,27 @@ async def get_integration(
 	db: AsyncSession = Depends(get_db),
 	current_user_id: uuid.UUID = Depends(get_current_user_id),
 ):
-	"""Получить конкретную интеграцию"""
+	"""Получить интеграцию вида (при нескольких — первую действующую)"""
 	integration = await IntegrationService.get_integration(db, current_user_id, kind)
 	if not integration:
 		raise HTTPException(status_code=404, detail="Интеграция не найдена")
 
-	return IntegrationResponse(
-		id=integration.id,
-		kind=integration.kind,
-		is_valid=integration.is_valid,
-		created_at=integration.created_at,
-		account_name=IntegrationService.get_account_name(integration),
-		account_details=IntegrationService.get_account_info(integration) or None,
-	)
+	return _integration_to_response(integration)
+
+
+@router.get("/{kind}/{integration_id}", response_model=IntegrationResponse)
+async def get_integration_by_id(
+	kind: str,
+	integration_id: uuid.UUID,
+	db: AsyncSession = Depends(get_db),
+	current_user_id: uuid.UUID = Depends(get_current_user_id),
+):
+	"""Получить конкретную интеграцию (например, один из каналов YouTube)"""
+	integration = await IntegrationService.get_integration_by_id(db, current_user_id, kind, integration_id)
+	if not integration:
+		raise HTTPException(status_code=404, detail="Интеграция не найдена")
+
+	return _integration_to_response(integration)
 
 
 @router.get("/{kind}/oauth/authorize", response_model=OAuthAuthorizeResponse)
@@ -211,7 +221,8 @@ async def oauth_authorize(
 	authorization_url, _ = flow.authorization_url(
 		access_type="offline",
 		include_granted_scopes="true",
-		prompt="consent",
+		# Для YouTube — выбор аккаунта: так подключается второй канал
+		prompt="consent select_account" if kind == "youtube" else "consent",
 		state=state,
 	)
 
@@ -308,6 +319,9 @@ async def oauth_callback(
 			"client_secret": saved_client_secret,
 			"scopes": token_scopes,
 		}
+		if credentials.expiry:
+			# Срок access token, чтобы не обновлять только что полученный токен
+			auth_data["expiry"] = credentials.expiry.isoformat() + "Z"
 		
 		# Логируем для отладки
 		print(f"✅ Сохранение credentials для {kind}:")
@@ -319,7 +333,7 @@ async def oauth_callback(
 		account_info = None
 		try:
 			if kind == "youtube":
-				account_info = YouTubeService.get_account_info(auth_data)
+				account_info = await YouTubeService.get_account_info(auth_data)
 			elif kind == "gdrive":
 				account_info = await GoogleDriveService.get_account_info(auth_data)
 			elif kind == "gads":
@@ -346,9 +360,22 @@ async def oauth_callback(
 		except Exception as info_error:
 			print(f"⚠️ Не удалось получить информацию об аккаунте для {kind}: {info_error}")
 
-		await IntegrationService.create_or_update_integration(
-			db, user_id, kind, auth_data, is_valid=True, account_info=account_info
-		)
+		if kind == "youtube" and account_info and account_info.get("id"):
+			# Каждый канал YouTube — отдельная интеграция: загрузки распределяются
+			# между каналами по остатку квоты
+			integration = await IntegrationService.get_account_integration(
+				db, user_id, kind, account_info["id"]
+			)
+			if oauth_config:
+				auth_data["oauth_config"] = oauth_config
+			await IntegrationService.create_or_update_integration(
+				db, user_id, kind, auth_data, is_valid=True, account_info=account_info,
+				integration=integration, create=integration is None,
+			)
+		else:
+			await IntegrationService.create_or_update_integration(
+				db, user_id, kind, auth_data, is_valid=True, account_info=account_info
+			)
 
 		# Перенаправляем на страницу интеграций
 		return RedirectResponse(url=f"{settings.FRONTEND_URL}/integrations?connected={kind}")
@@ -393,7 +420,7 @@ async def disconnect_integration(
 	db: AsyncSession = Depends(get_db),
 	current_user_id: uuid.UUID = Depends(get_current_user_id),
 ):
-	"""Отключить интеграцию"""
+	"""Отключить интеграцию вида (при нескольких — первую действующую)"""
 	success = await IntegrationService.delete_integration(db, current_user_id, kind)
 	if not success:
 		raise HTTPException(status_code=404, detail="Интеграция не найдена")
@@ -401,19 +428,48 @@ async def disconnect_integration(
 	return IntegrationDisconnectResponse(kind=kind, status="disconnected")
 
 
+@router.delete("/{kind}/{integration_id}", response_model=IntegrationDisconnectResponse)
+async def disconnect_integration_by_id(
+	kind: str,
+	integration_id: uuid.UUID,
+	db: AsyncSession = Depends(get_db),
+	current_user_id: uuid.UUID = Depends(get_current_user_id),
+):
+	"""Отключить конкретную интеграцию (например, один из каналов YouTube)"""
+	success = await IntegrationService.delete_integration(db, current_user_id, kind, integration_id)
+	if not success:
+		raise HTTPException(status_code=404, detail="Интеграция не найдена")
+
+	return IntegrationDisconnectResponse(kind=kind, status="disconnected")
+
+
 @router.post("/{kind}/test", response_model=IntegrationTestResponse)
 async def test_integration(
 	kind: str,
 	db: AsyncSession = Depends(get_db),
 	current_user_id: uuid.UUID = Depends(get_current_user_id),
 ):
-	"""Проверить соединение с интеграцией"""
+	"""Проверить соединение с интеграцией вида (при нескольких — первой действующей)"""
 	result = await IntegrationService.test_connection(db, current_user_id, kind)
 	return IntegrationTestResponse(
 		kind=kind, status=result["status"], message=result.get("message")
 	)
 
 
+@router.post("/{kind}/{integration_id}/test", response_model=IntegrationTestResponse)
+async def test_integration_by_id(
+	kind: str,
+	integration_id: uuid.UUID,
+	db: AsyncSession = Depends(get_db),
+	current_user_id: uuid.UUID = Depends(get_current_user_id),
+):
+	"""Проверить соединение с конкретной интеграцией (например, одним из каналов YouTube)"""
+	result = await IntegrationService.test_connection(db, current_user_id, kind, integration_id)
+	return IntegrationTestResponse(
+		kind=kind, status=result["status"], message=result.get("message")
+	)
+
+
 @router.get("/{kind}/oauth/config", response_model=OAuthConfigResponse)
 async def get_oauth_config(
 	kind: str,
@@ -1,23 +1,39 @@
-import os
-import tempfile
+import random
 import uuid
+from pathlib import Path
 from typing import List, Optional
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks, Query
+from fastapi import APIRouter, Request, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.api.v1.schemas.upload import (
-	UploadResponse,
+	UploadSourceResult,
+	PublishJobResult,
+	UploadJobResponse,
+	UploadJobsResponse,
+	JobQueueStatsResponse,
+	EncoderProfilesResponse,
+	YouTubeQuotaResponse,
 	UploadRequest,
 	UploadListResponse,
 	UploadItemResponse,
 )
-from app.models import SourceAsset, VideoVersion, YouTubeUpload
+from app.models import User, SourceAsset, VideoVersion, YouTubeUpload, ProcessingJob
 from app.services.upload_service import UploadService
+from app.services.storage_service import StorageService
+from app.services.multipart_upload import MultipartUploadReader, UploadTooLargeError
+from app.services.job_service import JobService
+from app.services.integration_service import IntegrationService
+from app.services.encoder_profiles import EncoderProfileService
+from app.services.quota_service import QuotaService
 
 router = APIRouter()
 
+UNIQUIFY_MODES = ("full", "fast")
+ORIENTATIONS = ("square", "portrait", "landscape")
+
 
 async def get_current_user_id() -> uuid.UUID:
 	"""Временная функция для получения user_id. В будущем заменить на реальную аутентификацию"""
@@ -25,61 +41,281 @@ async def get_current_user_id() -> uuid.UUID:
 	return uuid.UUID("00000000-0000-0000-0000-000000000001")
 
 
-@router.post("/", response_model=UploadResponse)
+@router.post(
+	"/",
+	response_model=UploadJobsResponse,
+	status_code=202,
+	openapi_extra={
+		"requestBody": {
+			"required": True,
+			"content": {
+				"multipart/form-data": {
+					"schema": {
+						"type": "object",
+						"required": ["files"],
+						"properties": {
+							"files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+						},
+					},
+				},
+			},
+		},
+	},
+)
 async def upload_video(
-	background_tasks: BackgroundTasks,
-	files: List[UploadFile] = File(...),
+	request: Request,
 	generate_orientations: bool = Query(False, description="Генерировать недостающие ориентации"),
 	orientations: Optional[List[str]] = Query(None, description="Список ориентаций для генерации"),
+	uniquify_mode: Optional[str] = Query(
+		None,
+		description="Режим уникализации: 'full' — перекодирование, 'fast' — без перекодирования видео",
+	),
+	seed: Optional[int] = Query(
+		None,
+		ge=0,
+		description="Seed параметров уникализации: тот же seed для того же файла даёт те же версии (из кэша рендеров)",
+	),
+	encoder_profile: Optional[str] = Query(
+		None, description="Профиль кодирования (bulk, default, hero); по умолчанию — профиль пользователя"
+	),
 	current_user_id: uuid.UUID = Depends(get_current_user_id),
 	db: AsyncSession = Depends(get_db),
 ):
-	"""Загрузить одно или несколько видео"""
-	if not files:
-		raise HTTPException(status_code=400, detail="Не предоставлены файлы")
+	"""Загрузить одно или несколько видео (поле multipart 'files').
 
-	# Обрабатываем первое видео (для MVP)
-	# В будущем можно обработать все файлы параллельно
-	file = files[0]
+	Файлы сохраняются в хранилище, а обработка и загрузка на YouTube ставятся
+	в очередь — ответ возвращается сразу с идентификаторами задач.
+	"""
+	if uniquify_mode and uniquify_mode not in UNIQUIFY_MODES:
+		raise HTTPException(status_code=400, detail=f"Неизвестный режим уникализации: {uniquify_mode}")
+	_validate_encoder_profile(encoder_profile)
 
-	# Сохраняем файл во временную директорию
-	with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_file:
-		content = await file.read()
-		tmp_file.write(content)
-		tmp_path = tmp_file.name
+	integration = await IntegrationService.get_integration(db, current_user_id, "youtube")
+	if not integration or not integration.is_valid:
+		raise HTTPException(
+			status_code=400,
+			detail="YouTube интеграция не найдена или не активна. Пожалуйста, подключите YouTube в настройках интеграций.",
+		)
 
+	# Заявленный размер проверяем до чтения тела
+	content_length = request.headers.get("content-length")
+	if content_length and content_length.isdigit() and int(content_length) > settings.MAX_UPLOAD_REQUEST_SIZE:
+		raise HTTPException(
+			status_code=413,
+			detail=f"Тело запроса превышает максимальный размер {settings.MAX_UPLOAD_REQUEST_SIZE} байт",
+		)
+
+	# Тело запроса разбирается потоково: файлы пишутся сразу на файловую
+	# систему хранилища с подсчётом SHA-256, без промежуточной копии
 	try:
-		result = await UploadService.process_and_upload(
-			session=db,
-			user_id=current_user_id,
-			file_path=tmp_path,
-			original_filename=file.filename or "video.mp4",
-			generate_orientations=generate_orientations,
-			requested_orientations=orientations or [],
+		reader = MultipartUploadReader(
+			request.headers.get("content-type"),
+			settings.MAX_UPLOAD_SIZE,
+			StorageService.get_staging_path,
+			settings.MAX_UPLOAD_REQUEST_SIZE,
 		)
+		_, uploads = await reader.read(request.stream())
+	except UploadTooLargeError as e:
+		# Остаток тела не дочитывается
+		raise HTTPException(status_code=413, detail=str(e))
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e))
+
+	try:
+		uploads = [u for u in uploads if u["field"] == "files"]
+		if not uploads:
+			raise HTTPException(status_code=400, detail="Не предоставлены файлы")
+
+		items = []
+		for upload in uploads:
+			original_filename = upload["filename"] or "video.mp4"
+			source_id = uuid.uuid4()
 
-		return UploadResponse(
-			source_id=result["source_id"],
-			original_filename=result["original_filename"],
-			versions=[
+			error = upload.get("error")
+			video_info = None
+			if not error and settings.UPLOAD_PREFLIGHT:
+				try:
+					video_info = await StorageService.preflight_file(Path(upload["path"]))
+				except ValueError as e:
+					error = str(e)
+			if error:
+				if len(uploads) == 1:
+					raise HTTPException(status_code=400, detail=error)
+				items.append(
+					UploadJobResponse(status="error", original_filename=original_filename, error_text=error)
+				)
+				continue
+
+			# Исходник хранится по хешу содержимого; ссылку держит задача,
+			# затем она переходит к SourceAsset
+			storage_path = await StorageService.store_blob(
+				db, Path(upload["path"]), upload["content_hash"], upload["size_bytes"]
+			)
+			# Каждый файл — отдельная задача; воркеры обрабатывают их параллельно
+			job = await JobService.enqueue(
+				db,
+				current_user_id,
+				"upload",
 				{
-					"id": v["id"],
-					"orientation": v["orientation"],
-					"status": v["status"],
-					"youtube_url": v.get("youtube_url"),
-					"error_text": v.get("error_text"),
-					"duration_sec": v.get("duration_sec", 0),
-					"width": v.get("width", 0),
-					"height": v.get("height", 0),
-				}
-				for v in result["versions"]
-			],
+					"source_id": str(source_id),
+					"path": storage_path,
+					"content_hash": upload["content_hash"],
+					"size_bytes": upload["size_bytes"],
+					"original_filename": original_filename,
+					"generate_orientations": generate_orientations,
+					"orientations": orientations or [],
+					"uniquify_mode": uniquify_mode,
+					"seed": seed,
+					"encoder_profile": encoder_profile,
+					# Параметры из разбора боксов — воркер обойдётся без ffprobe
+					"video_info": video_info,
+				},
+			)
+			items.append(_job_to_response(job))
+	finally:
+		# Удаляем отклонённые файлы, не перенесённые в хранилище
+		reader.cleanup()
+
+	return UploadJobsResponse(items=items)
+
+
+@router.get("/jobs/stats", response_model=JobQueueStatsResponse)
+async def get_job_queue_stats(
+	current_user_id: uuid.UUID = Depends(get_current_user_id),
+	db: AsyncSession = Depends(get_db),
+):
+	"""Получить количество задач пользователя по статусам"""
+	counts = await JobService.count_by_status(db, current_user_id)
+	return JobQueueStatsResponse(counts=counts)
+
+
+@router.get("/jobs/{job_id}", response_model=UploadJobResponse)
+async def get_upload_job(
+	job_id: uuid.UUID,
+	current_user_id: uuid.UUID = Depends(get_current_user_id),
+	db: AsyncSession = Depends(get_db),
+):
+	"""Получить статус задачи обработки"""
+	job = await JobService.get_job(db, current_user_id, job_id)
+	if not job:
+		raise HTTPException(status_code=404, detail="Задача не найдена")
+	return _job_to_response(job)
+
+
+@router.post("/sources/{source_id}/variants", response_model=UploadJobResponse, status_code=202)
+async def create_variants(
+	source_id: uuid.UUID,
+	count: int = Query(..., ge=1, le=settings.MAX_VARIANTS, description="Количество вариантов"),
+	orientation: Optional[str] = Query(None, description="Ориентация вариантов (по умолчанию — исходная)"),
+	seed: Optional[int] = Query(None, ge=0, description="Начальный seed; вариант i получает seed + i"),
+	encoder_profile: Optional[str] = Query(None, description="Профиль кодирования"),
+	current_user_id: uuid.UUID = Depends(get_current_user_id),
+	db: AsyncSession = Depends(get_db),
+):
+	"""Сделать несколько уникальных вариантов загруженного исходника.
+
+	Варианты рендерятся из одного декодирования исходника и загружаются
+	на YouTube как отдельные версии. Обработка ставится в очередь.
+	"""
+	if orientation and orientation not in ORIENTATIONS:
+		raise HTTPException(status_code=400, detail=f"Неизвестная ориентация: {orientation}")
+	_validate_encoder_profile(encoder_profile)
+
+	source = await db.get(SourceAsset, source_id)
+	if not source or source.user_id != current_user_id:
+		raise HTTPException(status_code=404, detail="Исходник не найден")
+
+	integration = await IntegrationService.get_integration(db, current_user_id, "youtube")
+	if not integration or not integration.is_valid:
+		raise HTTPException(
+			status_code=400,
+			detail="YouTube интеграция не найдена или не активна. Пожалуйста, подключите YouTube в настройках интеграций.",
 		)
 
-	finally:
-		# Удаляем временный файл
-		if os.path.exists(tmp_path):
-			os.remove(tmp_path)
+	job = await JobService.enqueue(
+		db,
+		current_user_id,
+		"variants",
+		{
+			"source_id": str(source_id),
+			"original_filename": source.original_filename,
+			"count": count,
+			"orientation": orientation,
+			# Фиксируем seed, чтобы повторный захват задачи дал те же варианты
+			"seed": seed if seed is not None else random.getrandbits(31),
+			"encoder_profile": encoder_profile,
+		},
+	)
+	return _job_to_response(job)
+
+
+@router.get("/encoder-profiles", response_model=EncoderProfilesResponse)
+async def get_encoder_profiles(
+	current_user_id: uuid.UUID = Depends(get_current_user_id),
+	db: AsyncSession = Depends(get_db),
+):
+	"""Получить профили кодирования и профиль пользователя по умолчанию"""
+	default = await EncoderProfileService.resolve_for_user(db, current_user_id)
+	return EncoderProfilesResponse(profiles=EncoderProfileService.get_profiles(), default=default["name"])
+
+
+@router.put("/encoder-profiles/default", response_model=EncoderProfilesResponse)
+async def set_default_encoder_profile(
+	name: Optional[str] = Query(None, description="Имя профиля; пусто — глобальный профиль по умолчанию"),
+	current_user_id: uuid.UUID = Depends(get_current_user_id),
+	db: AsyncSession = Depends(get_db),
+):
+	"""Установить профиль кодирования пользователя по умолчанию"""
+	_validate_encoder_profile(name)
+	user = await db.get(User, current_user_id)
+	if not user:
+		raise HTTPException(status_code=404, detail="Пользователь не найден")
+
+	user.default_encoder_profile = name
+	await db.commit()
+	return await get_encoder_profiles(current_user_id, db)
+
+
+@router.get("/quota", response_model=YouTubeQuotaResponse)
+async def get_youtube_quota(
+	current_user_id: uuid.UUID = Depends(get_current_user_id),
+	db: AsyncSession = Depends(get_db),
+):
+	"""Остаток квоты YouTube по каналам и прогноз её исчерпания.
+
+	Для планирования пакетов: сколько загрузок можно сделать сейчас, когда
+	станет доступна следующая и когда квота кончится при текущем расходе.
+	"""
+	status = await QuotaService.get_status(db, current_user_id)
+	await db.commit()
+	return YouTubeQuotaResponse(**status)
+
+
+def _validate_encoder_profile(name: Optional[str]) -> None:
+	"""Проверить имя профиля кодирования из запроса"""
+	if name and name not in EncoderProfileService.names():
+		raise HTTPException(status_code=400, detail=f"Неизвестный профиль кодирования: {name}")
+
+
+def _job_to_response(job: ProcessingJob) -> UploadJobResponse:
+	"""Преобразовать задачу очереди в ответ API"""
+	result = job.result
+	if result is not None:
+		# Форма результата зависит от вида задачи
+		result_model = PublishJobResult if job.kind == "publish" else UploadSourceResult
+		result = result_model.model_validate(result)
+	return UploadJobResponse(
+		id=job.id,
+		kind=job.kind,
+		status=job.status,
+		original_filename=(job.payload or {}).get("original_filename"),
+		error_text=job.error_text,
+		attempts=job.attempts or 0,
+		result=result,
+		created_at=job.created_at,
+		started_at=job.started_at,
+		finished_at=job.finished_at,
+	)
 
 
 @router.get("/", response_model=UploadListResponse)
@@ -124,6 +360,7 @@ async def list_uploads(
 				youtube_url=upload.youtube_url,
 				status=upload.status,
 				error_text=upload.error_text,
+				attempts=upload.attempts or 0,
 				uploaded_at=upload.uploaded_at,
 				created_at=version.created_at,
 			)
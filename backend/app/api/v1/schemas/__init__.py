@@ -1,6 +1,14 @@
 from app.api.v1.schemas.upload import (
 	UploadResponse,
 	UploadVersionResponse,
+	UploadSourceResult,
+	PublishJobResult,
+	UploadJobResponse,
+	UploadJobsResponse,
+	JobQueueStatsResponse,
+	EncoderProfilesResponse,
+	YouTubeQuotaChannelResponse,
+	YouTubeQuotaResponse,
 	UploadRequest,
 	UploadListResponse,
 	UploadItemResponse,
@@ -9,6 +17,14 @@ from app.api.v1.schemas.upload import (
 __all__ = [
 	"UploadResponse",
 	"UploadVersionResponse",
+	"UploadSourceResult",
+	"PublishJobResult",
+	"UploadJobResponse",
+	"UploadJobsResponse",
+	"JobQueueStatsResponse",
+	"EncoderProfilesResponse",
+	"YouTubeQuotaChannelResponse",
+	"YouTubeQuotaResponse",
 	"UploadRequest",
 	"UploadListResponse",
 	"UploadItemResponse",
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
 from uuid import UUID
 
@@ -10,9 +10,10 @@ class UploadVersionResponse(BaseModel):
 	status: str
 	youtube_url: Optional[str] = None
 	error_text: Optional[str] = None
-	duration_sec: float
-	width: int
-	height: int
+	# Версия, не прошедшая рендер, размеров не имеет
+	duration_sec: float = 0
+	width: int = 0
+	height: int = 0
 
 
 class UploadResponse(BaseModel):
@@ -21,6 +22,71 @@ class UploadResponse(BaseModel):
 	versions: List[UploadVersionResponse]
 
 
+class UploadSourceResult(BaseModel):
+	source_id: Optional[UUID] = None
+	original_filename: str
+	status: str  # 'success', 'error'
+	error_text: Optional[str] = None
+	versions: List[UploadVersionResponse] = []
+
+
+class PublishJobResult(BaseModel):
+	id: UUID  # YouTubeUpload
+	status: str  # 'success', 'deferred'; 'processing' — загрузку уже выполняет другой воркер
+	youtube_url: Optional[str] = None
+	error_text: Optional[str] = None
+	retry_at: Optional[datetime] = None  # когда будет следующая попытка ('deferred')
+
+
+class UploadJobResponse(BaseModel):
+	id: Optional[UUID] = None
+	kind: str = "upload"  # 'upload', 'variants', 'publish'
+	status: str  # 'queued', 'processing', 'success', 'error'
+	original_filename: Optional[str] = None
+	error_text: Optional[str] = None
+	attempts: int = 0
+	result: Optional[Union[UploadSourceResult, PublishJobResult]] = None  # PublishJobResult у задач 'publish'
+	created_at: Optional[datetime] = None
+	started_at: Optional[datetime] = None
+	finished_at: Optional[datetime] = None
+
+
+class UploadJobsResponse(BaseModel):
+	items: List[UploadJobResponse]
+
+
+class JobQueueStatsResponse(BaseModel):
+	counts: Dict[str, int]
+
+
+class EncoderProfilesResponse(BaseModel):
+	profiles: Dict[str, Dict[str, Any]]
+	default: str  # профиль пользователя по умолчанию (или глобальный)
+
+
+class YouTubeQuotaChannelResponse(BaseModel):
+	integration_id: UUID
+	account_name: Optional[str] = None
+	capacity: int
+	remaining: int
+	used_today: int
+	uploads_available: int
+	blocked_until: Optional[datetime] = None  # YouTube ответил quotaExceeded
+	next_upload_at: datetime
+	projected_exhaustion_at: Optional[datetime] = None  # None — при текущем расходе квота не кончится
+
+
+class YouTubeQuotaResponse(BaseModel):
+	upload_cost: int
+	channels: List[YouTubeQuotaChannelResponse]
+	remaining: int
+	uploads_available: int
+	pending_uploads: int  # загрузки в очереди и отложенные
+	next_upload_at: Optional[datetime] = None
+	projected_exhaustion_at: Optional[datetime] = None
+	resets_at: datetime  # сброс суточной квоты YouTube
+
+
 class UploadRequest(BaseModel):
 	generate_orientations: bool = False
 	orientations: List[str] = []  # ['square', 'portrait', 'landscape']
@@ -37,6 +103,7 @@ class UploadItemResponse(BaseModel):
 	youtube_url: Optional[str] = None
 	status: str
 	error_text: Optional[str] = None
+	attempts: int = 0
 	uploaded_at: Optional[datetime] = None
 	created_at: datetime
 
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
-from typing import List
+from typing import Any, Dict, List
 
 
 class Settings(BaseSettings):
@@ -55,12 +55,26 @@ class Settings(BaseSettings):
 	YOUTUBE_CLIENT_ID: str = ""
 	YOUTUBE_CLIENT_SECRET: str = ""
 	YOUTUBE_REDIRECT_URI: str = ""
+	YOUTUBE_SET_THUMBNAIL: bool = False  # ставить превью из рендера после загрузки (нужен подтверждённый канал)
+	YOUTUBE_UPLOAD_URL: str = "https://www.googleapis.com/upload/youtube/v3/videos"  # точка открытия сессий resumable upload
+	YOUTUBE_THUMBNAIL_URL: str = "https://www.googleapis.com/upload/youtube/v3/thumbnails/set"  # загрузка превью видео
+	YOUTUBE_UPLOAD_CHUNK_SIZE: int = 16777216  # 16MB, размер части resumable upload (кратен 256 КБ)
+	YOUTUBE_DAILY_QUOTA: int = 10000  # суточная квота YouTube Data API на канал (единиц)
+	YOUTUBE_UPLOAD_QUOTA_COST: int = 1600  # стоимость videos.insert в единицах квоты
+	UPLOAD_AUTO_RETRY: bool = True  # повторять загрузку после временных ошибок (5xx, лимиты, сеть)
+	UPLOAD_RETRY_POLICIES: Dict[str, Dict[str, Any]] = {}  # переопределения max_attempts/base_delay/max_delay по классам ошибок
+	UPLOAD_CLAIM_TIMEOUT: int = 900  # загрузка в 'processing' без новых частей дольше этого считается брошенной
 
 	# Google Drive API
 	GDRIVE_CLIENT_ID: str = ""
 	GDRIVE_CLIENT_SECRET: str = ""
 	GDRIVE_REDIRECT_URI: str = ""
 
+	# Кэш клиентов Google API (YouTube, Drive)
+	GOOGLE_CLIENT_CACHE_TTL: int = 3600  # секунд жизни клиента в кэше
+	GOOGLE_CLIENT_CACHE_SIZE: int = 64  # максимум клиентов в кэше, сверх — вытесняются давно не использованные
+	OAUTH_TOKEN_REFRESH_MARGIN: int = 300  # за сколько секунд до истечения access token обновляется заранее
+
 	# Google Ads API
 	GADS_CLIENT_ID: str = ""
 	GADS_CLIENT_SECRET: str = ""
@@ -73,11 +87,44 @@ class Settings(BaseSettings):
 	# Storage
 	STORAGE_PATH: str = "./storage"
 	MAX_UPLOAD_SIZE: int = 10737418240  # 10GB
+	MAX_UPLOAD_REQUEST_SIZE: int = 21474836480  # 20GB, всё тело запроса загрузки (несколько файлов)
+	UPLOAD_CHUNK_SIZE: int = 1048576  # 1MB, размер блока при записи файлов
+	UPLOAD_STAGING_PATH: str = ""  # куда принимать загрузки; пусто — STORAGE_PATH/tmp (та же ФС, перенос без копирования)
+	UPLOAD_PREFLIGHT: bool = True  # проверять структуру MP4/MOV до сохранения (другие форматы проверяет ffprobe)
 
 	# Video Processing
 	FFMPEG_PATH: str = "ffmpeg"
 	FFPROBE_PATH: str = "ffprobe"
+	FFPROBE_TIMEOUT: int = 60  # секунды
+	PROBE_GOP_SECONDS: int = 30  # сколько секунд начала файла сканировать для оценки GOP
+	FFMPEG_RENDER_TIMEOUT: int = 3600
+	FFMPEG_REMUX_TIMEOUT: int = 600
+	FFMPEG_THUMBNAIL_TIMEOUT: int = 60
 	MAX_PARALLEL_UPLOADS: int = 3
+	UNIQUIFY_MODE: str = "full"  # 'full' — перекодирование, 'fast' — ремукс без перекодирования видео
+	RENDER_FANOUT: bool = True  # рендерить все ориентации из одного декодирования (при UPLOAD_PIPELINE первая — отдельно, чтобы её загрузка шла во время fan-out)
+	RENDER_THUMBNAILS: bool = True  # снимать превью первого кадра в том же проходе рендера
+	RENDER_CONTACT_SHEET: bool = False  # строить контактный лист кадров (в том же проходе; для сегментного рендера — после склейки)
+	RENDER_CACHE: bool = True  # переиспользовать готовые рендеры с тем же исходником, ориентацией и профилем
+	RENDER_CACHE_MAX_BYTES: int = 53687091200  # 50GB, сверх лимита вытесняются давно не использованные рендеры
+	MAX_VARIANTS: int = 50  # максимум вариантов одного исходника за запрос
+	VARIANT_BATCH_SIZE: int = 0  # вариантов на одно декодирование, 0 — по числу слотов кодирования
+	UPLOAD_PIPELINE: bool = True  # загружать готовую версию, пока рендерится следующая
+	UPLOAD_PIPELINE_BUFFER: int = 2  # сколько готовых версий может ждать загрузки
+	SEGMENT_ENCODING: bool = True  # кодировать длинные и 4K-исходники сегментами параллельно
+	SEGMENT_SOURCE_MIN_DURATION: int = 300  # секунды; с какой длительности исходник режется на сегменты
+	SEGMENT_MIN_SECONDS: int = 20  # минимальная длительность одного сегмента
+	ENCODER_PROFILE: str = "default"  # профиль кодирования по умолчанию: bulk, default, hero
+	ENCODER_PROFILES: Dict[str, Dict[str, Any]] = {}  # переопределения и новые профили (JSON)
+	ENCODE_THREADS_PER_JOB: int = 0  # потоков на один кодировщик, 0 — автоматически
+	ENCODE_SLOTS: int = 0  # одновременных кодировщиков, 0 — ядра / потоки на кодировщик
+
+	# Job queue
+	WORKER_POLL_INTERVAL: float = 2.0  # секунды между опросами пустой очереди
+	JOB_HEARTBEAT_INTERVAL: int = 30  # секунды
+	JOB_LEASE_TIMEOUT: int = 300  # задача без heartbeat дольше этого считается брошенной
+	JOB_MAX_ATTEMPTS: int = 3
+	WORKER_STATS_INTERVAL: int = 60  # секунды между выводом статистики кодирования
 
 	class Config:
 		env_file = ".env"
@@ -1,20 +1,28 @@
 from app.models.user import User
 from app.models.integration import Integration
+from app.models.source_blob import SourceBlob
 from app.models.source_asset import SourceAsset
+from app.models.source_probe import SourceProbe
 from app.models.video_version import VideoVersion
 from app.models.youtube_upload import YouTubeUpload
+from app.models.youtube_quota import YouTubeQuota
 from app.models.ads_video_link import AdsVideoLink
 from app.models.moderation_check import ModerationCheck
 from app.models.notification import Notification
+from app.models.processing_job import ProcessingJob
 
 __all__ = [
 	"User",
 	"Integration",
+	"SourceBlob",
 	"SourceAsset",
+	"SourceProbe",
 	"VideoVersion",
 	"YouTubeUpload",
+	"YouTubeQuota",
 	"AdsVideoLink",
 	"ModerationCheck",
 	"Notification",
+	"ProcessingJob",
 ]
 
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+import uuid
+
+from app.core.database import Base
+
+
+class ProcessingJob(Base):
+	__tablename__ = "processing_jobs"
+	__table_args__ = (Index("ix_processing_jobs_status_created_at", "status", "created_at"),)
+
+	id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+	user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+	kind = Column(String, nullable=False)  # 'upload', 'variants', 'publish'
+	payload = Column(JSONB, nullable=False)
+	status = Column(String, nullable=False, default="queued")  # 'queued', 'processing', 'success', 'error'
+	result = Column(JSONB, nullable=True)
+	error_text = Column(String, nullable=True)
+	attempts = Column(Integer, default=0, nullable=False)
+	worker_id = Column(String, nullable=True)
+	heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+	available_at = Column(DateTime(timezone=True), nullable=True)  # отложена до (например, нет квоты YouTube)
+	created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+	started_at = Column(DateTime(timezone=True), nullable=True)
+	finished_at = Column(DateTime(timezone=True), nullable=True)
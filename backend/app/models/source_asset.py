@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Float, Integer, BigInteger, DateTime, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
@@ -13,6 +13,8 @@ class SourceAsset(Base):
 	user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
 	original_filename = Column(String, nullable=False)
 	storage_path = Column(String, nullable=False)
+	content_hash = Column(String, ForeignKey("source_blobs.content_hash"), nullable=True, index=True)
+	size_bytes = Column(BigInteger, nullable=True)
 	duration_sec = Column(Float, nullable=False)
 	width = Column(Integer, nullable=False)
 	height = Column(Integer, nullable=False)
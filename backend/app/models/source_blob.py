@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class SourceBlob(Base):
+	__tablename__ = "source_blobs"
+
+	content_hash = Column(String, primary_key=True)  # SHA-256 содержимого
+	storage_path = Column(String, nullable=False)  # sources/ab/cd/<hash>
+	size_bytes = Column(BigInteger, nullable=False)
+	ref_count = Column(Integer, default=0, nullable=False)  # исходники и задачи, ссылающиеся на файл
+	created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
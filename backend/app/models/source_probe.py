@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class SourceProbe(Base):
+	__tablename__ = "source_probes"
+
+	content_hash = Column(String, primary_key=True)  # SHA-256 содержимого исходника
+	info = Column(JSONB, nullable=False)  # нормализованная информация о потоках
+	raw_probe = Column(JSONB, nullable=True)  # полный ответ ffprobe (format + streams)
+	created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -12,5 +12,6 @@ class User(Base):
 	id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 	email = Column(String, nullable=False, unique=True, index=True)
 	name = Column(String, nullable=True)
+	default_encoder_profile = Column(String, nullable=True)  # см. EncoderProfileService
 	created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
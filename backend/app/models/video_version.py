@@ -14,6 +14,8 @@ class VideoVersion(Base):
 	orientation = Column(String, nullable=False)  # 'square', 'portrait', 'landscape'
 	transform_profile = Column(JSONB, nullable=True)
 	storage_path_render = Column(String, nullable=False)
+	thumbnail_path = Column(String, nullable=True)  # первый кадр, снят при рендере
+	contact_sheet_path = Column(String, nullable=True)  # сетка кадров низкого разрешения
 	duration_sec = Column(Float, nullable=False)
 	width = Column(Integer, nullable=False)
 	height = Column(Integer, nullable=False)
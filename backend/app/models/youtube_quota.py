@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Float, Integer, Date, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.database import Base
+
+
+class YouTubeQuota(Base):
+	__tablename__ = "youtube_quotas"
+
+	integration_id = Column(
+		UUID(as_uuid=True), ForeignKey("integrations.id", ondelete="CASCADE"), primary_key=True
+	)
+	tokens = Column(Float, nullable=False)  # остаток квоты в корзине (единиц API)
+	quota_day = Column(Date, nullable=False)  # сутки квоты YouTube (по тихоокеанскому времени)
+	used_today = Column(Integer, default=0, nullable=False)  # израсходовано за сутки квоты
+	blocked_until = Column(DateTime(timezone=True), nullable=True)  # YouTube ответил quotaExceeded
+	updated_at = Column(DateTime(timezone=True), nullable=False)  # последнее пополнение корзины
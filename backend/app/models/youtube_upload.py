@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Boolean, Integer, BigInteger, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 import uuid
 
@@ -16,7 +16,15 @@ class YouTubeUpload(Base):
 	title = Column(String, nullable=True)
 	privacy = Column(String, default="unlisted", nullable=False)
 	thumbnail_set = Column(Boolean, default=False, nullable=False)
-	status = Column(String, nullable=False)  # 'queued', 'processing', 'success', 'error'
+	status = Column(String, nullable=False)  # 'queued', 'processing', 'deferred', 'success', 'error'
+	attempts = Column(Integer, default=0, nullable=False)  # попыток загрузки
+	attempt_history = Column(JSONB, nullable=True)  # неудачи с классом ошибки и временем повтора
+	integration_id = Column(
+		UUID(as_uuid=True), ForeignKey("integrations.id", ondelete="SET NULL"), nullable=True
+	)  # канал, на который идёт загрузка
 	error_text = Column(String, nullable=True)
+	upload_session_uri = Column(String, nullable=True)  # URI сессии resumable upload для продолжения загрузки
+	upload_offset = Column(BigInteger, default=0, nullable=False)  # байт, подтверждённых YouTube
+	claimed_at = Column(DateTime(timezone=True), nullable=True)  # когда загрузку заняли или она продвинулась
 	uploaded_at = Column(DateTime(timezone=True), nullable=True)
 
@@ -0,0 +1,80 @@
+"""Планировщик кодирования с учётом числа ядер CPU"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from app.core.config import settings
+
+
+class EncodeScheduler:
+	"""Раздаёт слоты кодирования с явным бюджетом потоков.
+
+	Параллельные libx264 с потоками по умолчанию (по числу ядер каждый)
+	переподписывают CPU и вытесняют друг друга из кэшей. Планировщик делит ядра
+	на слоты по ENCODE_THREADS_PER_JOB потоков; работа сверх ёмкости ждёт
+	в очереди, а не запускается параллельно.
+	"""
+
+	def __init__(
+		self,
+		cpu_count: Optional[int] = None,
+		threads_per_slot: Optional[int] = None,
+		total_slots: Optional[int] = None,
+	):
+		self.cpu_count = cpu_count or os.cpu_count() or 1
+		self.threads_per_slot = threads_per_slot or settings.ENCODE_THREADS_PER_JOB or min(4, self.cpu_count)
+		self.total_slots = (
+			total_slots
+			or settings.ENCODE_SLOTS
+			or max(1, self.cpu_count // self.threads_per_slot)
+		)
+		self._in_use = 0
+		self._active_jobs = 0
+		self._waiting = 0
+		self._condition = asyncio.Condition()
+
+	@asynccontextmanager
+	async def slot(self, weight: int = 1) -> AsyncIterator[int]:
+		"""Занять слоты на время кодирования.
+
+		weight — число одновременно работающих кодировщиков в процессе ffmpeg
+		(например, выходов fan-out рендера). Возвращает бюджет потоков на
+		один кодировщик для параметра -threads. Если кодировщиков больше, чем
+		слотов, процесс занимает все слоты, а их потоки делятся между
+		кодировщиками — суммарно не больше ёмкости планировщика.
+		"""
+		encoders = max(1, weight)
+		weight = min(encoders, self.total_slots)
+		threads = max(1, self.threads_per_slot * weight // encoders)
+
+		async with self._condition:
+			self._waiting += 1
+			try:
+				await self._condition.wait_for(lambda: self.total_slots - self._in_use >= weight)
+			finally:
+				self._waiting -= 1
+			self._in_use += weight
+			self._active_jobs += 1
+
+		try:
+			yield threads
+		finally:
+			async with self._condition:
+				self._in_use -= weight
+				self._active_jobs -= 1
+				self._condition.notify_all()
+
+	def stats(self) -> Dict[str, int]:
+		"""Текущая загрузка: занятые слоты и глубина очереди"""
+		return {
+			"cpu_count": self.cpu_count,
+			"threads_per_slot": self.threads_per_slot,
+			"total_slots": self.total_slots,
+			"slots_in_use": self._in_use,
+			"active_jobs": self._active_jobs,
+			"queued_jobs": self._waiting,
+		}
+
+
+encode_scheduler = EncodeScheduler()
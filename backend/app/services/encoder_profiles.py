@@ -0,0 +1,81 @@
+"""Именованные профили кодирования (скорость/качество)"""
+import uuid
+from typing import Any, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import User
+
+
+class EncoderProfileService:
+	"""Профили libx264: пресет, tune, длина GOP, x264-params, аудио.
+
+	Битрейт видео задаёт план уникализации (CBR под целевой размер), поэтому
+	CRF в профиле нет; битрейт аудио профиля учитывается в плане.
+
+	Встроенная лестница bulk → default → hero; ENCODER_PROFILES в настройках
+	переопределяет поля встроенных профилей или добавляет новые. Профиль
+	выбирается для задачи, иначе берётся профиль пользователя по умолчанию,
+	иначе ENCODER_PROFILE.
+	"""
+
+	BUILTIN_PROFILES: Dict[str, Dict[str, Any]] = {
+		# Массовые кампании: минимум CPU на версию
+		"bulk": {
+			"preset": "veryfast",
+			"tune": None,
+			"gop_seconds": 4,
+			"x264_params": {},
+			"audio_codec": "aac",
+			"audio_bitrate": 96000,
+		},
+		"default": {
+			"preset": "medium",
+			"tune": None,
+			"gop_seconds": 2,
+			"x264_params": {},
+			"audio_codec": "aac",
+			"audio_bitrate": 128000,
+		},
+		# Ключевые креативы: качество важнее времени кодирования
+		"hero": {
+			"preset": "slow",
+			"tune": "film",
+			"gop_seconds": 2,
+			"x264_params": {"aq-mode": 3},
+			"audio_codec": "aac",
+			"audio_bitrate": 192000,
+		},
+	}
+
+	@staticmethod
+	def get_profiles() -> Dict[str, Dict[str, Any]]:
+		"""Все доступные профили с учётом переопределений из настроек"""
+		profiles = {name: dict(profile) for name, profile in EncoderProfileService.BUILTIN_PROFILES.items()}
+		for name, overrides in settings.ENCODER_PROFILES.items():
+			profiles[name] = {**profiles.get(name, EncoderProfileService.BUILTIN_PROFILES["default"]), **overrides}
+		return profiles
+
+	@staticmethod
+	def names() -> List[str]:
+		"""Имена доступных профилей"""
+		return list(EncoderProfileService.get_profiles())
+
+	@staticmethod
+	def resolve(name: Optional[str] = None) -> Dict[str, Any]:
+		"""Профиль по имени (по умолчанию — ENCODER_PROFILE) с полем name"""
+		name = name or settings.ENCODER_PROFILE
+		profiles = EncoderProfileService.get_profiles()
+		if name not in profiles:
+			raise ValueError(f"Неизвестный профиль кодирования: {name}")
+		return {"name": name, **profiles[name]}
+
+	@staticmethod
+	async def resolve_for_user(
+		session: AsyncSession, user_id: uuid.UUID, name: Optional[str] = None
+	) -> Dict[str, Any]:
+		"""Профиль задачи, иначе профиль пользователя по умолчанию, иначе глобальный"""
+		if not name:
+			user = await session.get(User, user_id)
+			name = user.default_encoder_profile if user else None
+		return EncoderProfileService.resolve(name)
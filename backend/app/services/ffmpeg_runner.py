@@ -0,0 +1,111 @@
+"""Неблокирующий запуск ffmpeg/ffprobe"""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+
+class FFmpegError(Exception):
+	"""Ошибка выполнения ffmpeg/ffprobe"""
+
+	def __init__(self, message: str, returncode: Optional[int] = None, stderr: str = ""):
+		self.returncode = returncode
+		self.stderr = stderr
+		if stderr:
+			message = f"{message}: {stderr}"
+		super().__init__(message)
+
+
+class FFmpegRunner:
+	"""Запуск ffmpeg/ffprobe через asyncio-подпроцессы.
+
+	Event loop не блокируется на время кодирования. При таймауте или отмене
+	задачи дочерний процесс убивается, stderr сохраняется для отчёта об ошибке.
+	"""
+
+	# Сколько последних символов stderr включать в текст ошибки
+	STDERR_TAIL = 2000
+
+	@staticmethod
+	async def run(cmd: List[str], timeout: Optional[float] = None) -> bytes:
+		"""Выполнить команду и вернуть stdout"""
+		process = await asyncio.create_subprocess_exec(
+			*cmd,
+			stdin=asyncio.subprocess.DEVNULL,
+			stdout=asyncio.subprocess.PIPE,
+			stderr=asyncio.subprocess.PIPE,
+		)
+		try:
+			stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+		except asyncio.TimeoutError:
+			await FFmpegRunner._kill(process)
+			raise FFmpegError(f"{cmd[0]} не завершился за {timeout} с")
+		except asyncio.CancelledError:
+			await asyncio.shield(FFmpegRunner._kill(process))
+			raise
+
+		if process.returncode != 0:
+			tail = stderr.decode(errors="replace").strip()[-FFmpegRunner.STDERR_TAIL:]
+			raise FFmpegError(
+				f"{cmd[0]} завершился с кодом {process.returncode}",
+				returncode=process.returncode,
+				stderr=tail,
+			)
+		return stdout
+
+	@staticmethod
+	async def ffmpeg(args: List[str], timeout: Optional[float] = None) -> None:
+		"""Запустить ffmpeg с указанными аргументами"""
+		cmd = [settings.FFMPEG_PATH, "-hide_banner", "-nostats", "-y", *args]
+		await FFmpegRunner.run(cmd, timeout=timeout or settings.FFMPEG_RENDER_TIMEOUT)
+
+	@staticmethod
+	async def probe(file_path: str, extra_args: Optional[List[str]] = None) -> Dict[str, Any]:
+		"""Получить JSON-описание файла через ffprobe"""
+		cmd = [
+			settings.FFPROBE_PATH,
+			"-v", "error",
+			"-print_format", "json",
+			"-show_format",
+			"-show_streams",
+			*(extra_args or []),
+			file_path,
+		]
+		stdout = await FFmpegRunner.run(cmd, timeout=settings.FFPROBE_TIMEOUT)
+		return json.loads(stdout)
+
+	@staticmethod
+	async def probe_keyframes(file_path: str, read_seconds: Optional[float] = None) -> List[float]:
+		"""Времена ключевых кадров видеопотока (по пакетам, без декодирования).
+
+		read_seconds ограничивает сканирование началом файла.
+		"""
+		cmd = [
+			settings.FFPROBE_PATH,
+			"-v", "error",
+			"-select_streams", "v:0",
+			"-show_entries", "packet=pts_time,flags",
+			"-of", "csv=p=0",
+		]
+		if read_seconds:
+			cmd.extend(["-read_intervals", f"%+{read_seconds}"])
+		cmd.append(file_path)
+
+		stdout = await FFmpegRunner.run(cmd, timeout=settings.FFPROBE_TIMEOUT)
+		keyframes = []
+		for line in stdout.decode(errors="replace").splitlines():
+			pts_time, _, flags = line.partition(",")
+			if "K" in flags and pts_time not in ("", "N/A"):
+				keyframes.append(float(pts_time))
+		return sorted(keyframes)
+
+	@staticmethod
+	async def _kill(process: asyncio.subprocess.Process) -> None:
+		"""Убить дочерний процесс и дождаться его завершения"""
+		if process.returncode is None:
+			try:
+				process.kill()
+			except ProcessLookupError:
+				pass
+			await process.wait()
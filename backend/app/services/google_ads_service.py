@@ -1,10 +1,11 @@
 """Сервис для работы с Google Ads API"""
 from typing import Dict, Any, Optional
 import httpx
-from google.oauth2.credentials import Credentials
+from google.auth.exceptions import RefreshError
 from google_auth_oauthlib.flow import Flow
 
 from app.core.config import settings
+from app.services.oauth_token_manager import OAuthTokenManager
 
 
 class GoogleAdsService:
@@ -56,12 +57,13 @@ class GoogleAdsService:
 			}
 		
 		try:
-			creds = Credentials.from_authorized_user_info(credentials)
-			if not creds.valid:
+			try:
+				access_token = await OAuthTokenManager.get_access_token(credentials)
+			except RefreshError:
 				return {"status": "error", "message": "Токен невалиден или истёк"}
 			
 			account_info = await GoogleAdsService.get_account_info(
-				access_token=credentials.get("token"),
+				access_token=access_token,
 				developer_token=developer_token,
 				login_customer_id=credentials.get("login_customer_id"),
 			)
@@ -0,0 +1,87 @@
+"""Кэш клиентов Google API (YouTube, Drive) на процесс"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from app.core.config import settings
+
+
+class GoogleClientCache:
+	"""Клиенты googleapiclient без повторного разбора discovery-документа.
+
+	Discovery-документ берётся из копии, поставляемой с библиотекой, и
+	разбирается один раз на процесс. Готовые клиенты (вместе с их HTTP-транспортом)
+	хранятся в LRU с TTL по отпечатку credentials: смена токена, refresh token
+	или OAuth-клиента даёт новый отпечаток, и старый клиент больше не используется.
+	Клиенты httplib2 не потокобезопасны — кэш рассчитан на вызовы из event loop.
+	"""
+
+	# Поля credentials, изменение которых требует нового клиента
+	FINGERPRINT_FIELDS = ("token", "refresh_token", "client_id", "client_secret")
+
+	_documents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+	_clients: "OrderedDict[Tuple[str, str, str], Tuple[float, Any]]" = OrderedDict()
+	_lock = threading.Lock()
+
+	@staticmethod
+	def fingerprint(credentials: dict) -> str:
+		"""SHA-256 от полей credentials, определяющих клиента"""
+		material = json.dumps(
+			[credentials.get(field) for field in GoogleClientCache.FINGERPRINT_FIELDS]
+		)
+		return hashlib.sha256(material.encode()).hexdigest()
+
+	@staticmethod
+	def get_document(service_name: str, version: str) -> Dict[str, Any]:
+		"""Разобранный discovery-документ API (загружается один раз на процесс)"""
+		key = (service_name, version)
+		document = GoogleClientCache._documents.get(key)
+		if document is None:
+			content = get_static_doc(service_name, version)
+			if content is None:
+				raise ValueError(f"Discovery-документ {service_name} {version} не найден")
+			document = json.loads(content)
+			GoogleClientCache._documents[key] = document
+		return document
+
+	@staticmethod
+	def get_client(service_name: str, version: str, credentials: dict) -> Any:
+		"""Клиент API для credentials: из кэша или новый"""
+		key = (service_name, version, GoogleClientCache.fingerprint(credentials))
+		now = time.monotonic()
+
+		with GoogleClientCache._lock:
+			entry = GoogleClientCache._clients.get(key)
+			if entry and now - entry[0] < settings.GOOGLE_CLIENT_CACHE_TTL:
+				GoogleClientCache._clients.move_to_end(key)
+				return entry[1]
+
+		creds = Credentials.from_authorized_user_info(credentials)
+		client = build_from_document(
+			GoogleClientCache.get_document(service_name, version), credentials=creds
+		)
+
+		with GoogleClientCache._lock:
+			GoogleClientCache._clients[key] = (now, client)
+			GoogleClientCache._clients.move_to_end(key)
+			while len(GoogleClientCache._clients) > max(settings.GOOGLE_CLIENT_CACHE_SIZE, 0):
+				GoogleClientCache._clients.popitem(last=False)
+		return client
+
+	@staticmethod
+	def invalidate(credentials: Optional[dict] = None) -> None:
+		"""Сбросить клиентов для credentials (или весь кэш)"""
+		with GoogleClientCache._lock:
+			if credentials is None:
+				GoogleClientCache._clients.clear()
+				return
+			fingerprint = GoogleClientCache.fingerprint(credentials)
+			for key in [key for key in GoogleClientCache._clients if key[2] == fingerprint]:
+				del GoogleClientCache._clients[key]
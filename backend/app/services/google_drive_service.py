@@ -1,11 +1,11 @@
 """Сервис для работы с Google Drive API"""
 from typing import Dict, Any, Optional
-from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
 from app.core.config import settings
+from app.services.google_client_cache import GoogleClientCache
+from app.services.oauth_token_manager import OAuthTokenManager
 
 
 class GoogleDriveService:
@@ -46,13 +46,13 @@ class GoogleDriveService:
 	@staticmethod
 	def get_client(credentials: dict) -> any:
 		"""Получить клиент Google Drive API с credentials"""
-		creds = Credentials.from_authorized_user_info(credentials)
-		return build("drive", "v3", credentials=creds)
+		return GoogleClientCache.get_client("drive", "v3", credentials)
 
 	@staticmethod
 	async def test_connection(credentials: dict) -> Dict[str, Any]:
 		"""Проверить соединение с Google Drive"""
 		try:
+			credentials = await OAuthTokenManager.get_credentials(credentials)
 			drive = GoogleDriveService.get_client(credentials)
 			# Тестовый запрос - получить информацию о пользователе
 			about = drive.about().get(fields="user").execute()
@@ -66,6 +66,7 @@ class GoogleDriveService:
 	async def get_account_info(credentials: dict) -> Dict[str, Any]:
 		"""Получить информацию об аккаунте Google Drive"""
 		try:
+			credentials = await OAuthTokenManager.get_credentials(credentials)
 			drive = GoogleDriveService.get_client(credentials)
 			about = drive.about().get(fields="user").execute()
 			user_info = about.get("user", {}) if about else {}
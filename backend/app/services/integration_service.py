@@ -3,6 +3,7 @@ import uuid
 from typing import Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
+from google.auth.exceptions import RefreshError
 from googleapiclient.errors import HttpError
 
 from app.models import Integration
@@ -26,13 +27,81 @@ class IntegrationService:
 	async def get_integration(
 		session: AsyncSession, user_id: uuid.UUID, kind: str
 	) -> Optional[Integration]:
-		"""Получить интеграцию пользователя"""
+		"""Получить интеграцию пользователя (при нескольких — первую действующую)"""
+		query = (
+			select(Integration)
+			.where(and_(Integration.user_id == user_id, Integration.kind == kind))
+			.order_by(Integration.is_valid.desc(), Integration.created_at)
+			.limit(1)
+		)
+		result = await session.execute(query)
+		return result.scalar_one_or_none()
+
+	@staticmethod
+	async def get_integration_by_id(
+		session: AsyncSession, user_id: uuid.UUID, kind: str, integration_id: uuid.UUID
+	) -> Optional[Integration]:
+		"""Конкретная интеграция пользователя (например, один из нескольких каналов YouTube)"""
 		query = select(Integration).where(
-			and_(Integration.user_id == user_id, Integration.kind == kind)
+			Integration.id == integration_id,
+			Integration.user_id == user_id,
+			Integration.kind == kind,
 		)
 		result = await session.execute(query)
 		return result.scalar_one_or_none()
 
+	@staticmethod
+	async def resolve_integration(
+		session: AsyncSession, user_id: uuid.UUID, kind: str, integration_id: Optional[uuid.UUID] = None
+	) -> Optional[Integration]:
+		"""Интеграция по integration_id, без него — первая действующая интеграция вида"""
+		if integration_id:
+			return await IntegrationService.get_integration_by_id(session, user_id, kind, integration_id)
+		return await IntegrationService.get_integration(session, user_id, kind)
+
+	@staticmethod
+	async def get_valid_integrations(
+		session: AsyncSession, user_id: uuid.UUID, kind: str
+	) -> list[Integration]:
+		"""Все действующие интеграции пользователя одного вида (например, несколько каналов YouTube)"""
+		query = (
+			select(Integration)
+			.where(
+				Integration.user_id == user_id,
+				Integration.kind == kind,
+				Integration.is_valid == True,
+			)
+			.order_by(Integration.created_at)
+		)
+		result = await session.execute(query)
+		return list(result.scalars().all())
+
+	@staticmethod
+	async def get_account_integration(
+		session: AsyncSession, user_id: uuid.UUID, kind: str, account_id: str
+	) -> Optional[Integration]:
+		"""Интеграция, в которую сохранять авторизацию аккаунта account_id.
+
+		Запись того же аккаунта (например, канала YouTube) обновляется; иначе
+		занимается запись без известного аккаунта (только OAuth config или
+		подключённая до сохранения account_info). None — аккаунт новый,
+		для него нужна отдельная интеграция.
+		"""
+		query = (
+			select(Integration)
+			.where(Integration.user_id == user_id, Integration.kind == kind)
+			.order_by(Integration.created_at)
+		)
+		result = await session.execute(query)
+		integrations = list(result.scalars().all())
+		for integration in integrations:
+			if IntegrationService.get_account_info(integration).get("id") == account_id:
+				return integration
+		for integration in integrations:
+			if not IntegrationService.get_account_info(integration).get("id"):
+				return integration
+		return None
+
 	@staticmethod
 	async def get_all_integrations(
 		session: AsyncSession, user_id: uuid.UUID
@@ -50,8 +119,15 @@ class IntegrationService:
 		auth_data: Dict[str, Any],
 		is_valid: bool = True,
 		account_info: Optional[Dict[str, Any]] = None,
+		integration: Optional[Integration] = None,
+		create: bool = False,
 	) -> Integration:
-		"""Создать или обновить интеграцию"""
+		"""Создать или обновить интеграцию.
+
+		integration — конкретная запись для обновления (у пользователя может
+		быть несколько интеграций одного вида, например каналов YouTube).
+		create — всегда создать новую запись (ещё один канал того же вида).
+		"""
 		# Шифруем токены (но не oauth_config, если он есть)
 		# Разделяем oauth_config и токены
 		auth_payload = dict(auth_data)
@@ -62,7 +138,9 @@ class IntegrationService:
 		encrypted_auth = EncryptionService.encrypt(tokens_data)
 
 		# Проверяем, существует ли уже интеграция
-		existing = await IntegrationService.get_integration(session, user_id, kind)
+		existing = None
+		if not create:
+			existing = integration or await IntegrationService.get_integration(session, user_id, kind)
 		existing_tokens: Dict[str, Any] = {}
 		if existing and existing.auth_data.get("encrypted"):
 			try:
@@ -119,10 +197,10 @@ class IntegrationService:
 
 	@staticmethod
 	async def delete_integration(
-		session: AsyncSession, user_id: uuid.UUID, kind: str
+		session: AsyncSession, user_id: uuid.UUID, kind: str, integration_id: Optional[uuid.UUID] = None
 	) -> bool:
-		"""Удалить интеграцию"""
-		integration = await IntegrationService.get_integration(session, user_id, kind)
+		"""Удалить интеграцию (integration_id — конкретную из нескольких одного вида)"""
+		integration = await IntegrationService.resolve_integration(session, user_id, kind, integration_id)
 		if integration:
 			await session.delete(integration)
 			await session.commit()
@@ -137,7 +215,14 @@ class IntegrationService:
 		integration = await IntegrationService.get_integration(session, user_id, kind)
 		if not integration:
 			return None
+		return await IntegrationService.decrypt_auth_data(session, integration)
 
+	@staticmethod
+	async def decrypt_auth_data(
+		session: AsyncSession, integration: Integration
+	) -> Optional[Dict[str, Any]]:
+		"""Расшифровать данные авторизации конкретной интеграции"""
+		kind = integration.kind
 		try:
 			encrypted_data = integration.auth_data.get("encrypted")
 			if not encrypted_data:
@@ -177,13 +262,15 @@ class IntegrationService:
 			account_info = integration.auth_data.get("account_info")
 			if account_info:
 				tokens_data["account_info"] = account_info
+
+			# Чтобы обновлённый токен можно было записать обратно (см. OAuthTokenManager)
+			tokens_data["integration_id"] = str(integration.id)
 			
 			return tokens_data
 		except Exception:
 			# Если не удалось расшифровать, помечаем как невалидную
-			if integration:
-				integration.is_valid = False
-				await session.commit()
+			integration.is_valid = False
+			await session.commit()
 			return None
 
 	@staticmethod
@@ -286,12 +373,13 @@ class IntegrationService:
 
 	@staticmethod
 	async def test_connection(
-		session: AsyncSession, user_id: uuid.UUID, kind: str
+		session: AsyncSession, user_id: uuid.UUID, kind: str, integration_id: Optional[uuid.UUID] = None
 	) -> Dict[str, Any]:
-		"""Проверить соединение с сервисом"""
-		auth_data = await IntegrationService.get_decrypted_auth_data(
-			session, user_id, kind
-		)
+		"""Проверить соединение с сервисом (integration_id — конкретную интеграцию из нескольких одного вида)"""
+		integration = await IntegrationService.resolve_integration(session, user_id, kind, integration_id)
+		auth_data = None
+		if integration:
+			auth_data = await IntegrationService.decrypt_auth_data(session, integration)
 
 		if not auth_data:
 			return {"status": "error", "message": "Интеграция не найдена или невалидна"}
@@ -299,7 +387,12 @@ class IntegrationService:
 		try:
 			if kind == "youtube":
 				# Тестовый запрос к YouTube API
+				from app.services.oauth_token_manager import OAuthTokenManager
 				from app.services.youtube_service import YouTubeService
+				try:
+					auth_data = await OAuthTokenManager.get_credentials(auth_data)
+				except RefreshError:
+					return {"status": "error", "message": "Токен невалиден или истёк"}
 				client = YouTubeService.get_client(auth_data)
 				# Используем channels().list() с scope youtube.readonly
 				# Если scope нет, пробуем просто проверить валидность credentials
@@ -310,16 +403,11 @@ class IntegrationService:
 					return {"status": "ok", "message": f"Подключено как: {channel_title}"}
 				except HttpError as e:
 					if e.resp.status == 403:
-						# Проверяем, что credentials валидны хотя бы
-						from google.oauth2.credentials import Credentials
-						creds = Credentials.from_authorized_user_info(auth_data)
-						if creds.valid:
-							return {
-								"status": "ok",
-								"message": "Подключение успешно (требуется повторная авторизация для полного доступа)"
-							}
-						else:
-							return {"status": "error", "message": "Токен невалиден или истёк"}
+						# Токен действителен (получен выше), но scope youtube.readonly нет
+						return {
+							"status": "ok",
+							"message": "Подключение успешно (требуется повторная авторизация для полного доступа)"
+						}
 					raise
 
 			elif kind == "gdrive":
@@ -333,13 +421,11 @@ class IntegrationService:
 				from app.services.google_ads_service import GoogleAdsService
 				result = await GoogleAdsService.test_connection(auth_data)
 				if result.get("account_info"):
-					integration = await IntegrationService.get_integration(session, user_id, kind)
-					if integration:
-						integration.auth_data = {
-							**integration.auth_data,
-							"account_info": result["account_info"],
-						}
-						await session.commit()
+					integration.auth_data = {
+						**integration.auth_data,
+						"account_info": result["account_info"],
+					}
+					await session.commit()
 				return result
 
 			elif kind == "telegram":
@@ -347,13 +433,11 @@ class IntegrationService:
 				from app.services.telegram_service import TelegramService
 				result = await TelegramService.test_connection(auth_data)
 				if result.get("meta"):
-					integration = await IntegrationService.get_integration(session, user_id, kind)
-					if integration:
-						integration.auth_data = {
-							**integration.auth_data,
-							"account_info": result["meta"],
-						}
-						await session.commit()
+					integration.auth_data = {
+						**integration.auth_data,
+						"account_info": result["meta"],
+					}
+					await session.commit()
 				return result
 
 			else:
@@ -361,10 +445,8 @@ class IntegrationService:
 
 		except Exception as e:
 			# Помечаем интеграцию как невалидную
-			integration = await IntegrationService.get_integration(session, user_id, kind)
-			if integration:
-				integration.is_valid = False
-				await session.commit()
+			integration.is_valid = False
+			await session.commit()
 
 			return {"status": "error", "message": str(e)}
 
@@ -0,0 +1,149 @@
+"""Сервис очереди фоновых задач на базе PostgreSQL"""
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func, and_, or_
+
+from app.models import ProcessingJob
+from app.core.config import settings
+
+
+class JobService:
+	"""Постановка задач в очередь и их захват воркерами"""
+
+	@staticmethod
+	async def enqueue(
+		session: AsyncSession,
+		user_id: uuid.UUID,
+		kind: str,
+		payload: Dict[str, Any],
+		available_at: Optional[datetime] = None,
+	) -> ProcessingJob:
+		"""Поставить задачу в очередь (available_at — не раньше этого времени)"""
+		job = ProcessingJob(
+			id=uuid.uuid4(),
+			user_id=user_id,
+			kind=kind,
+			payload=payload,
+			status="queued",
+			available_at=available_at,
+		)
+		session.add(job)
+		await session.commit()
+		await session.refresh(job)
+		return job
+
+	@staticmethod
+	async def claim(session: AsyncSession, worker_id: str) -> Optional[ProcessingJob]:
+		"""Захватить следующую задачу.
+
+		Используется SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько воркеров
+		(в том числе на разных нодах) никогда не получат одну и ту же задачу.
+		Задачи в статусе processing без heartbeat дольше JOB_LEASE_TIMEOUT
+		считаются брошенными (воркер упал) и захватываются повторно.
+		Отложенные задачи (available_at в будущем) пропускаются.
+		"""
+		now = datetime.now(timezone.utc)
+		stale_before = now - timedelta(seconds=settings.JOB_LEASE_TIMEOUT)
+
+		query = (
+			select(ProcessingJob)
+			.where(
+				or_(
+					and_(
+						ProcessingJob.status == "queued",
+						or_(ProcessingJob.available_at.is_(None), ProcessingJob.available_at <= now),
+					),
+					and_(
+						ProcessingJob.status == "processing",
+						ProcessingJob.heartbeat_at < stale_before,
+					),
+				)
+			)
+			.order_by(ProcessingJob.created_at)
+			.limit(1)
+			.with_for_update(skip_locked=True)
+		)
+		result = await session.execute(query)
+		job = result.scalar_one_or_none()
+		if not job:
+			await session.rollback()
+			return None
+
+		job.status = "processing"
+		job.attempts += 1
+		job.worker_id = worker_id
+		job.heartbeat_at = now
+		job.started_at = job.started_at or now
+		await session.commit()
+		return job
+
+	@staticmethod
+	async def heartbeat(session: AsyncSession, job_id: uuid.UUID) -> None:
+		"""Продлить аренду задачи"""
+		await session.execute(
+			update(ProcessingJob)
+			.where(ProcessingJob.id == job_id, ProcessingJob.status == "processing")
+			.values(heartbeat_at=datetime.now(timezone.utc))
+		)
+		await session.commit()
+
+	@staticmethod
+	async def complete(
+		session: AsyncSession, job: ProcessingJob, result: Optional[Dict[str, Any]] = None
+	) -> None:
+		"""Отметить задачу как успешно выполненную"""
+		job.status = "success"
+		job.result = result
+		job.error_text = None
+		job.finished_at = datetime.now(timezone.utc)
+		await session.commit()
+
+	@staticmethod
+	async def fail(
+		session: AsyncSession,
+		job: ProcessingJob,
+		error_text: str,
+		result: Optional[Dict[str, Any]] = None,
+	) -> None:
+		"""Отметить задачу как завершившуюся ошибкой"""
+		job.status = "error"
+		job.error_text = error_text
+		job.result = result
+		job.finished_at = datetime.now(timezone.utc)
+		await session.commit()
+
+	@staticmethod
+	async def defer(
+		session: AsyncSession, job: ProcessingJob, available_at: datetime, reason: str
+	) -> None:
+		"""Вернуть задачу в очередь до available_at (попытка не засчитывается)"""
+		job.status = "queued"
+		job.available_at = available_at
+		job.attempts = max(job.attempts - 1, 0)
+		job.worker_id = None
+		job.error_text = reason
+		await session.commit()
+
+	@staticmethod
+	async def get_job(
+		session: AsyncSession, user_id: uuid.UUID, job_id: uuid.UUID
+	) -> Optional[ProcessingJob]:
+		"""Получить задачу пользователя"""
+		query = select(ProcessingJob).where(
+			ProcessingJob.id == job_id, ProcessingJob.user_id == user_id
+		)
+		result = await session.execute(query)
+		return result.scalar_one_or_none()
+
+	@staticmethod
+	async def count_by_status(session: AsyncSession, user_id: uuid.UUID) -> Dict[str, int]:
+		"""Количество задач пользователя по статусам"""
+		query = (
+			select(ProcessingJob.status, func.count())
+			.where(ProcessingJob.user_id == user_id)
+			.group_by(ProcessingJob.status)
+		)
+		result = await session.execute(query)
+		return {status: count for status, count in result.all()}
@@ -0,0 +1,334 @@
+"""Разбор дерева боксов MP4/MOV без запуска внешних процессов"""
+import mmap
+import struct
+import sys
+from array import array
+from typing import BinaryIO, Dict, Any, Iterator, Optional, Tuple
+
+
+class Mp4InspectionError(ValueError):
+	"""Файл повреждён, обрезан или не является поддерживаемым MP4/MOV"""
+
+
+class Mp4UnsupportedError(Mp4InspectionError):
+	"""Структура корректна, но разбор боксов не даёт параметров (например, фрагментированный MP4)"""
+
+
+# Бокс: (тип, начало бокса, начало содержимого, конец бокса)
+Box = Tuple[bytes, int, int, int]
+
+
+class Mp4Inspector:
+	"""Быстрая проверка и извлечение параметров видео из MP4/MOV.
+
+	Файл отображается в память (mmap), читаются только заголовки боксов
+	ftyp/moov/mvhd/tkhd/mdhd/hdlr/stsd/stts/stss/stsz — это миллисекунды даже
+	для многогигабайтных файлов. Результат совместим с VideoProcessor.probe_video
+	по ключам, которые использует планирование рендера (длительность, размер
+	кадра, FPS, битрейты видео и аудио).
+	"""
+
+	# Боксы, с которых может начинаться файл ISO-BMFF (MP4) или QuickTime (MOV без ftyp)
+	LEADING_BOXES = {b"ftyp", b"styp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot", b"uuid", b"sidx"}
+
+	@staticmethod
+	def preflight(file_path: str) -> Optional[Dict[str, Any]]:
+		"""Проверка загруженного файла перед сохранением.
+
+		Отклоняет (Mp4InspectionError) только явно повреждённые MP4/MOV:
+		обрезанные боксы, отсутствие moov или mdat, чанки за концом файла.
+		Для файлов других форматов (webm, mkv, avi), фрагментированных MP4 и
+		прочих случаев, которые разбор боксов не покрывает, возвращает None —
+		их проверит ffprobe при обработке.
+		"""
+		with open(file_path, "rb") as f:
+			try:
+				buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			except ValueError:
+				raise Mp4InspectionError("Файл пуст")
+			try:
+				if not Mp4Inspector.is_iso_bmff(buf):
+					return None
+				return Mp4Inspector.inspect_buffer(buf)
+			except Mp4UnsupportedError:
+				return None
+			finally:
+				buf.close()
+
+	@staticmethod
+	def is_iso_bmff(buf) -> bool:
+		"""Начинается ли файл с заголовка бокса MP4/MOV"""
+		if len(buf) < 8:
+			return False
+		size, box_type = struct.unpack_from(">I4s", buf, 0)
+		return box_type in Mp4Inspector.LEADING_BOXES and (size in (0, 1) or size >= 8)
+
+	@staticmethod
+	def inspect(file_path: str) -> Dict[str, Any]:
+		"""Проверить файл по пути"""
+		with open(file_path, "rb") as f:
+			return Mp4Inspector.inspect_fileobj(f)
+
+	@staticmethod
+	def inspect_fileobj(fileobj: BinaryIO) -> Dict[str, Any]:
+		"""Проверить открытый файл (в том числе UploadFile.file)"""
+		if hasattr(fileobj, "flush"):
+			fileobj.flush()
+		try:
+			buf = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:
+			raise Mp4InspectionError("Файл пуст")
+		try:
+			return Mp4Inspector.inspect_buffer(buf)
+		finally:
+			buf.close()
+
+	@staticmethod
+	def iter_boxes(buf, start: int, end: int) -> Iterator[Box]:
+		"""Обойти боксы одного уровня в диапазоне [start, end)"""
+		offset = start
+		while offset < end:
+			if end - offset < 8:
+				raise Mp4InspectionError(f"Обрезанный заголовок бокса по смещению {offset}")
+			size, box_type = struct.unpack_from(">I4s", buf, offset)
+			header_size = 8
+			if size == 1:
+				if end - offset < 16:
+					raise Mp4InspectionError(f"Обрезанный заголовок бокса {box_type!r}")
+				(size,) = struct.unpack_from(">Q", buf, offset + 8)
+				header_size = 16
+			elif size == 0:
+				# Бокс до конца файла
+				size = end - offset
+			if size < header_size:
+				raise Mp4InspectionError(f"Некорректный размер бокса {box_type!r}: {size}")
+			box_end = offset + size
+			if box_end > end:
+				raise Mp4InspectionError(
+					f"Файл обрезан: бокс {box_type!r} заявлен на {size} байт, доступно {end - offset}"
+				)
+			yield box_type, offset, offset + header_size, box_end
+			offset = box_end
+
+	@staticmethod
+	def find_box(buf, start: int, end: int, box_type: bytes) -> Optional[Box]:
+		"""Найти первый бокс нужного типа на уровне [start, end)"""
+		for box in Mp4Inspector.iter_boxes(buf, start, end):
+			if box[0] == box_type:
+				return box
+		return None
+
+	@staticmethod
+	def inspect_buffer(buf) -> Dict[str, Any]:
+		"""Разобрать MP4/MOV из буфера (bytes или mmap)"""
+		try:
+			return Mp4Inspector._inspect_buffer(buf)
+		except struct.error as e:
+			raise Mp4InspectionError(f"Повреждённая структура MP4: {e}") from e
+
+	@staticmethod
+	def _inspect_buffer(buf) -> Dict[str, Any]:
+		"""Разбор буфера без перехвата ошибок struct"""
+		file_size = len(buf)
+		top_level = {}
+		mdat_size = 0
+		for box_type, box_start, payload_start, box_end in Mp4Inspector.iter_boxes(buf, 0, file_size):
+			top_level.setdefault(box_type, (box_type, box_start, payload_start, box_end))
+			if box_type == b"mdat":
+				mdat_size += box_end - payload_start
+
+		if b"moov" not in top_level:
+			raise Mp4InspectionError("Отсутствует бокс moov (файл не дописан или повреждён)")
+		_, _, moov_start, moov_end = top_level[b"moov"]
+		if b"moof" in top_level or Mp4Inspector.find_box(buf, moov_start, moov_end, b"mvex"):
+			# Сэмплы описаны во фрагментах, а не в moov — параметры даст ffprobe
+			raise Mp4UnsupportedError("Фрагментированный MP4")
+		if b"mdat" not in top_level:
+			raise Mp4InspectionError("Отсутствует бокс mdat (нет медиаданных)")
+
+		# В MOV старых версий ftyp нет
+		major_brand = "qt"
+		if b"ftyp" in top_level:
+			_, _, ftyp_payload, _ = top_level[b"ftyp"]
+			major_brand = bytes(buf[ftyp_payload:ftyp_payload + 4]).decode("latin-1")
+
+		mvhd = Mp4Inspector.find_box(buf, moov_start, moov_end, b"mvhd")
+		if not mvhd:
+			raise Mp4InspectionError("Отсутствует бокс mvhd")
+		movie_timescale, movie_duration = Mp4Inspector._parse_mvhd(buf, mvhd)
+
+		video = None
+		audio = None
+		for box in Mp4Inspector.iter_boxes(buf, moov_start, moov_end):
+			if box[0] != b"trak":
+				continue
+			track = Mp4Inspector._parse_trak(buf, box, file_size)
+			if track["handler"] == "vide" and video is None:
+				video = track
+			elif track["handler"] == "soun" and audio is None:
+				audio = track
+
+		if not video:
+			raise Mp4InspectionError("Видео поток не найден")
+		if not video["width"] or not video["height"]:
+			raise Mp4InspectionError("Некорректный размер кадра видео")
+		if not video["fps"]:
+			raise Mp4UnsupportedError("Частота кадров не определяется по stts")
+
+		duration = movie_duration / movie_timescale if movie_timescale else video["duration"]
+		if duration <= 0:
+			raise Mp4UnsupportedError("Длительность не указана в mvhd")
+
+		return {
+			"duration": duration,
+			"width": video["width"],
+			"height": video["height"],
+			"fps": video["fps"],
+			"size": file_size,
+			"bitrate": int(mdat_size * 8 / duration),
+			"format_name": major_brand.strip(),
+			"video_codec": video["codec"],
+			"video_bitrate": video["bitrate"],
+			"gop_seconds": video["gop_frames"] / video["fps"] if video["gop_frames"] and video["fps"] else None,
+			"gop_frames": video["gop_frames"],
+			"has_audio": audio is not None,
+			"audio_codec": audio["codec"] if audio else None,
+			"audio_bitrate": audio["bitrate"] if audio else None,
+			"audio_channels": audio["channels"] if audio else None,
+			"audio_sample_rate": audio["sample_rate"] if audio else None,
+		}
+
+	@staticmethod
+	def _parse_mvhd(buf, box: Box) -> Tuple[int, int]:
+		"""timescale и duration из mvhd"""
+		_, _, payload, end = box
+		version = buf[payload]
+		if version == 1:
+			timescale, duration = struct.unpack_from(">IQ", buf, payload + 20)
+		else:
+			timescale, duration = struct.unpack_from(">II", buf, payload + 12)
+		return timescale, duration
+
+	@staticmethod
+	def _parse_trak(buf, trak: Box, file_size: int) -> Dict[str, Any]:
+		"""Параметры дорожки: тип, размер кадра, кодек, FPS, GOP"""
+		_, _, trak_start, trak_end = trak
+		track = {
+			"handler": None,
+			"width": 0,
+			"height": 0,
+			"codec": None,
+			"fps": 0.0,
+			"duration": 0.0,
+			"gop_frames": None,
+			"bitrate": None,
+			"channels": None,
+			"sample_rate": None,
+		}
+
+		tkhd = Mp4Inspector.find_box(buf, trak_start, trak_end, b"tkhd")
+		if tkhd:
+			_, _, payload, _ = tkhd
+			# Размер кадра — последние 8 байт tkhd в формате 16.16
+			offset = payload + (88 if buf[payload] == 1 else 76)
+			width, height = struct.unpack_from(">II", buf, offset)
+			track["width"] = width >> 16
+			track["height"] = height >> 16
+
+		mdia = Mp4Inspector.find_box(buf, trak_start, trak_end, b"mdia")
+		if not mdia:
+			return track
+		_, _, mdia_start, mdia_end = mdia
+
+		hdlr = Mp4Inspector.find_box(buf, mdia_start, mdia_end, b"hdlr")
+		if hdlr:
+			track["handler"] = bytes(buf[hdlr[2] + 8:hdlr[2] + 12]).decode("latin-1")
+
+		timescale = 0
+		mdhd = Mp4Inspector.find_box(buf, mdia_start, mdia_end, b"mdhd")
+		if mdhd:
+			_, _, payload, _ = mdhd
+			if buf[payload] == 1:
+				timescale, duration = struct.unpack_from(">IQ", buf, payload + 20)
+			else:
+				timescale, duration = struct.unpack_from(">II", buf, payload + 12)
+			track["duration"] = duration / timescale if timescale else 0.0
+
+		minf = Mp4Inspector.find_box(buf, mdia_start, mdia_end, b"minf")
+		stbl = Mp4Inspector.find_box(buf, minf[2], minf[3], b"stbl") if minf else None
+		if not stbl:
+			return track
+		_, _, stbl_start, stbl_end = stbl
+
+		stsd = Mp4Inspector.find_box(buf, stbl_start, stbl_end, b"stsd")
+		if stsd and stsd[3] - stsd[2] >= 16:
+			track["codec"] = bytes(buf[stsd[2] + 12:stsd[2] + 16]).decode("latin-1")
+		if stsd and track["handler"] == "soun" and stsd[3] - stsd[2] >= 44:
+			# AudioSampleEntry: channelcount и samplerate (16.16) после 8 байт заголовка и 8 байт версии
+			entry = stsd[2] + 8
+			(track["channels"],) = struct.unpack_from(">H", buf, entry + 24)
+			(sample_rate,) = struct.unpack_from(">I", buf, entry + 32)
+			track["sample_rate"] = sample_rate >> 16
+
+		sample_count = 0
+		stts = Mp4Inspector.find_box(buf, stbl_start, stbl_end, b"stts")
+		if stts:
+			_, _, payload, end = stts
+			(entry_count,) = struct.unpack_from(">I", buf, payload + 4)
+			if payload + 8 + entry_count * 8 > end:
+				raise Mp4InspectionError("Повреждена таблица stts")
+			total_delta = 0
+			for index in range(entry_count):
+				count, delta = struct.unpack_from(">II", buf, payload + 8 + index * 8)
+				sample_count += count
+				total_delta += count * delta
+			if total_delta and timescale:
+				track["fps"] = sample_count * timescale / total_delta
+
+		stsz = Mp4Inspector.find_box(buf, stbl_start, stbl_end, b"stsz")
+		if stsz and track["duration"]:
+			track["bitrate"] = int(Mp4Inspector._sample_bytes(buf, stsz) * 8 / track["duration"])
+
+		stss = Mp4Inspector.find_box(buf, stbl_start, stbl_end, b"stss")
+		if stss:
+			(sync_count,) = struct.unpack_from(">I", buf, stss[2] + 4)
+			if sync_count:
+				track["gop_frames"] = round(sample_count / sync_count)
+
+		Mp4Inspector._check_chunk_offsets(buf, stbl_start, stbl_end, file_size)
+		return track
+
+	@staticmethod
+	def _sample_bytes(buf, stsz: Box) -> int:
+		"""Суммарный размер сэмплов дорожки по таблице stsz"""
+		_, _, payload, end = stsz
+		sample_size, sample_count = struct.unpack_from(">II", buf, payload + 4)
+		if sample_size:
+			return sample_size * sample_count
+		table = payload + 12
+		if table + sample_count * 4 > end:
+			raise Mp4InspectionError("Повреждена таблица stsz")
+		sizes = array("I")
+		sizes.frombytes(bytes(buf[table:table + sample_count * 4]))
+		if sys.byteorder == "little":
+			sizes.byteswap()
+		return sum(sizes)
+
+	@staticmethod
+	def _check_chunk_offsets(buf, stbl_start: int, stbl_end: int, file_size: int) -> None:
+		"""Проверить, что последний чанк дорожки лежит внутри файла"""
+		for box_type, entry_format, entry_size in ((b"stco", ">I", 4), (b"co64", ">Q", 8)):
+			box = Mp4Inspector.find_box(buf, stbl_start, stbl_end, box_type)
+			if not box:
+				continue
+			_, _, payload, end = box
+			(entry_count,) = struct.unpack_from(">I", buf, payload + 4)
+			if not entry_count:
+				return
+			if payload + 8 + entry_count * entry_size > end:
+				raise Mp4InspectionError(f"Повреждена таблица {box_type.decode()}")
+			last_entry = payload + 8 + (entry_count - 1) * entry_size
+			(last_offset,) = struct.unpack_from(entry_format, buf, last_entry)
+			if last_offset >= file_size:
+				raise Mp4InspectionError("Файл обрезан: медиаданные выходят за конец файла")
+			return
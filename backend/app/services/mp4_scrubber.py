@@ -0,0 +1,123 @@
+"""Удаление метаданных MP4/MOV на уровне атомов, без перемуксовки"""
+import mmap
+from pathlib import Path
+from typing import Dict, Any, List
+
+from app.services.mp4_inspector import Mp4Inspector, Mp4InspectionError, Box
+from app.services.storage_service import StorageService
+
+# UUID бокса с XMP-пакетом (Adobe XMP Specification Part 3)
+XMP_UUID = bytes.fromhex("be7acfcb97a942e89c71999491e3afac")
+
+
+class Mp4MetadataScrubber:
+	"""Нейтрализация метаданных прямо в файле через mmap.
+
+	Атомы udta/meta/ilst/XMP_/©xxx переименовываются во free и зануляются,
+	время создания/изменения в mvhd/tkhd/mdhd сбрасывается в 0. Размеры боксов
+	не меняются, поэтому смещения чанков (stco/co64) остаются верными и mdat
+	не переписывается. Память — только страницы moov, затронутые mmap.
+	"""
+
+	# Атомы с метаданными, которые целиком заменяются на free
+	METADATA_BOXES = {b"udta", b"meta", b"ilst", b"XMP_"}
+	# Боксы-контейнеры, в которых ищутся метаданные
+	CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf"}
+	# Боксы с полями creation_time/modification_time
+	TIMESTAMP_BOXES = {b"mvhd", b"tkhd", b"mdhd"}
+
+	@staticmethod
+	def scrub_in_place(file_path: str) -> Dict[str, Any]:
+		"""Очистить файл на месте. Возвращает отчёт об изменениях"""
+		report = {"removed": [], "timestamps_reset": []}
+		with open(file_path, "r+b") as f:
+			buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE)
+			try:
+				Mp4MetadataScrubber._scrub_level(buf, 0, len(buf), "", report)
+				buf.flush()
+			finally:
+				buf.close()
+		return report
+
+	@staticmethod
+	def scrub_copy(input_path: str, output_path: str) -> Dict[str, Any]:
+		"""Очищенная копия файла.
+
+		Копия делается через reflink или copy_file_range (StorageService.copy_file),
+		без чтения mdat в память; затем очищается на месте — переписываются
+		только страницы moov.
+		"""
+		StorageService.copy_file(Path(input_path), Path(output_path))
+		return Mp4MetadataScrubber.scrub_in_place(output_path)
+
+	@staticmethod
+	def find_metadata(file_path: str) -> List[str]:
+		"""Пути оставшихся атомов с метаданными и ненулевых временных меток.
+
+		Пустой список означает, что файл не содержит метаданных.
+		"""
+		found: List[str] = []
+		with open(file_path, "rb") as f:
+			buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			try:
+				Mp4MetadataScrubber._find_level(buf, 0, len(buf), "", found)
+			finally:
+				buf.close()
+		return found
+
+	@staticmethod
+	def _is_metadata(buf, box: Box) -> bool:
+		"""Является ли бокс атомом метаданных"""
+		box_type, _, payload, end = box
+		if box_type in Mp4MetadataScrubber.METADATA_BOXES or box_type[:1] == b"\xa9":
+			return True
+		return box_type == b"uuid" and end - payload >= 16 and bytes(buf[payload:payload + 16]) == XMP_UUID
+
+	@staticmethod
+	def _timestamp_fields(buf, box: Box) -> List[tuple]:
+		"""Смещения и размеры полей creation_time/modification_time"""
+		_, _, payload, end = box
+		if buf[payload] == 1:
+			fields = [(payload + 4, 8), (payload + 12, 8)]
+		else:
+			fields = [(payload + 4, 4), (payload + 8, 4)]
+		if fields[-1][0] + fields[-1][1] > end:
+			raise Mp4InspectionError("Повреждённый заголовок mvhd/tkhd/mdhd")
+		return fields
+
+	@staticmethod
+	def _scrub_level(buf, start: int, end: int, path: str, report: Dict[str, Any]) -> None:
+		"""Очистить боксы одного уровня и рекурсивно — вложенные контейнеры"""
+		for box in Mp4Inspector.iter_boxes(buf, start, end):
+			box_type, box_start, payload, box_end = box
+			name = f"{path}/{box_type.decode('latin-1')}"
+
+			if Mp4MetadataScrubber._is_metadata(buf, box):
+				# Тот же размер, новый тип — смещения в файле не меняются
+				header_type_offset = box_start + 4
+				buf[header_type_offset:header_type_offset + 4] = b"free"
+				buf[payload:box_end] = bytes(box_end - payload)
+				report["removed"].append(name)
+			elif box_type in Mp4MetadataScrubber.TIMESTAMP_BOXES:
+				for offset, size in Mp4MetadataScrubber._timestamp_fields(buf, box):
+					buf[offset:offset + size] = bytes(size)
+				report["timestamps_reset"].append(name)
+			elif box_type in Mp4MetadataScrubber.CONTAINER_BOXES:
+				Mp4MetadataScrubber._scrub_level(buf, payload, box_end, name, report)
+
+	@staticmethod
+	def _find_level(buf, start: int, end: int, path: str, found: List[str]) -> None:
+		"""Найти метаданные на одном уровне и во вложенных контейнерах"""
+		for box in Mp4Inspector.iter_boxes(buf, start, end):
+			box_type, _, payload, box_end = box
+			name = f"{path}/{box_type.decode('latin-1')}"
+
+			if Mp4MetadataScrubber._is_metadata(buf, box):
+				found.append(name)
+			elif box_type in Mp4MetadataScrubber.TIMESTAMP_BOXES:
+				for offset, size in Mp4MetadataScrubber._timestamp_fields(buf, box):
+					if any(buf[offset:offset + size]):
+						found.append(f"{name}@time")
+						break
+			elif box_type in Mp4MetadataScrubber.CONTAINER_BOXES:
+				Mp4MetadataScrubber._find_level(buf, payload, box_end, name, found)
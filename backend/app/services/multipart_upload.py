@@ -0,0 +1,186 @@
+"""Потоковый разбор multipart/form-data прямо в хранилище"""
+import asyncio
+import hashlib
+import os
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from multipart.multipart import MultipartParser, parse_options_header
+from multipart.exceptions import MultipartParseError
+
+
+class UploadTooLargeError(ValueError):
+	"""Тело запроса или его часть больше допустимого — ответ 413 без дочитывания тела"""
+
+
+class MultipartUploadReader:
+	"""Разбор тела запроса без промежуточного SpooledTemporaryFile.
+
+	Файловые части пишутся сразу во временные файлы на файловой системе
+	хранилища (staging_factory), попутно считаются SHA-256 и размер. Разбор,
+	хеширование и запись выполняются в пуле потоков, event loop не блокируется.
+	Файл больше max_size, текстовое поле больше MAX_FIELD_SIZE или тело
+	больше max_total_size прерывают чтение UploadTooLargeError сразу,
+	остаток тела не принимается.
+	"""
+
+	# Текстовые поля копятся в памяти — их размер ограничен
+	MAX_FIELD_SIZE = 64 * 1024
+
+	def __init__(
+		self,
+		content_type: str,
+		max_size: int,
+		staging_factory: Callable[[], Path],
+		max_total_size: Optional[int] = None,
+	):
+		content_type, params = parse_options_header(content_type or "")
+		boundary = params.get(b"boundary")
+		if content_type.strip().lower() != b"multipart/form-data" or not boundary:
+			raise ValueError("Ожидается тело запроса multipart/form-data")
+
+		self.max_size = max_size
+		self.max_total_size = max_total_size
+		self.received = 0
+		self.staging_factory = staging_factory
+		self.fields: Dict[str, List[str]] = {}
+		self.files: List[Dict[str, Any]] = []
+
+		self._header_field = bytearray()
+		self._header_value = bytearray()
+		self._headers: Dict[bytes, bytes] = {}
+		self._part: Optional[Dict[str, Any]] = None
+		self._field_data = bytearray()
+		self._file: Optional[BinaryIO] = None
+		self._digest = None
+
+		self._parser = MultipartParser(boundary, {
+			"on_part_begin": self._on_part_begin,
+			"on_header_field": self._on_header_field,
+			"on_header_value": self._on_header_value,
+			"on_header_end": self._on_header_end,
+			"on_headers_finished": self._on_headers_finished,
+			"on_part_data": self._on_part_data,
+			"on_part_end": self._on_part_end,
+		})
+
+	async def read(
+		self, stream: AsyncIterator[bytes]
+	) -> Tuple[Dict[str, List[str]], List[Dict[str, Any]]]:
+		"""Прочитать тело запроса.
+
+		Возвращает текстовые поля и список файлов вида
+		{"field", "filename", "path", "content_hash", "size_bytes"} либо
+		{"field", "filename", "error"} для пустых файлов.
+		"""
+		try:
+			async for chunk in stream:
+				if not chunk:
+					continue
+				self.received += len(chunk)
+				if self.max_total_size is not None and self.received > self.max_total_size:
+					raise UploadTooLargeError(
+						f"Тело запроса превышает максимальный размер {self.max_total_size} байт"
+					)
+				await asyncio.to_thread(self._parser.write, chunk)
+			await asyncio.to_thread(self._parser.finalize)
+			if self._part is not None:
+				raise ValueError("Тело запроса обрезано")
+		except BaseException as e:
+			# Не оставляем принятые файлы при обрыве соединения или ошибке разбора
+			self._discard_current()
+			self.cleanup()
+			if isinstance(e, MultipartParseError):
+				raise ValueError(f"Некорректное тело multipart: {e}") from e
+			raise
+		return self.fields, self.files
+
+	def cleanup(self) -> None:
+		"""Удалить временные файлы, которые не были перенесены в хранилище"""
+		for item in self.files:
+			path = item.get("path")
+			if path and os.path.exists(path):
+				os.remove(path)
+
+	def _on_part_begin(self) -> None:
+		self._headers = {}
+		self._part = None
+
+	def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+		self._header_field += data[start:end]
+
+	def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+		self._header_value += data[start:end]
+
+	def _on_header_end(self) -> None:
+		self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+		self._header_field.clear()
+		self._header_value.clear()
+
+	def _on_headers_finished(self) -> None:
+		_, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+		name = options.get(b"name", b"").decode("utf-8", errors="replace")
+		filename = options.get(b"filename")
+		self._field_data.clear()
+
+		if filename is None:
+			self._part = {"field": name}
+			return
+
+		path = self.staging_factory()
+		self._part = {
+			"field": name,
+			"filename": filename.decode("utf-8", errors="replace"),
+			"path": str(path),
+			"size_bytes": 0,
+		}
+		self._file = open(path, "wb")
+		self._digest = hashlib.sha256()
+
+	def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+		part = self._part
+		if "filename" not in part:
+			if len(self._field_data) + end - start > self.MAX_FIELD_SIZE:
+				raise UploadTooLargeError(
+					f"Поле {part['field']} превышает максимальный размер {self.MAX_FIELD_SIZE} байт"
+				)
+			self._field_data += data[start:end]
+			return
+
+		part["size_bytes"] += end - start
+		if part["size_bytes"] > self.max_size:
+			# read удалит недописанный файл и уже принятые части
+			raise UploadTooLargeError(
+				f"Файл {part['filename']} превышает максимальный размер {self.max_size} байт"
+			)
+
+		chunk = data[start:end]
+		self._digest.update(chunk)
+		self._file.write(chunk)
+
+	def _on_part_end(self) -> None:
+		part = self._part
+		self._part = None
+		if "filename" not in part:
+			self.fields.setdefault(part["field"], []).append(
+				self._field_data.decode("utf-8", errors="replace")
+			)
+			return
+
+		self._file.close()
+		self._file = None
+		if part["size_bytes"] == 0:
+			os.remove(part.pop("path"))
+			part["error"] = f"Файл {part['filename']} пуст"
+		else:
+			part["content_hash"] = self._digest.hexdigest()
+		self.files.append(part)
+
+	def _discard_current(self) -> None:
+		"""Закрыть и удалить недописанный файл текущей части"""
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+			path = (self._part or {}).get("path")
+			if path and os.path.exists(path):
+				os.remove(path)
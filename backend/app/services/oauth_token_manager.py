@@ -0,0 +1,166 @@
+"""Общий менеджер OAuth access token для сервисов Google (YouTube, Drive, Ads)"""
+import asyncio
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import Integration
+from app.services.integration_service import IntegrationService
+
+
+class OAuthTokenManager:
+	"""Access token из кэша процесса до момента незадолго до истечения.
+
+	Просроченный (или без известного срока) токен обновляется по refresh
+	token один раз: параллельные вызовы для одной учётной записи ждут
+	общего обновления (single-flight на asyncio.Lock). Новый токен и срок
+	записываются в интеграцию через IntegrationService.create_or_update_integration,
+	поэтому следующий вызов — в том числе в другом процессе — не ходит в Google.
+	Отказ Google обновить токен (RefreshError: отозван, истёк refresh token)
+	помечает интеграцию невалидной.
+	"""
+
+	# Поля расшифрованных credentials, которые не относятся к токенам интеграции
+	NON_TOKEN_FIELDS = ("integration_id", "account_info", "oauth_config", "developer_token", "login_customer_id")
+
+	_tokens: Dict[str, Dict[str, Any]] = {}
+	_locks: Dict[str, asyncio.Lock] = {}
+
+	@staticmethod
+	async def get_credentials(credentials: dict) -> dict:
+		"""Копия credentials с действующим access token (token, expiry)"""
+		key = OAuthTokenManager._key(credentials)
+		cached = OAuthTokenManager._get_cached(key)
+		if cached:
+			return {**credentials, **cached}
+
+		expires_at = OAuthTokenManager._parse_expiry(credentials.get("expiry"))
+		if credentials.get("token") and OAuthTokenManager._is_fresh(expires_at):
+			OAuthTokenManager._remember(key, credentials["token"], expires_at)
+			return credentials
+
+		lock = OAuthTokenManager._locks.setdefault(key, asyncio.Lock())
+		async with lock:
+			# Пока ждали блокировку, токен мог обновить другой вызов
+			cached = OAuthTokenManager._get_cached(key)
+			if cached:
+				return {**credentials, **cached}
+
+			creds = Credentials.from_authorized_user_info(credentials)
+			try:
+				await asyncio.to_thread(creds.refresh, Request())
+			except RefreshError:
+				await OAuthTokenManager._mark_invalid(credentials)
+				raise
+			expires_at = creds.expiry.replace(tzinfo=timezone.utc) if creds.expiry else None
+			fresh = OAuthTokenManager._remember(key, creds.token, expires_at)
+			print("🔑 OAuth access token обновлён")
+			await OAuthTokenManager._write_back({**credentials, **fresh})
+			return {**credentials, **fresh}
+
+	@staticmethod
+	async def get_access_token(credentials: dict) -> str:
+		"""Действующий access token"""
+		return (await OAuthTokenManager.get_credentials(credentials))["token"]
+
+	@staticmethod
+	def invalidate(credentials: dict) -> None:
+		"""Забыть закэшированный токен (например, API ответил 401)"""
+		OAuthTokenManager._tokens.pop(OAuthTokenManager._key(credentials), None)
+
+	@staticmethod
+	def _key(credentials: dict) -> str:
+		"""Учётная запись: OAuth-клиент и refresh token"""
+		material = json.dumps([credentials.get("client_id"), credentials.get("refresh_token")])
+		return hashlib.sha256(material.encode()).hexdigest()
+
+	@staticmethod
+	def _is_fresh(expires_at: Optional[datetime]) -> bool:
+		"""Токен действует дольше OAUTH_TOKEN_REFRESH_MARGIN"""
+		if expires_at is None:
+			return False
+		margin = timedelta(seconds=settings.OAUTH_TOKEN_REFRESH_MARGIN)
+		return expires_at - margin > datetime.now(timezone.utc)
+
+	@staticmethod
+	def _get_cached(key: str) -> Optional[Dict[str, Any]]:
+		entry = OAuthTokenManager._tokens.get(key)
+		if not entry or not OAuthTokenManager._is_fresh(entry["expires_at"]):
+			return None
+		return {"token": entry["token"], "expiry": entry["expiry"]}
+
+	@staticmethod
+	def _remember(key: str, token: str, expires_at: Optional[datetime]) -> Dict[str, Any]:
+		"""Закэшировать токен; возвращает поля token/expiry в формате credentials"""
+		expiry = OAuthTokenManager._format_expiry(expires_at)
+		OAuthTokenManager._tokens[key] = {"token": token, "expiry": expiry, "expires_at": expires_at}
+		return {"token": token, "expiry": expiry}
+
+	@staticmethod
+	def _parse_expiry(value: Optional[str]) -> Optional[datetime]:
+		"""Срок токена из credentials (формат google-auth: ISO 8601 UTC с суффиксом Z)"""
+		if not value:
+			return None
+		try:
+			return datetime.strptime(value.rstrip("Z").split(".")[0], "%Y-%m-%dT%H:%M:%S").replace(
+				tzinfo=timezone.utc
+			)
+		except ValueError:
+			return None
+
+	@staticmethod
+	def _format_expiry(expires_at: Optional[datetime]) -> Optional[str]:
+		if expires_at is None:
+			return None
+		return expires_at.astimezone(timezone.utc).replace(tzinfo=None).isoformat() + "Z"
+
+	@staticmethod
+	async def _write_back(credentials: dict) -> None:
+		"""Сохранить обновлённый токен в интеграцию, из которой взяты credentials"""
+		integration_id = credentials.get("integration_id")
+		if not integration_id:
+			return
+		tokens = {
+			field: value for field, value in credentials.items()
+			if field not in OAuthTokenManager.NON_TOKEN_FIELDS
+		}
+		try:
+			async with AsyncSessionLocal() as session:
+				integration = await session.get(Integration, uuid.UUID(integration_id))
+				if not integration:
+					return
+				await IntegrationService.create_or_update_integration(
+					session,
+					integration.user_id,
+					integration.kind,
+					tokens,
+					is_valid=integration.is_valid,
+					integration=integration,
+				)
+		except Exception as e:
+			# Токен уже получен — ошибка сохранения не должна ломать вызов
+			print(f"⚠️ Не удалось сохранить обновлённый токен интеграции {integration_id}: {e}")
+
+	@staticmethod
+	async def _mark_invalid(credentials: dict) -> None:
+		"""Пометить интеграцию, из которой взяты credentials, невалидной"""
+		integration_id = credentials.get("integration_id")
+		if not integration_id:
+			return
+		try:
+			async with AsyncSessionLocal() as session:
+				integration = await session.get(Integration, uuid.UUID(integration_id))
+				if integration and integration.is_valid:
+					integration.is_valid = False
+					await session.commit()
+					print(f"⚠️ Интеграция {integration_id} помечена невалидной: Google отказал в обновлении токена")
+		except Exception as e:
+			print(f"⚠️ Не удалось пометить интеграцию {integration_id} невалидной: {e}")
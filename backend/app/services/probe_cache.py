@@ -0,0 +1,57 @@
+"""Кэш результатов ffprobe по хешу содержимого исходника"""
+from typing import Dict, Any, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import SourceProbe
+from app.services.video_processor import VideoProcessor
+
+
+class ProbeCacheService:
+	"""Информация о видео, сохранённая в source_probes.
+
+	Одинаковое содержимое имеет одинаковый SHA-256, поэтому повторные операции
+	над известным исходником (повторы, перерендеры, повторные загрузки) не
+	запускают ffprobe. В кэш попадает только полный результат ffprobe;
+	сведения из разбора боксов при загрузке (Mp4Inspector.preflight) в другом
+	формате и передаются задаче через payload, минуя кэш.
+	"""
+
+	@staticmethod
+	async def store(
+		session: AsyncSession,
+		content_hash: str,
+		info: Dict[str, Any],
+		raw_probe: Optional[Dict[str, Any]] = None,
+	) -> None:
+		"""Сохранить информацию в кэш (без коммита); существующая запись не меняется"""
+		# Тот же файл мог параллельно прозондировать другой воркер
+		await session.execute(
+			insert(SourceProbe)
+			.values(content_hash=content_hash, info=info, raw_probe=raw_probe)
+			.on_conflict_do_nothing(index_elements=["content_hash"])
+		)
+
+	@staticmethod
+	async def get_cached(session: AsyncSession, content_hash: str) -> Optional[Dict[str, Any]]:
+		"""Получить информацию из кэша"""
+		probe = await session.get(SourceProbe, content_hash)
+		return dict(probe.info) if probe else None
+
+	@staticmethod
+	async def get_video_info(
+		session: AsyncSession, file_path: str, content_hash: Optional[str] = None
+	) -> Dict[str, Any]:
+		"""Получить информацию о видео из кэша или через ffprobe с сохранением в кэш"""
+		if content_hash:
+			cached = await ProbeCacheService.get_cached(session, content_hash)
+			if cached:
+				return cached
+
+		info, raw_probe = await VideoProcessor.probe_video(file_path)
+
+		if content_hash:
+			await ProbeCacheService.store(session, content_hash, info, raw_probe)
+			await session.commit()
+
+		return info
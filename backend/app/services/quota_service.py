@@ -0,0 +1,293 @@
+"""Учёт квоты YouTube Data API по каналам и распределение загрузок между ними"""
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import Integration, SourceAsset, VideoVersion, YouTubeQuota, YouTubeUpload
+from app.services.integration_service import IntegrationService
+
+# Суточная квота YouTube сбрасывается в полночь по тихоокеанскому времени
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+class QuotaExhaustedError(ValueError):
+	"""Ни у одного канала пользователя нет квоты; работу нужно отложить до retry_at"""
+
+	def __init__(self, retry_at: datetime):
+		self.retry_at = retry_at
+		super().__init__(
+			f"Квота YouTube исчерпана на всех каналах, загрузка отложена до {retry_at.isoformat()}"
+		)
+
+
+class QuotaService:
+	"""Token bucket квоты на каждую интеграцию YouTube.
+
+	Корзина вмещает YOUTUBE_DAILY_QUOTA единиц и равномерно пополняется за
+	сутки, загрузка (videos.insert) списывает YOUTUBE_UPLOAD_QUOTA_COST.
+	Состояние корзин хранится в БД и меняется под блокировкой строк, поэтому
+	общее для всех воркеров. Загрузка уходит на канал с наибольшим остатком;
+	если квоты нет ни у одного канала, бросается QuotaExhaustedError с
+	временем, когда её хватит, — задача откладывается, а не падает. Ответ
+	YouTube quotaExceeded блокирует канал до сброса суточной квоты.
+	"""
+
+	# Причины ошибок YouTube API, означающие исчерпание квоты канала
+	QUOTA_REASONS = ("quotaExceeded", "dailyLimitExceeded", "uploadLimitExceeded")
+
+	@staticmethod
+	async def acquire(
+		session: AsyncSession, user_id: uuid.UUID, cost: Optional[int] = None
+	) -> Tuple[Integration, Dict[str, Any]]:
+		"""Выбрать канал для загрузки и списать с него cost единиц.
+
+		Возвращает (интеграция, расшифрованные credentials).
+		"""
+		cost = QuotaService._cost(cost)
+		candidates = await QuotaService._get_channels(session, user_id)
+		buckets = await QuotaService._lock_buckets(session, [integration.id for integration, _ in candidates])
+		now = datetime.now(timezone.utc)
+
+		best = None
+		retry_at = None
+		for integration, credentials in candidates:
+			bucket = buckets[integration.id]
+			QuotaService._refill(bucket, now)
+			ready_at = QuotaService._ready_at(bucket, cost, now)
+			if ready_at <= now:
+				if best is None or bucket.tokens > best[2].tokens:
+					best = (integration, credentials, bucket)
+			elif retry_at is None or ready_at < retry_at:
+				retry_at = ready_at
+
+		if best is None:
+			await session.commit()
+			raise QuotaExhaustedError(retry_at)
+
+		integration, credentials, bucket = best
+		bucket.tokens -= cost
+		bucket.used_today += cost
+		await session.commit()
+		return integration, credentials
+
+	@staticmethod
+	async def ensure_available(session: AsyncSession, user_id: uuid.UUID, cost: Optional[int] = None) -> None:
+		"""Проверить, что хотя бы один канал может принять загрузку прямо сейчас.
+
+		Ничего не списывает; бросает QuotaExhaustedError, если квоты нет.
+		"""
+		cost = QuotaService._cost(cost)
+		candidates = await QuotaService._get_channels(session, user_id)
+		buckets = await QuotaService._load_buckets(session, [integration.id for integration, _ in candidates])
+		now = datetime.now(timezone.utc)
+		ready_at = min(
+			QuotaService._ready_at(QuotaService._refilled(bucket, now), cost, now)
+			for bucket in buckets.values()
+		)
+		if ready_at > now:
+			raise QuotaExhaustedError(ready_at)
+
+	@staticmethod
+	async def record_exceeded(session: AsyncSession, integration_id: uuid.UUID) -> datetime:
+		"""YouTube ответил quotaExceeded: обнулить корзину и заблокировать канал до сброса квоты"""
+		buckets = await QuotaService._lock_buckets(session, [integration_id])
+		bucket = buckets[integration_id]
+		now = datetime.now(timezone.utc)
+		QuotaService._refill(bucket, now)
+		bucket.tokens = 0.0
+		bucket.blocked_until = QuotaService.next_reset(now)
+		await session.commit()
+		print(f"⚠️ Квота YouTube канала {integration_id} исчерпана до {bucket.blocked_until.isoformat()}")
+		return bucket.blocked_until
+
+	@staticmethod
+	async def get_status(session: AsyncSession, user_id: uuid.UUID) -> Dict[str, Any]:
+		"""Остаток квоты по каналам и прогноз её исчерпания при текущем расходе"""
+		cost = QuotaService._cost(None)
+		integrations = await IntegrationService.get_valid_integrations(session, user_id, "youtube")
+		buckets = await QuotaService._load_buckets(session, [integration.id for integration in integrations])
+		now = datetime.now(timezone.utc)
+		refill_rate = QuotaService._refill_rate()
+		elapsed = max((now - QuotaService._day_start(now)).total_seconds(), 60.0)
+
+		channels: List[Dict[str, Any]] = []
+		total_remaining = 0.0
+		total_uploads = 0
+		total_rate = 0.0
+		for integration in integrations:
+			bucket = QuotaService._refilled(buckets[integration.id], now)
+			blocked = bool(bucket.blocked_until and bucket.blocked_until > now)
+			remaining = 0.0 if blocked else bucket.tokens
+			# Средний расход с начала суток квоты против пополнения корзины
+			usage_rate = bucket.used_today / elapsed
+			channels.append({
+				"integration_id": integration.id,
+				"account_name": IntegrationService.get_account_name(integration),
+				"capacity": settings.YOUTUBE_DAILY_QUOTA,
+				"remaining": int(remaining),
+				"used_today": bucket.used_today,
+				"uploads_available": int(remaining // cost),
+				"blocked_until": bucket.blocked_until if blocked else None,
+				"next_upload_at": QuotaService._ready_at(bucket, cost, now),
+				"projected_exhaustion_at": QuotaService._project(remaining, usage_rate, refill_rate, now),
+			})
+			total_remaining += remaining
+			total_uploads += int(remaining // cost)
+			if not blocked:
+				total_rate += usage_rate - refill_rate
+
+		return {
+			"upload_cost": cost,
+			"channels": channels,
+			"remaining": int(total_remaining),
+			"uploads_available": total_uploads,
+			"pending_uploads": await QuotaService._count_pending_uploads(session, user_id),
+			"next_upload_at": min((channel["next_upload_at"] for channel in channels), default=None),
+			"projected_exhaustion_at": QuotaService._project(total_remaining, total_rate, 0.0, now),
+			"resets_at": QuotaService.next_reset(now),
+		}
+
+	@staticmethod
+	async def _get_channels(
+		session: AsyncSession, user_id: uuid.UUID
+	) -> List[Tuple[Integration, Dict[str, Any]]]:
+		"""Действующие каналы YouTube пользователя с расшифрованными credentials"""
+		channels = []
+		for integration in await IntegrationService.get_valid_integrations(session, user_id, "youtube"):
+			credentials = await IntegrationService.decrypt_auth_data(session, integration)
+			if credentials:
+				channels.append((integration, credentials))
+		if not channels:
+			raise ValueError(
+				"YouTube интеграция не найдена или не активна. Пожалуйста, подключите YouTube в настройках интеграций."
+			)
+		return channels
+
+	@staticmethod
+	async def _load_buckets(
+		session: AsyncSession, integration_ids: List[uuid.UUID], lock: bool = False
+	) -> Dict[uuid.UUID, YouTubeQuota]:
+		"""Корзины квоты каналов; отсутствующие создаются полными"""
+		if not integration_ids:
+			return {}
+		now = datetime.now(timezone.utc)
+		await session.execute(
+			insert(YouTubeQuota)
+			.values([
+				{
+					"integration_id": integration_id,
+					"tokens": float(settings.YOUTUBE_DAILY_QUOTA),
+					"quota_day": QuotaService._quota_day(now),
+					"used_today": 0,
+					"updated_at": now,
+				}
+				for integration_id in integration_ids
+			])
+			.on_conflict_do_nothing(index_elements=["integration_id"])
+		)
+		query = (
+			select(YouTubeQuota)
+			.where(YouTubeQuota.integration_id.in_(integration_ids))
+			# Единый порядок блокировок исключает взаимоблокировки между воркерами
+			.order_by(YouTubeQuota.integration_id)
+			.execution_options(populate_existing=True)
+		)
+		if lock:
+			query = query.with_for_update()
+		result = await session.execute(query)
+		return {bucket.integration_id: bucket for bucket in result.scalars().all()}
+
+	@staticmethod
+	async def _lock_buckets(
+		session: AsyncSession, integration_ids: List[uuid.UUID]
+	) -> Dict[uuid.UUID, YouTubeQuota]:
+		"""Корзины квоты под блокировкой строк до конца транзакции"""
+		return await QuotaService._load_buckets(session, integration_ids, lock=True)
+
+	@staticmethod
+	def _refilled(bucket: YouTubeQuota, now: datetime) -> YouTubeQuota:
+		"""Состояние корзины на момент now (без изменения исходного объекта)"""
+		state = YouTubeQuota(
+			integration_id=bucket.integration_id,
+			tokens=bucket.tokens,
+			quota_day=bucket.quota_day,
+			used_today=bucket.used_today,
+			blocked_until=bucket.blocked_until,
+			updated_at=bucket.updated_at,
+		)
+		QuotaService._refill(state, now)
+		return state
+
+	@staticmethod
+	def _refill(bucket: YouTubeQuota, now: datetime) -> None:
+		"""Пополнить корзину за время с последнего обновления и начать новые сутки квоты"""
+		elapsed = max((now - bucket.updated_at).total_seconds(), 0.0)
+		bucket.tokens = min(
+			float(settings.YOUTUBE_DAILY_QUOTA), bucket.tokens + elapsed * QuotaService._refill_rate()
+		)
+		bucket.updated_at = now
+		today = QuotaService._quota_day(now)
+		if bucket.quota_day != today:
+			bucket.quota_day = today
+			bucket.used_today = 0
+		if bucket.blocked_until and bucket.blocked_until <= now:
+			bucket.blocked_until = None
+
+	@staticmethod
+	def _ready_at(bucket: YouTubeQuota, cost: int, now: datetime) -> datetime:
+		"""Когда в (уже пополненной) корзине будет cost единиц"""
+		if bucket.blocked_until and bucket.blocked_until > now:
+			return bucket.blocked_until
+		if bucket.tokens >= cost:
+			return now
+		return now + timedelta(seconds=(cost - bucket.tokens) / QuotaService._refill_rate())
+
+	@staticmethod
+	def _project(remaining: float, usage_rate: float, refill_rate: float, now: datetime) -> Optional[datetime]:
+		"""Время исчерпания остатка при расходе usage_rate и пополнении refill_rate (единиц/с)"""
+		drain = usage_rate - refill_rate
+		if drain <= 0:
+			return None
+		return now + timedelta(seconds=remaining / drain)
+
+	@staticmethod
+	async def _count_pending_uploads(session: AsyncSession, user_id: uuid.UUID) -> int:
+		"""Загрузки пользователя, ожидающие квоты или очереди"""
+		query = (
+			select(func.count())
+			.select_from(YouTubeUpload)
+			.join(VideoVersion, VideoVersion.id == YouTubeUpload.version_id)
+			.join(SourceAsset, SourceAsset.id == VideoVersion.source_id)
+			.where(SourceAsset.user_id == user_id, YouTubeUpload.status.in_(("queued", "deferred")))
+		)
+		return (await session.execute(query)).scalar_one()
+
+	@staticmethod
+	def _cost(cost: Optional[int]) -> int:
+		"""Стоимость загрузки, не больше ёмкости корзины"""
+		return min(cost or settings.YOUTUBE_UPLOAD_QUOTA_COST, settings.YOUTUBE_DAILY_QUOTA)
+
+	@staticmethod
+	def _refill_rate() -> float:
+		"""Скорость пополнения корзины, единиц в секунду"""
+		return settings.YOUTUBE_DAILY_QUOTA / 86400
+
+	@staticmethod
+	def _quota_day(now: datetime) -> date:
+		return now.astimezone(QUOTA_TIMEZONE).date()
+
+	@staticmethod
+	def _day_start(now: datetime) -> datetime:
+		"""Начало текущих суток квоты"""
+		return datetime.combine(QuotaService._quota_day(now), time(), tzinfo=QUOTA_TIMEZONE)
+
+	@staticmethod
+	def next_reset(now: datetime) -> datetime:
+		"""Ближайший сброс суточной квоты"""
+		next_day = QuotaService._quota_day(now) + timedelta(days=1)
+		return datetime.combine(next_day, time(), tzinfo=QUOTA_TIMEZONE).astimezone(timezone.utc)
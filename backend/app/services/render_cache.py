@@ -0,0 +1,197 @@
+"""Кэш отрендеренных версий по (хеш исходника, ориентация, профиль)"""
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.services.storage_service import StorageService
+
+
+class RenderCache:
+	"""Дисковый кэш готовых рендеров с вытеснением LRU по суммарному размеру.
+
+	Профиль уникализации детерминирован (seed), поэтому одинаковые
+	(исходник, ориентация, режим, профиль) дают одинаковый результат и рендер
+	можно переиспользовать. Запись кэша — копия файла версии (и её превью)
+	плюс JSON с информацией о версии; время последнего использования —
+	mtime, обновляется при каждом попадании.
+
+	Копии, а не жёсткие ссылки: иначе удаление записи не освобождает место,
+	пока жива версия, и RENDER_CACHE_MAX_BYTES не ограничивает занятый диск.
+	На ФС с reflink копия создаётся мгновенно и делит блоки до первой записи.
+	"""
+
+	# Меняется при изменении параметров рендера, влияющих на результат
+	FORMAT_VERSION = 2
+
+	@staticmethod
+	def make_key(content_hash: str, orientation: str, mode: str, plan: Dict[str, Any]) -> str:
+		"""Ключ кэша для рендера"""
+		material = json.dumps(
+			{
+				"format": RenderCache.FORMAT_VERSION,
+				"source": content_hash,
+				"orientation": orientation,
+				"mode": mode,
+				"plan": plan,
+			},
+			sort_keys=True,
+		)
+		return hashlib.sha256(material.encode()).hexdigest()
+
+	@staticmethod
+	def get_cache_dir() -> Path:
+		"""Корневая директория кэша"""
+		return Path(settings.STORAGE_PATH) / "render_cache"
+
+	@staticmethod
+	def _entry_paths(key: str) -> Tuple[Path, Path]:
+		"""Пути файла рендера и его метаданных"""
+		entry_dir = RenderCache.get_cache_dir() / key[:2]
+		return entry_dir / f"{key}.mp4", entry_dir / f"{key}.json"
+
+	@staticmethod
+	async def fetch(
+		key: str, output_path: str, extras: Optional[Dict[str, str]] = None
+	) -> Optional[Tuple[Dict[str, float], Dict, Dict[str, str]]]:
+		"""Получить рендер из кэша в output_path.
+
+		extras — куда положить сопутствующие файлы записи (превью и т.п.)
+		по их именам. Возвращает (информация о версии, transform_profile,
+		восстановленные extras) или None при промахе.
+		"""
+		if not settings.RENDER_CACHE:
+			return None
+		return await asyncio.to_thread(RenderCache._fetch, key, output_path, extras or {})
+
+	@staticmethod
+	async def store(
+		key: str,
+		output_path: str,
+		info: Dict[str, float],
+		transform_profile: Dict,
+		extras: Optional[Dict[str, str]] = None,
+	) -> None:
+		"""Добавить готовый рендер (и сопутствующие файлы) в кэш и вытеснить старые записи сверх лимита"""
+		if not settings.RENDER_CACHE:
+			return
+		try:
+			await asyncio.to_thread(RenderCache._store, key, output_path, info, transform_profile, extras or {})
+			await asyncio.to_thread(RenderCache.evict, settings.RENDER_CACHE_MAX_BYTES)
+		except OSError as e:
+			# Кэш — оптимизация, его ошибки не должны ломать загрузку
+			print(f"⚠️ Не удалось сохранить рендер в кэш: {e}")
+
+	@staticmethod
+	def _fetch(
+		key: str, output_path: str, extras: Dict[str, str]
+	) -> Optional[Tuple[Dict[str, float], Dict, Dict[str, str]]]:
+		video_path, meta_path = RenderCache._entry_paths(key)
+		try:
+			with open(meta_path, "r") as f:
+				meta = json.load(f)
+			StorageService.copy_file(video_path, Path(output_path))
+			os.utime(video_path)
+			os.utime(meta_path)
+		except (OSError, ValueError):
+			# Запись вытеснена или повреждена — считаем промахом
+			return None
+
+		restored = {}
+		for name, destination in extras.items():
+			if name not in meta.get("extras", []):
+				continue
+			try:
+				StorageService.copy_file(RenderCache._extra_path(video_path, name), Path(destination))
+			except OSError:
+				continue
+			restored[name] = destination
+
+		print(f"♻️ Рендер {key[:12]} взят из кэша")
+		return meta["info"], meta["transform_profile"], restored
+
+	@staticmethod
+	def _store(
+		key: str,
+		output_path: str,
+		info: Dict[str, float],
+		transform_profile: Dict,
+		extras: Dict[str, str],
+	) -> None:
+		video_path, meta_path = RenderCache._entry_paths(key)
+		video_path.parent.mkdir(parents=True, exist_ok=True)
+		suffix = uuid.uuid4().hex
+
+		# Сначала файлы, затем метаданные: запись без JSON считается отсутствующей
+		stored_extras = []
+		files = [(Path(output_path), video_path)]
+		for name, path in extras.items():
+			if path and os.path.exists(path):
+				files.append((Path(path), RenderCache._extra_path(video_path, name)))
+				stored_extras.append(name)
+		for source, destination in files:
+			partial = destination.with_name(f"{destination.name}.{suffix}.part")
+			StorageService.copy_file(source, partial)
+			os.replace(partial, destination)
+
+		partial_meta = meta_path.with_name(f"{meta_path.name}.{suffix}.part")
+		with open(partial_meta, "w") as f:
+			json.dump({"info": info, "transform_profile": transform_profile, "extras": stored_extras}, f)
+		os.replace(partial_meta, meta_path)
+
+	@staticmethod
+	def _extra_path(video_path: Path, name: str) -> Path:
+		"""Путь сопутствующего файла записи: <key>.<name>.jpg"""
+		return video_path.with_name(f"{video_path.stem}.{name}.jpg")
+
+	@staticmethod
+	def evict(max_bytes: int) -> int:
+		"""Удалить давно не использованные записи, пока кэш больше max_bytes.
+
+		Размер записи — рендер, превью и метаданные. Возвращает число
+		удалённых записей.
+		"""
+		cache_dir = RenderCache.get_cache_dir()
+		if not cache_dir.exists():
+			return 0
+
+		entries = []
+		total = 0
+		for video_path in cache_dir.glob("*/*.mp4"):
+			# Метаданные первыми: без них запись уже не считается существующей
+			related = [video_path.with_suffix(".json"), video_path]
+			related.extend(video_path.parent.glob(f"{video_path.stem}.*.jpg"))
+			try:
+				mtime = video_path.stat().st_mtime
+			except FileNotFoundError:
+				continue
+			size = sum(RenderCache._file_size(path) for path in related)
+			entries.append((mtime, size, related))
+			total += size
+
+		removed = 0
+		for _, size, related in sorted(entries, key=lambda entry: entry[0]):
+			if total <= max_bytes:
+				break
+			for path in related:
+				try:
+					os.remove(path)
+				except FileNotFoundError:
+					pass
+			total -= size
+			removed += 1
+
+		if removed:
+			print(f"🧹 Из кэша рендеров удалено записей: {removed}")
+		return removed
+
+	@staticmethod
+	def _file_size(path: Path) -> int:
+		try:
+			return path.stat().st_size
+		except FileNotFoundError:
+			return 0
@@ -0,0 +1,195 @@
+"""Сервис для работы с файловым хранилищем"""
+import asyncio
+import errno
+import fcntl
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.models import SourceBlob
+from app.services.mp4_inspector import Mp4Inspector
+
+
+class StorageService:
+	"""Сервис для размещения файлов в хранилище"""
+
+	# ioctl FICLONE (linux/fs.h): reflink — копия делит экстенты с исходником (Btrfs, XFS)
+	FICLONE = 0x40049409
+
+	@staticmethod
+	def get_staging_path() -> Path:
+		"""Временный путь для принимаемого файла.
+
+		По умолчанию лежит внутри STORAGE_PATH, поэтому перенос в хранилище —
+		атомарный os.replace в пределах одной файловой системы.
+		"""
+		staging_dir = Path(settings.UPLOAD_STAGING_PATH or Path(settings.STORAGE_PATH) / "tmp")
+		staging_dir.mkdir(parents=True, exist_ok=True)
+		return staging_dir / f"{uuid.uuid4()}.part"
+
+	@staticmethod
+	def get_blob_path(content_hash: str) -> Path:
+		"""Путь исходника по хешу содержимого: sources/ab/cd/<hash>"""
+		return Path(settings.STORAGE_PATH) / "sources" / content_hash[:2] / content_hash[2:4] / content_hash
+
+	@staticmethod
+	def get_versions_dir(user_id: uuid.UUID) -> Path:
+		"""Директория отрендеренных версий пользователя"""
+		versions_dir = Path(settings.STORAGE_PATH) / "versions" / str(user_id)
+		versions_dir.mkdir(parents=True, exist_ok=True)
+		return versions_dir
+
+	@staticmethod
+	async def preflight_file(path: Path) -> Optional[Dict[str, Any]]:
+		"""Быстрая проверка принятого файла до переноса в хранилище.
+
+		Разбирает дерево боксов MP4/MOV без запуска ffprobe; явно повреждённые
+		файлы отклоняются с Mp4InspectionError. Возвращает информацию о видео
+		или None, если файл проверит ffprobe (другой формат, фрагментированный MP4).
+		"""
+		return await asyncio.to_thread(Mp4Inspector.preflight, str(path))
+
+	@staticmethod
+	def place_file(source: Path, destination: Path) -> None:
+		"""Переместить файл в хранилище без перезаписи данных.
+
+		В пределах одной файловой системы — атомарный os.replace. Между
+		устройствами данные копируются в ядре (см. copy_file) во временный
+		файл рядом с destination, который затем атомарно переименовывается.
+		"""
+		destination.parent.mkdir(parents=True, exist_ok=True)
+		try:
+			os.replace(source, destination)
+			return
+		except OSError as e:
+			if e.errno != errno.EXDEV:
+				raise
+
+		partial = destination.with_name(f"{destination.name}.{uuid.uuid4().hex}.part")
+		try:
+			with open(source, "rb") as src, open(partial, "wb") as dst:
+				StorageService._copy_fd(src.fileno(), dst.fileno())
+				os.fsync(dst.fileno())
+			os.replace(partial, destination)
+		except BaseException:
+			if partial.exists():
+				os.remove(partial)
+			raise
+		os.remove(source)
+
+	@staticmethod
+	def copy_file(source: Path, destination: Path) -> None:
+		"""Скопировать файл без чтения данных в user space.
+
+		На ФС с reflink копия создаётся мгновенно и делит блоки с исходником
+		(запись в копию затрагивает только изменённые страницы), иначе данные
+		копируются в ядре (copy_file_range, затем sendfile).
+		"""
+		with open(source, "rb") as src, open(destination, "wb") as dst:
+			StorageService._copy_fd(src.fileno(), dst.fileno())
+
+	@staticmethod
+	def _copy_fd(src_fd: int, dst_fd: int) -> None:
+		"""Reflink, а если ФС его не поддерживает — копирование в ядре"""
+		try:
+			fcntl.ioctl(dst_fd, StorageService.FICLONE, src_fd)
+			return
+		except OSError as e:
+			# Другая ФС или ФС без reflink
+			if e.errno not in (errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS):
+				raise
+		StorageService._kernel_copy(src_fd, dst_fd, os.fstat(src_fd).st_size)
+
+	@staticmethod
+	def _kernel_copy(src_fd: int, dst_fd: int, size: int) -> None:
+		"""Скопировать size байт между дескрипторами без буферов в user space"""
+		copied = 0
+		use_copy_file_range = hasattr(os, "copy_file_range")
+		while copied < size:
+			count = min(size - copied, 1 << 30)
+			if use_copy_file_range:
+				try:
+					sent = os.copy_file_range(src_fd, dst_fd, count)
+				except OSError as e:
+					# Старое ядро или ФС без поддержки — переходим на sendfile
+					if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+						raise
+					use_copy_file_range = False
+					continue
+			else:
+				sent = os.sendfile(dst_fd, src_fd, copied, count)
+			if sent == 0:
+				raise OSError(errno.EIO, "Исходный файл укоротился во время копирования")
+			copied += sent
+
+	@staticmethod
+	async def store_blob(
+		session: AsyncSession,
+		staging_path: Path,
+		content_hash: str,
+		size_bytes: int,
+	) -> str:
+		"""Поместить принятый файл в хранилище по хешу и добавить ссылку на него.
+
+		Если такое содержимое уже есть, временный файл удаляется без копирования.
+		Строка source_blobs остаётся заблокированной до коммита, поэтому
+		параллельный release_blob не удалит файл между проверкой и коммитом.
+		Коммит выполняет вызывающий код (вместе с постановкой задачи).
+		Возвращает путь к исходнику в хранилище.
+		"""
+		blob_path = StorageService.get_blob_path(content_hash)
+		result = await session.execute(
+			insert(SourceBlob)
+			.values(
+				content_hash=content_hash,
+				storage_path=str(blob_path),
+				size_bytes=size_bytes,
+				ref_count=1,
+			)
+			.on_conflict_do_update(
+				index_elements=["content_hash"],
+				set_={"ref_count": SourceBlob.ref_count + 1},
+			)
+			.returning(SourceBlob.storage_path)
+		)
+		storage_path = Path(result.scalar_one())
+
+		try:
+			if storage_path.exists():
+				# Повторная загрузка известного креатива
+				os.remove(staging_path)
+				print(f"♻️ Исходник {content_hash[:12]} уже в хранилище, копия не сохраняется")
+			else:
+				await asyncio.to_thread(StorageService.place_file, staging_path, storage_path)
+		except BaseException:
+			if staging_path.exists():
+				os.remove(staging_path)
+			raise
+
+		return str(storage_path)
+
+	@staticmethod
+	async def release_blob(session: AsyncSession, content_hash: str) -> None:
+		"""Снять ссылку на исходник; без ссылок файл и запись удаляются.
+
+		Коммит выполняет вызывающий код.
+		"""
+		result = await session.execute(
+			select(SourceBlob).where(SourceBlob.content_hash == content_hash).with_for_update()
+		)
+		blob = result.scalar_one_or_none()
+		if not blob:
+			return
+
+		blob.ref_count -= 1
+		if blob.ref_count <= 0:
+			# Файл удаляется под блокировкой строки — store_blob того же
+			# содержимого дождётся коммита и заново положит файл
+			if os.path.exists(blob.storage_path):
+				os.remove(blob.storage_path)
+			await session.delete(blob)
@@ -0,0 +1,119 @@
+"""Классификация ошибок загрузки на YouTube и расписание повторных попыток"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from google.auth.exceptions import RefreshError, TransportError
+from googleapiclient.errors import HttpError
+
+from app.core.config import settings
+from app.services.quota_service import QuotaExhaustedError, QuotaService
+from app.services.youtube_uploader import YouTubeApiError
+
+
+class UploadRetryPolicy:
+	"""Решает, повторять ли неудачную загрузку и когда.
+
+	Ошибка относится к классу: quota (квота исчерпана — ждём её сброса, без
+	лимита попыток), rate_limit, server (5xx), network (обрыв соединения,
+	таймаут), auth (невалидные credentials) или permanent (повтор бесполезен).
+	Для каждого класса свой лимит попыток и экспоненциальная задержка со
+	случайной составляющей; лимит считается по неудачам класса с последнего
+	ручного повтора или успеха. Лимиты и задержки переопределяются в
+	UPLOAD_RETRY_POLICIES.
+	"""
+
+	POLICIES: Dict[str, Dict[str, Any]] = {
+		"rate_limit": {"max_attempts": 6, "base_delay": 60, "max_delay": 3600},
+		"server": {"max_attempts": 6, "base_delay": 30, "max_delay": 1800},
+		"network": {"max_attempts": 8, "base_delay": 10, "max_delay": 900},
+		# Токен мог обновиться или пользователь переподключит канал
+		"auth": {"max_attempts": 2, "base_delay": 300, "max_delay": 3600},
+		"permanent": {"max_attempts": 0, "base_delay": 0, "max_delay": 0},
+	}
+
+	RATE_LIMIT_REASONS = ("rateLimitExceeded", "userRateLimitExceeded")
+	SERVER_REASONS = ("backendError", "internalError", "serviceUnavailable")
+	AUTH_REASONS = ("authError", "unauthorized", "invalid_grant")
+	NETWORK_ERRORS = (httpx.TransportError, TransportError, ConnectionError, TimeoutError)
+
+	# Сколько последних записей истории попыток хранить на загрузке
+	HISTORY_LIMIT = 50
+
+	@staticmethod
+	def classify(error: BaseException) -> Tuple[str, Optional[int], Optional[str]]:
+		"""Класс ошибки, HTTP-статус и причина из ответа API"""
+		if isinstance(error, QuotaExhaustedError):
+			return "quota", None, None
+
+		status, reason = UploadRetryPolicy._status_and_reason(error)
+		if reason in QuotaService.QUOTA_REASONS:
+			error_class = "quota"
+		elif status == 429 or reason in UploadRetryPolicy.RATE_LIMIT_REASONS:
+			error_class = "rate_limit"
+		elif status == 401 or reason in UploadRetryPolicy.AUTH_REASONS or isinstance(error, RefreshError):
+			error_class = "auth"
+		elif (status and status >= 500) or reason in UploadRetryPolicy.SERVER_REASONS:
+			error_class = "server"
+		elif isinstance(error, UploadRetryPolicy.NETWORK_ERRORS):
+			error_class = "network"
+		else:
+			error_class = "permanent"
+		return error_class, status, reason
+
+	@staticmethod
+	def get_policy(error_class: str) -> Dict[str, Any]:
+		"""Политика класса с учётом переопределений из настроек"""
+		policy = dict(UploadRetryPolicy.POLICIES.get(error_class, UploadRetryPolicy.POLICIES["permanent"]))
+		policy.update(settings.UPLOAD_RETRY_POLICIES.get(error_class, {}))
+		return policy
+
+	@staticmethod
+	def next_retry_at(
+		error: BaseException, error_class: str, failures: int, now: datetime
+	) -> Optional[datetime]:
+		"""Время следующей попытки или None, если повторять не нужно.
+
+		failures — неудачи этого класса подряд, включая текущую.
+		"""
+		if not settings.UPLOAD_AUTO_RETRY:
+			return None
+		if error_class == "quota":
+			# Без точного времени ждём сброса суточной квоты
+			return getattr(error, "retry_at", None) or QuotaService.next_reset(now)
+
+		policy = UploadRetryPolicy.get_policy(error_class)
+		if failures > policy["max_attempts"]:
+			return None
+		# Equal jitter: половина задержки фиксирована, половина случайна
+		delay = min(policy["max_delay"], policy["base_delay"] * 2 ** (failures - 1))
+		return now + timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+	@staticmethod
+	def count_failures(history: List[Dict[str, Any]], error_class: str) -> int:
+		"""Неудачи класса с последнего ручного повтора или успешной загрузки"""
+		count = 0
+		for entry in reversed(history):
+			if entry.get("event") in ("manual_retry", "success"):
+				break
+			if entry.get("error_class") == error_class:
+				count += 1
+		return count
+
+	@staticmethod
+	def append_history(history: Optional[List[Dict[str, Any]]], entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+		"""Новая история попыток с добавленной записью (JSONB меняется присваиванием)"""
+		return [*(history or []), entry][-UploadRetryPolicy.HISTORY_LIMIT:]
+
+	@staticmethod
+	def _status_and_reason(error: BaseException) -> Tuple[Optional[int], Optional[str]]:
+		if isinstance(error, YouTubeApiError):
+			return error.status, error.reason
+		if isinstance(error, HttpError):
+			reason = None
+			details = error.error_details
+			if isinstance(details, list) and details and isinstance(details[0], dict):
+				reason = details[0].get("reason")
+			return int(error.resp.status), reason
+		return None, None
@@ -1,70 +1,100 @@
+import asyncio
+import contextlib
 import os
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-import aiofiles
+from sqlalchemy import and_, or_, select, update
+from fastapi.encoders import jsonable_encoder
 
-from app.models import SourceAsset, VideoVersion, YouTubeUpload, Integration
+from app.models import SourceAsset, VideoVersion, YouTubeUpload, Integration, ProcessingJob
 from app.services.video_processor import VideoProcessor
 from app.services.youtube_service import YouTubeService
 from app.services.integration_service import IntegrationService
+from app.services.storage_service import StorageService
+from app.services.probe_cache import ProbeCacheService
+from app.services.render_cache import RenderCache
+from app.services.encode_scheduler import encode_scheduler
+from app.services.encoder_profiles import EncoderProfileService
+from app.services.job_service import JobService
+from app.services.quota_service import QuotaService, QuotaExhaustedError
+from app.services.youtube_uploader import YouTubeApiError
+from app.services.upload_retry import UploadRetryPolicy
 from app.core.config import settings
 
 
 class UploadService:
 	"""Сервис для управления загрузкой видео"""
 
+	# Изображения, которые рендер выдаёт вместе с версией: <вид>_path в render
+	IMAGE_KINDS = ("thumbnail", "contact_sheet")
+
 	@staticmethod
 	async def process_and_upload(
 		session: AsyncSession,
 		user_id: uuid.UUID,
-		file_path: str,
+		source_id: uuid.UUID,
+		source_path: str,
 		original_filename: str,
 		generate_orientations: bool,
 		requested_orientations: List[str],
+		content_hash: Optional[str] = None,
+		size_bytes: Optional[int] = None,
+		uniquify_mode: Optional[str] = None,
+		seed: Optional[int] = None,
+		encoder_profile: Optional[str] = None,
+		video_info: Optional[dict] = None,
 	) -> dict:
-		"""Обработать видео и загрузить на YouTube"""
-
-		# Получаем расшифрованные credentials для YouTube
-		credentials = await IntegrationService.get_decrypted_auth_data(session, user_id, "youtube")
-		
-		if not credentials:
-			raise ValueError("YouTube интеграция не найдена или не активна. Пожалуйста, подключите YouTube в настройках интеграций.")
-
-		# Создаём директории для хранения
-		storage_base = Path(settings.STORAGE_PATH)
-		source_dir = storage_base / "sources" / str(user_id)
-		versions_dir = storage_base / "versions" / str(user_id)
-		source_dir.mkdir(parents=True, exist_ok=True)
-		versions_dir.mkdir(parents=True, exist_ok=True)
-
-		# Получаем информацию о видео
-		video_info = await VideoProcessor.get_video_info(file_path)
-
-		# Сохраняем исходный файл
-		source_id = uuid.uuid4()
-		source_storage_path = source_dir / f"{source_id}.mp4"
-		async with aiofiles.open(file_path, "rb") as src, aiofiles.open(
-			str(source_storage_path), "wb"
-		) as dst:
-			content = await src.read()
-			await dst.write(content)
-
-		# Создаём запись об исходнике
-		source_asset = SourceAsset(
-			id=source_id,
-			user_id=user_id,
-			original_filename=original_filename,
-			storage_path=str(source_storage_path),
-			duration_sec=video_info["duration"],
-			width=video_info["width"],
-			height=video_info["height"],
-			fps=video_info["fps"],
-		)
-		session.add(source_asset)
+		"""Обработать видео и загрузить на YouTube.
+
+		Исходник уже должен лежать в хранилище (см. StorageService.store_blob);
+		ссылка задачи на source_blobs переходит к созданному SourceAsset.
+		uniquify_mode: 'full' — перекодирование, 'fast' — для версии в исходной
+		ориентации видео не перекодируется (см. VideoProcessor.uniquify_fast).
+		seed фиксирует параметры уникализации: повторный запрос с тем же seed
+		для того же исходника берёт готовые версии из кэша рендеров.
+		encoder_profile — профиль кодирования; по умолчанию профиль пользователя.
+		video_info — параметры из разбора боксов при загрузке; используются,
+		только если в кэше ffprobe нет записи, и в кэш не сохраняются.
+		Если квоты YouTube нет ни на одном канале, бросается QuotaExhaustedError
+		до начала рендера.
+		"""
+
+		# Без квоты рендерить бессмысленно — задача будет отложена
+		await QuotaService.ensure_available(session, user_id)
+
+		versions_dir = StorageService.get_versions_dir(user_id)
+		source_storage_path = Path(source_path)
+		encoder = await EncoderProfileService.resolve_for_user(session, user_id, encoder_profile)
+
+		# Получаем информацию о видео: кэш ffprobe по хешу содержимого,
+		# затем разбор боксов из запроса, затем ffprobe
+		cached_info = await ProbeCacheService.get_cached(session, content_hash) if content_hash else None
+		video_info = cached_info or video_info
+		if not video_info:
+			video_info = await ProbeCacheService.get_video_info(session, source_path, content_hash)
+
+		# Задача могла быть захвачена повторно после падения воркера —
+		# тогда исходник уже зарегистрирован
+		source_asset = await session.get(SourceAsset, source_id)
+		if not source_asset:
+			# Создаём запись об исходнике
+			source_asset = SourceAsset(
+				id=source_id,
+				user_id=user_id,
+				original_filename=original_filename,
+				storage_path=str(source_storage_path),
+				content_hash=content_hash,
+				size_bytes=size_bytes,
+				duration_sec=video_info["duration"],
+				width=video_info["width"],
+				height=video_info["height"],
+				fps=video_info["fps"],
+			)
+			session.add(source_asset)
+			await session.commit()
 
 		# Определяем какие ориентации нужно создать
 		original_orientation = UploadService._detect_orientation(
@@ -79,118 +109,433 @@ class UploadService:
 			else:
 				orientations_to_create.extend([o for o in all_orientations if o != original_orientation])
 
+		# Не загружаем повторно то, что прошлая попытка уже загрузила или поставила в загрузку
+		uploaded_orientations = await UploadService._get_uploaded_orientations(session, source_id)
+		orientations_to_create = [o for o in orientations_to_create if o not in uploaded_orientations]
+
+		renders = UploadService._iter_renders(
+			str(source_storage_path),
+			versions_dir,
+			video_info,
+			orientations_to_create,
+			original_orientation,
+			uniquify_mode or settings.UNIQUIFY_MODE,
+			content_hash,
+			seed,
+			encoder,
+		)
+		if settings.UPLOAD_PIPELINE:
+			# Загрузка готовой версии идёт параллельно с рендером следующей
+			renders = UploadService._pipeline(renders, settings.UPLOAD_PIPELINE_BUFFER)
+
 		versions = []
+		async for render in renders:
+			versions.append(
+				await UploadService._publish_version(
+					session, user_id, source_id, original_filename, render
+				)
+			)
 
-		for orientation in orientations_to_create:
-			version_id = uuid.uuid4()
+		return {
+			"source_id": source_id,
+			"original_filename": original_filename,
+			"versions": versions,
+		}
 
-			# Обрабатываем видео
-			temp_path = str(versions_dir / f"{version_id}_temp.mp4")
-			clean_path = str(versions_dir / f"{version_id}_clean.mp4")
-			final_path = str(versions_dir / f"{version_id}_final.mp4")
+	@staticmethod
+	async def _iter_renders(
+		source_path: str,
+		versions_dir: Path,
+		video_info: dict,
+		orientations: List[str],
+		original_orientation: str,
+		uniquify_mode: str = "full",
+		content_hash: Optional[str] = None,
+		seed: Optional[int] = None,
+		encoder: Optional[dict] = None,
+	) -> AsyncIterator[dict]:
+		"""Отрендерить версии для всех ориентаций, отдавая их по мере готовности.
 
-			try:
-				# Очистка метаданных
-				await VideoProcessor.clean_metadata(str(source_storage_path), clean_path)
-
-				# Уникализация
-				transform_profile = None
-				version_info = video_info.copy()
-				if orientation == original_orientation:
-					_, transform_profile = await VideoProcessor.uniquify_video(
-						clean_path, final_path, version_info
-					)
-				else:
-					# Генерация ориентации
-					new_info = await VideoProcessor.generate_orientation(
-						clean_path, final_path, orientation, video_info
-					)
-					# Уникализация после генерации ориентации
-					uniquified_path = str(versions_dir / f"{version_id}_uniq.mp4")
-					_, transform_profile = await VideoProcessor.uniquify_video(
-						final_path, uniquified_path, new_info
-					)
-					os.rename(uniquified_path, final_path)
-					version_info = new_info
-
-				# Создаём запись о версии
-				video_version = VideoVersion(
-					id=version_id,
-					source_id=source_id,
-					orientation=orientation,
-					transform_profile=transform_profile,
-					storage_path_render=final_path,
-					duration_sec=version_info["duration"],
-					width=version_info["width"],
-					height=version_info["height"],
-					fps=version_info["fps"],
-				)
-				session.add(video_version)
+		В режиме 'fast' версия в исходной ориентации уникализируется без
+		перекодирования и отдаётся первой. Версии, найденные в кэше рендеров,
+		отдаются сразу. При RENDER_FANOUT остальные ориентации рендерятся из
+		одного декодирования исходника (и готовы одновременно), иначе — по
+		одному процессу ffmpeg на версию (для длинных исходников — сегментами,
+		см. VideoProcessor.render_segmented). Если при UPLOAD_PIPELINE загружать
+		ещё нечего, первая версия рендерится отдельно: её загрузка идёт, пока
+		fan-out рендерит остальные. Ошибка рендера не прерывает генератор,
+		а передаётся в render["error"].
+		"""
+		# Есть ли уже версия, загрузка которой перекроет следующий рендер
+		ready = False
+		if uniquify_mode == "fast" and original_orientation in orientations:
+			render = UploadService._prepare_render(
+				UploadService._new_render(versions_dir, original_orientation, original_orientation),
+				source_path, video_info, "fast", content_hash, seed, encoder,
+			)
+			await UploadService._render_one(source_path, video_info, render)
+			yield render
+			ready = True
+			orientations = [o for o in orientations if o != original_orientation]
 
-				# Создаём запись о загрузке
-				upload = YouTubeUpload(
-					id=uuid.uuid4(),
-					version_id=version_id,
-					status="queued",
-					privacy="unlisted",
+		renders = []
+		for orientation in orientations:
+			render = UploadService._prepare_render(
+				UploadService._new_render(versions_dir, orientation, original_orientation),
+				source_path, video_info, "full", content_hash, seed, encoder,
+			)
+			if await UploadService._fetch_cached(render):
+				yield render
+				ready = True
+			else:
+				renders.append(render)
+
+		# Длинные исходники выгоднее кодировать сегментами по одной версии,
+		# чем всеми версиями в одном процессе ffmpeg
+		fanout = settings.RENDER_FANOUT and not VideoProcessor.should_segment(video_info)
+		if fanout and settings.UPLOAD_PIPELINE and not ready and len(renders) > 1:
+			# Все выходы fan-out готовы одновременно — без этого загрузка
+			# не перекрывалась бы с рендером
+			await UploadService._render_one(source_path, video_info, renders[0])
+			yield renders[0]
+			renders = renders[1:]
+		if fanout and len(renders) > 1:
+			await UploadService._render_batch(source_path, video_info, renders)
+			for render in renders:
+				yield render
+			return
+
+		for render in renders:
+			await UploadService._render_one(source_path, video_info, render)
+			yield render
+
+	@staticmethod
+	async def _iter_variant_renders(
+		source_path: str,
+		versions_dir: Path,
+		video_info: dict,
+		orientation: str,
+		original_orientation: str,
+		count: int,
+		content_hash: Optional[str] = None,
+		seed: Optional[int] = None,
+		encoder: Optional[dict] = None,
+		skip_seeds: Optional[set] = None,
+	) -> AsyncIterator[dict]:
+		"""Отрендерить count уникальных вариантов одной ориентации.
+
+		У каждого варианта свой seed (seed + номер), а значит свои длительность,
+		FPS и битрейт. Варианты рендерятся пачками по VARIANT_BATCH_SIZE
+		(по умолчанию — по числу слотов кодирования) из одного декодирования
+		исходника на пачку; пачка отдаётся целиком по готовности. Длинные
+		и 4K-исходники (VideoProcessor.should_segment) рендерятся по одному
+		варианту, сегментами. Варианты с seed из skip_seeds пропускаются.
+		"""
+		renders = []
+		for index in range(count):
+			variant_seed = (seed + index) % 2 ** 32 if seed is not None else None
+			if variant_seed is not None and variant_seed in (skip_seeds or ()):
+				continue
+			render = UploadService._prepare_render(
+				UploadService._new_render(versions_dir, orientation, original_orientation),
+				source_path, video_info, "full", content_hash, variant_seed, encoder,
+			)
+			render["variant"] = index + 1
+			if await UploadService._fetch_cached(render):
+				yield render
+			else:
+				renders.append(render)
+
+		if VideoProcessor.should_segment(video_info):
+			# Сегменты одного варианта и так занимают все слоты
+			batch_size = 1
+		else:
+			batch_size = settings.VARIANT_BATCH_SIZE or encode_scheduler.total_slots
+		for start in range(0, len(renders), batch_size):
+			batch = renders[start:start + batch_size]
+			if len(batch) > 1:
+				await UploadService._render_batch(source_path, video_info, batch)
+			else:
+				await UploadService._render_one(source_path, video_info, batch[0])
+			for render in batch:
+				yield render
+
+	@staticmethod
+	async def _render_batch(source_path: str, video_info: dict, renders: List[dict]) -> None:
+		"""Отрендерить несколько версий из одного декодирования исходника.
+
+		Ошибка рендера сохраняется в render["error"] каждой версии.
+		"""
+		try:
+			results = await VideoProcessor.render_versions(
+				source_path,
+				[
+					{
+						"output_path": r["output_path"],
+						"orientation": r["render_orientation"],
+						"transform_profile": r["plan"],
+						"thumbnail_path": r.get("thumbnail_path"),
+						"contact_sheet_path": r.get("contact_sheet_path"),
+					}
+					for r in renders
+				],
+				video_info,
+			)
+			for render, (info, transform_profile) in zip(renders, results):
+				render["info"] = info
+				render["transform_profile"] = transform_profile
+				UploadService._drop_missing_images(render)
+				await UploadService._store_cached(render)
+		except Exception as e:
+			for render in renders:
+				render["error"] = e
+
+	@staticmethod
+	def _new_render(versions_dir: Path, orientation: str, original_orientation: str) -> dict:
+		"""Описание новой версии для рендера"""
+		version_id = uuid.uuid4()
+		return {
+			"version_id": version_id,
+			"orientation": orientation,
+			"render_orientation": orientation if orientation != original_orientation else None,
+			"output_path": str(versions_dir / f"{version_id}.mp4"),
+			# Превью и контактный лист — дополнительные выходы того же рендера
+			"thumbnail_path": str(versions_dir / f"{version_id}.jpg") if settings.RENDER_THUMBNAILS else None,
+			"contact_sheet_path": (
+				str(versions_dir / f"{version_id}_sheet.jpg") if settings.RENDER_CONTACT_SHEET else None
+			),
+		}
+
+	@staticmethod
+	def _prepare_render(
+		render: dict,
+		source_path: str,
+		video_info: dict,
+		mode: str,
+		content_hash: Optional[str],
+		seed: Optional[int],
+		encoder: Optional[dict] = None,
+	) -> dict:
+		"""Рассчитать детерминированный план рендера и ключ кэша"""
+		if mode == "fast":
+			render["plan"] = VideoProcessor.plan_fast(video_info, seed)
+		else:
+			render["plan"] = VideoProcessor.plan_uniquify(source_path, video_info, seed, encoder)
+		render["mode"] = mode
+		render["cache_key"] = (
+			RenderCache.make_key(content_hash, render["orientation"], mode, render["plan"])
+			if content_hash
+			else None
+		)
+		return render
+
+	@staticmethod
+	async def _render_one(source_path: str, video_info: dict, render: dict) -> None:
+		"""Взять версию из кэша или отрендерить её; ошибка сохраняется в render["error"]"""
+		try:
+			if await UploadService._fetch_cached(render):
+				return
+			if render["mode"] == "fast":
+				result = await VideoProcessor.uniquify_fast(
+					source_path,
+					render["output_path"],
+					video_info,
+					render["plan"],
+					thumbnail_path=render.get("thumbnail_path"),
 				)
-				session.add(upload)
+			else:
+				result = await VideoProcessor.render_version(
+					source_path,
+					render["output_path"],
+					video_info,
+					orientation=render["render_orientation"],
+					transform_profile=render["plan"],
+					thumbnail_path=render.get("thumbnail_path"),
+					contact_sheet_path=render.get("contact_sheet_path"),
+				)
+			render["info"], render["transform_profile"] = result
+			UploadService._drop_missing_images(render)
+			await UploadService._store_cached(render)
+		except Exception as e:
+			render["error"] = e
 
-				await session.commit()
+	@staticmethod
+	async def _fetch_cached(render: dict) -> bool:
+		"""Заполнить render из кэша рендеров. True при попадании"""
+		if not render["cache_key"]:
+			return False
+		cached = await RenderCache.fetch(
+			render["cache_key"], render["output_path"], UploadService._image_paths(render)
+		)
+		if not cached:
+			return False
+		render["info"], render["transform_profile"], restored = cached
+		for name in UploadService.IMAGE_KINDS:
+			render[f"{name}_path"] = restored.get(name)
+		return True
 
-				# Загружаем на YouTube
-				upload.status = "processing"
-				await session.commit()
+	@staticmethod
+	async def _store_cached(render: dict) -> None:
+		"""Сохранить готовый рендер вместе с превью в кэш"""
+		if render["cache_key"]:
+			await RenderCache.store(
+				render["cache_key"],
+				render["output_path"],
+				render["info"],
+				render["transform_profile"],
+				UploadService._image_paths(render),
+			)
 
-				try:
-					video_id, youtube_url = await YouTubeService.upload_video(
-						final_path,
-						f"{original_filename} ({orientation})",
-						credentials,
-						"unlisted",
-					)
+	@staticmethod
+	def _image_paths(render: dict) -> dict:
+		"""Запланированные пути превью версии по видам"""
+		return {
+			name: render[f"{name}_path"]
+			for name in UploadService.IMAGE_KINDS
+			if render.get(f"{name}_path")
+		}
 
-					upload.youtube_video_id = video_id
-					upload.youtube_url = youtube_url
-					upload.status = "success"
-					upload.uploaded_at = datetime.now()
-
-					versions.append(
-						{
-							"id": version_id,
-							"orientation": orientation,
-							"status": "success",
-							"youtube_url": youtube_url,
-							"duration_sec": version_info["duration"],
-							"width": version_info["width"],
-							"height": version_info["height"],
-						}
-					)
+	@staticmethod
+	def _drop_missing_images(render: dict) -> None:
+		"""Не сохранять пути превью, которые ffmpeg не создал"""
+		for name in UploadService.IMAGE_KINDS:
+			path = render.get(f"{name}_path")
+			if path and not os.path.exists(path):
+				render[f"{name}_path"] = None
 
-				except Exception as e:
-					upload.status = "error"
-					upload.error_text = str(e)
-					versions.append(
-						{
-							"id": version_id,
-							"orientation": orientation,
-							"status": "error",
-							"error_text": str(e),
-							"duration_sec": version_info.get("duration", 0),
-							"width": version_info.get("width", 0),
-							"height": version_info.get("height", 0),
-						}
-					)
+	@staticmethod
+	async def _pipeline(source: AsyncIterator[dict], buffer_size: int) -> AsyncIterator[dict]:
+		"""Запустить генератор source в отдельной задаче с ограниченным буфером.
 
-				await session.commit()
+		Производитель (рендер) работает, пока потребитель обрабатывает уже
+		готовые элементы (загрузка), но уходит вперёд не более чем на buffer_size.
+		"""
+		queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+		done = object()
+
+		async def produce() -> None:
+			try:
+				async for item in source:
+					await queue.put(item)
+			finally:
+				await queue.put(done)
+
+		producer = asyncio.create_task(produce())
+		try:
+			while True:
+				item = await queue.get()
+				if item is done:
+					break
+				yield item
+			# Пробрасываем неожиданную ошибку производителя
+			await producer
+		finally:
+			if not producer.done():
+				producer.cancel()
+				with contextlib.suppress(asyncio.CancelledError):
+					await producer
 
-				# Удаляем временные файлы
-				for temp_file in [temp_path, clean_path]:
-					if os.path.exists(temp_file):
-						os.remove(temp_file)
+	@staticmethod
+	async def _publish_version(
+		session: AsyncSession,
+		user_id: uuid.UUID,
+		source_id: uuid.UUID,
+		original_filename: str,
+		render: dict,
+	) -> dict:
+		"""Зарегистрировать отрендеренную версию и загрузить её на YouTube.
+
+		Канал выбирается по остатку квоты; если квоты нет, загрузка
+		откладывается отдельной задачей 'publish' без повторного рендера.
+		"""
+		version_id = render["version_id"]
+		orientation = render["orientation"]
+		final_path = render["output_path"]
+
+		try:
+			if render.get("error"):
+				raise render["error"]
+			version_info = render["info"]
+			transform_profile = render["transform_profile"]
+			if render.get("variant"):
+				# Номер варианта нужен для названия и при повторной загрузке
+				transform_profile = {**transform_profile, "variant": render["variant"]}
+
+			# Создаём запись о версии
+			video_version = VideoVersion(
+				id=version_id,
+				source_id=source_id,
+				orientation=orientation,
+				transform_profile=transform_profile,
+				storage_path_render=final_path,
+				thumbnail_path=render.get("thumbnail_path"),
+				contact_sheet_path=render.get("contact_sheet_path"),
+				duration_sec=version_info["duration"],
+				width=version_info["width"],
+				height=version_info["height"],
+				fps=version_info["fps"],
+			)
+			session.add(video_version)
+
+			# Создаём запись о загрузке
+			upload = YouTubeUpload(
+				id=uuid.uuid4(),
+				version_id=version_id,
+				status="queued",
+				privacy="unlisted",
+			)
+			session.add(upload)
+
+			await session.commit()
+
+			# Загружаем на YouTube
+			upload.status = "processing"
+			upload.claimed_at = datetime.now(timezone.utc)
+			await session.commit()
+
+			try:
+				video_id, youtube_url, credentials = await UploadService._upload_with_quota(
+					session, user_id, upload, final_path,
+					UploadService._version_title(original_filename, orientation, transform_profile),
+				)
+
+				UploadService._record_success(upload, video_id, youtube_url)
+
+				if settings.YOUTUBE_SET_THUMBNAIL and video_version.thumbnail_path:
+					upload.thumbnail_set = await UploadService._set_thumbnail(
+						video_id, video_version.thumbnail_path, credentials
+					)
+
+				result = {
+					"id": version_id,
+					"orientation": orientation,
+					"status": "success",
+					"youtube_url": youtube_url,
+					"duration_sec": version_info["duration"],
+					"width": version_info["width"],
+					"height": version_info["height"],
+				}
 
 			except Exception as e:
-				# Создаём запись об ошибке
+				# Временные ошибки повторяются автоматически задачей 'publish'
+				await UploadService._handle_upload_failure(session, user_id, upload, e)
+				result = {
+					"id": version_id,
+					"orientation": orientation,
+					"status": upload.status,
+					"error_text": str(e),
+					"duration_sec": version_info.get("duration", 0),
+					"width": version_info.get("width", 0),
+					"height": version_info.get("height", 0),
+				}
+
+			await session.commit()
+			return result
+
+		except Exception as e:
+			await session.rollback()
+			# Запись об ошибке возможна только для уже зарегистрированной версии
+			if await session.get(VideoVersion, version_id):
 				upload = YouTubeUpload(
 					id=uuid.uuid4(),
 					version_id=version_id,
@@ -200,21 +545,356 @@ class UploadService:
 				session.add(upload)
 				await session.commit()
 
-				versions.append(
-					{
-						"id": version_id,
-						"orientation": orientation,
-						"status": "error",
-						"error_text": str(e),
-					}
+			version_info = render.get("info") or {}
+			return {
+				"id": version_id,
+				"orientation": orientation,
+				"status": "error",
+				"error_text": str(e),
+				"duration_sec": version_info.get("duration", 0),
+				"width": version_info.get("width", 0),
+				"height": version_info.get("height", 0),
+			}
+
+	@staticmethod
+	def _version_title(original_filename: str, orientation: str, transform_profile: Optional[dict]) -> str:
+		"""Название видео на YouTube; у вариантов одного исходника — с номером варианта"""
+		variant = (transform_profile or {}).get("variant")
+		if variant:
+			return f"{original_filename} ({orientation}, вариант {variant})"
+		return f"{original_filename} ({orientation})"
+
+	@staticmethod
+	async def _upload_with_quota(
+		session: AsyncSession,
+		user_id: uuid.UUID,
+		upload: YouTubeUpload,
+		file_path: str,
+		title: str,
+	) -> Tuple[str, str, dict]:
+		"""Загрузить версию на канал пользователя с доступной квотой.
+
+		Начатая загрузка продолжается на том же канале — квота за неё уже
+		списана. Если YouTube ответил, что квота канала исчерпана, канал
+		блокируется до сброса квоты и берётся следующий; когда каналов с квотой
+		не осталось — QuotaExhaustedError. Возвращает (id видео, ссылка,
+		credentials канала).
+		"""
+		upload.attempts = (upload.attempts or 0) + 1
+		if upload.upload_session_uri and upload.integration_id:
+			integration = await session.get(Integration, upload.integration_id)
+			credentials = None
+			if integration and integration.is_valid:
+				credentials = await IntegrationService.decrypt_auth_data(session, integration)
+			if credentials:
+				video_id, youtube_url = await UploadService._upload_to_youtube(
+					session, upload, file_path, title, credentials
+				)
+				return video_id, youtube_url, credentials
+			# Канал отключён — сессия загрузки на нём бесполезна
+			upload.upload_session_uri = None
+			upload.upload_offset = 0
+
+		while True:
+			integration, credentials = await QuotaService.acquire(session, user_id)
+			upload.integration_id = integration.id
+			try:
+				video_id, youtube_url = await UploadService._upload_to_youtube(
+					session, upload, file_path, title, credentials
+				)
+				return video_id, youtube_url, credentials
+			except YouTubeApiError as e:
+				if e.reason not in QuotaService.QUOTA_REASONS:
+					raise
+				await QuotaService.record_exceeded(session, integration.id)
+				upload.upload_session_uri = None
+				upload.upload_offset = 0
+
+	@staticmethod
+	async def _defer_upload(
+		session: AsyncSession, user_id: uuid.UUID, upload: YouTubeUpload, retry_at: datetime
+	) -> ProcessingJob:
+		"""Отложить загрузку до retry_at: задача 'publish' с available_at, без повторного рендера"""
+		upload.status = "deferred"
+		return await JobService.enqueue(
+			session, user_id, "publish", {"upload_id": str(upload.id)}, available_at=retry_at
+		)
+
+	@staticmethod
+	async def _handle_upload_failure(
+		session: AsyncSession, user_id: uuid.UUID, upload: YouTubeUpload, error: BaseException
+	) -> Optional[datetime]:
+		"""Записать неудачную попытку и, если ошибка временная, запланировать повтор.
+
+		Статус загрузки становится 'deferred' (повтор запланирован) или
+		'error'. Возвращает время повтора или None.
+		"""
+		error_class, status_code, reason = UploadRetryPolicy.classify(error)
+		history = upload.attempt_history or []
+		failures = UploadRetryPolicy.count_failures(history, error_class) + 1
+		now = datetime.now(timezone.utc)
+		retry_at = UploadRetryPolicy.next_retry_at(error, error_class, failures, now)
+
+		upload.attempt_history = UploadRetryPolicy.append_history(history, {
+			"attempt": upload.attempts,
+			"at": now.isoformat(),
+			"error_class": error_class,
+			"status_code": status_code,
+			"reason": reason,
+			"error": str(error),
+			"retry_at": retry_at.isoformat() if retry_at else None,
+		})
+		upload.error_text = str(error)
+
+		if retry_at:
+			await UploadService._defer_upload(session, user_id, upload, retry_at)
+			print(
+				f"🔁 Загрузка {upload.id}: ошибка класса {error_class}, "
+				f"повтор {failures} в {retry_at.isoformat()}"
+			)
+		else:
+			upload.status = "error"
+			await session.commit()
+		return retry_at
+
+	@staticmethod
+	def _record_success(upload: YouTubeUpload, video_id: str, youtube_url: str) -> None:
+		"""Отметить загрузку успешной (сбрасывает счётчики неудач в истории)"""
+		upload.youtube_video_id = video_id
+		upload.youtube_url = youtube_url
+		upload.status = "success"
+		upload.uploaded_at = datetime.now()
+		upload.error_text = None
+		upload.attempt_history = UploadRetryPolicy.append_history(upload.attempt_history, {
+			"attempt": upload.attempts,
+			"at": datetime.now(timezone.utc).isoformat(),
+			"event": "success",
+		})
+
+	@staticmethod
+	async def _upload_to_youtube(
+		session: AsyncSession,
+		upload: YouTubeUpload,
+		file_path: str,
+		title: str,
+		credentials: dict,
+	) -> tuple[str, str]:
+		"""Загрузить файл версии, сохраняя сессию и подтверждённое смещение в YouTubeUpload.
+
+		Если у записи есть сохранённая сессия, загрузка продолжается с неё.
+		"""
+		async def save_progress(session_uri: str, offset: int) -> None:
+			upload.upload_session_uri = session_uri
+			upload.upload_offset = offset
+			# Загрузка продвигается — её не считают брошенной
+			upload.claimed_at = datetime.now(timezone.utc)
+			await session.commit()
+
+		video_id, youtube_url = await YouTubeService.upload_video(
+			file_path,
+			title,
+			credentials,
+			upload.privacy,
+			session_uri=upload.upload_session_uri,
+			on_progress=save_progress,
+		)
+		upload.upload_session_uri = None
+		upload.upload_offset = os.path.getsize(file_path)
+		return video_id, youtube_url
+
+	@staticmethod
+	async def _set_thumbnail(video_id: str, thumbnail_path: str, credentials: dict) -> bool:
+		"""Установить превью, снятое при рендере. Ошибка не влияет на загрузку"""
+		try:
+			await YouTubeService.set_thumbnail(video_id, thumbnail_path, credentials)
+			return True
+		except Exception as e:
+			# Свои превью доступны только подтверждённым каналам
+			print(f"⚠️ Не удалось установить превью для {video_id}: {e}")
+			return False
+
+	@staticmethod
+	async def run_upload_job(session: AsyncSession, job: ProcessingJob) -> dict:
+		"""Выполнить задачу очереди вида 'upload'.
+
+		Возвращает JSON-совместимый результат для ProcessingJob.result.
+		"""
+		payload = job.payload
+		source_id = uuid.UUID(payload["source_id"])
+		try:
+			result = await UploadService.process_and_upload(
+				session=session,
+				user_id=job.user_id,
+				source_id=source_id,
+				source_path=payload["path"],
+				original_filename=payload["original_filename"],
+				generate_orientations=payload.get("generate_orientations", False),
+				requested_orientations=payload.get("orientations") or [],
+				content_hash=payload.get("content_hash"),
+				size_bytes=payload.get("size_bytes"),
+				uniquify_mode=payload.get("uniquify_mode"),
+				seed=payload.get("seed"),
+				encoder_profile=payload.get("encoder_profile"),
+				video_info=payload.get("video_info"),
+			)
+		except QuotaExhaustedError:
+			# Задача будет отложена — исходник ещё понадобится
+			await session.rollback()
+			raise
+		except Exception:
+			await session.rollback()
+			await UploadService.release_job_source(session, job)
+			raise
+
+		result["status"] = "success"
+		return jsonable_encoder(result)
+
+	@staticmethod
+	async def release_job_source(session: AsyncSession, job: ProcessingJob) -> None:
+		"""Снять ссылку задачи на исходник, который так и не стал SourceAsset.
+
+		Задача 'upload' держит ссылку на source_blobs (или файл без хеша), пока
+		исходник не зарегистрирован. Если задача завершается окончательно —
+		ошибкой обработчика, исчерпанием попыток после падений воркера или как
+		задача неизвестного вида — ссылку нужно снять, иначе файл останется
+		навсегда. Повторный вызов для той же задачи ничего не делает.
+		"""
+		payload = job.payload or {}
+		if not payload.get("path") or not payload.get("source_id") or payload.get("source_released"):
+			return
+		if await session.get(SourceAsset, uuid.UUID(payload["source_id"])):
+			# Ссылка перешла к зарегистрированному исходнику
+			return
+
+		content_hash = payload.get("content_hash")
+		if content_hash:
+			await StorageService.release_blob(session, content_hash)
+		elif os.path.exists(payload["path"]):
+			os.remove(payload["path"])
+		job.payload = {**payload, "source_released": True}
+		await session.commit()
+
+	@staticmethod
+	async def process_variants(
+		session: AsyncSession,
+		user_id: uuid.UUID,
+		source_id: uuid.UUID,
+		count: int,
+		orientation: Optional[str] = None,
+		seed: Optional[int] = None,
+		encoder_profile: Optional[str] = None,
+	) -> dict:
+		"""Сделать count уникальных вариантов загруженного исходника и загрузить их на YouTube.
+
+		Каждый вариант — отдельная VideoVersion со своим transform_profile.
+		Варианты рендерятся пачками из одного декодирования (см.
+		_iter_variant_renders), загрузка готовой пачки идёт параллельно
+		с рендером следующей. Варианты, которые прошлая попытка задачи уже
+		загрузила или поставила в загрузку, не рендерятся повторно.
+		"""
+		await QuotaService.ensure_available(session, user_id)
+
+		source = await session.get(SourceAsset, source_id)
+		if not source or source.user_id != user_id:
+			raise ValueError("Исходник не найден")
+		if not os.path.exists(source.storage_path):
+			raise ValueError("Файл исходника отсутствует в хранилище")
+
+		video_info = await ProbeCacheService.get_video_info(session, source.storage_path, source.content_hash)
+		original_orientation = UploadService._detect_orientation(video_info["width"], video_info["height"])
+		encoder = await EncoderProfileService.resolve_for_user(session, user_id, encoder_profile)
+		orientation = orientation or original_orientation
+
+		published_seeds = await UploadService._get_published_variant_seeds(session, source_id, orientation)
+		if published_seeds:
+			print(f"⏭️ Вариантов уже в загрузке или загружено: {len(published_seeds)}")
+
+		renders = UploadService._iter_variant_renders(
+			source.storage_path,
+			StorageService.get_versions_dir(user_id),
+			video_info,
+			orientation,
+			original_orientation,
+			count,
+			source.content_hash,
+			seed,
+			encoder,
+			published_seeds,
+		)
+		if settings.UPLOAD_PIPELINE:
+			renders = UploadService._pipeline(renders, settings.UPLOAD_PIPELINE_BUFFER)
+
+		versions = []
+		async for render in renders:
+			versions.append(
+				await UploadService._publish_version(
+					session, user_id, source_id, source.original_filename, render
 				)
+			)
 
 		return {
 			"source_id": source_id,
-			"original_filename": original_filename,
+			"original_filename": source.original_filename,
 			"versions": versions,
 		}
 
+	@staticmethod
+	async def run_variants_job(session: AsyncSession, job: ProcessingJob) -> dict:
+		"""Выполнить задачу очереди вида 'variants'"""
+		payload = job.payload
+		try:
+			result = await UploadService.process_variants(
+				session=session,
+				user_id=job.user_id,
+				source_id=uuid.UUID(payload["source_id"]),
+				count=payload["count"],
+				orientation=payload.get("orientation"),
+				seed=payload.get("seed"),
+				encoder_profile=payload.get("encoder_profile"),
+			)
+		except Exception:
+			await session.rollback()
+			raise
+
+		result["status"] = "success"
+		return jsonable_encoder(result)
+
+	@staticmethod
+	async def _get_uploaded_orientations(session: AsyncSession, source_id: uuid.UUID) -> set:
+		"""Ориентации исходника, уже загруженные на YouTube или стоящие в загрузке.
+
+		Учитываются все загрузки, кроме неудачных (queued, deferred,
+		processing, success): повторно их не рендерим.
+		"""
+		query = select(VideoVersion.orientation).join(
+			YouTubeUpload, VideoVersion.id == YouTubeUpload.version_id
+		).where(VideoVersion.source_id == source_id, YouTubeUpload.status != "error")
+		result = await session.execute(query)
+		return set(result.scalars().all())
+
+	@staticmethod
+	async def _get_published_variant_seeds(
+		session: AsyncSession, source_id: uuid.UUID, orientation: str
+	) -> set:
+		"""Seed вариантов ориентации, уже загруженных или стоящих в загрузке.
+
+		Seed варианта определяет его рендер, поэтому по нему повторно
+		захваченная задача 'variants' находит уже опубликованные варианты.
+		"""
+		query = select(VideoVersion.transform_profile).join(
+			YouTubeUpload, VideoVersion.id == YouTubeUpload.version_id
+		).where(
+			VideoVersion.source_id == source_id,
+			VideoVersion.orientation == orientation,
+			YouTubeUpload.status != "error",
+		)
+		result = await session.execute(query)
+		return {
+			profile["seed"]
+			for profile in result.scalars().all()
+			if profile and profile.get("variant") and profile.get("seed") is not None
+		}
+
 	@staticmethod
 	def _detect_orientation(width: int, height: int) -> str:
 		"""Определить ориентацию видео"""
@@ -230,7 +910,41 @@ class UploadService:
 	async def retry_upload(
 		session: AsyncSession, user_id: uuid.UUID, upload_id: uuid.UUID
 	) -> dict:
-		"""Повторная попытка загрузки"""
+		"""Повторная попытка загрузки вручную.
+
+		Счётчики неудач для автоматических повторов начинаются заново; если
+		попытка снова не удалась временной ошибкой (или нет квоты), повтор
+		планируется задачей 'publish'. Если загрузку уже выполняет
+		запланированный повтор, возвращается статус 'processing'.
+		"""
+		return await UploadService.publish_upload(session, user_id, upload_id, event="manual_retry")
+
+	@staticmethod
+	async def run_publish_job(session: AsyncSession, job: ProcessingJob) -> dict:
+		"""Выполнить задачу очереди вида 'publish': загрузить готовую версию.
+
+		Повтор после временной ошибки или нехватки квоты ставится новой
+		задачей 'publish', текущая завершается с результатом 'deferred'.
+		"""
+		try:
+			result = await UploadService.publish_upload(
+				session, job.user_id, uuid.UUID(job.payload["upload_id"])
+			)
+		except Exception:
+			await session.rollback()
+			raise
+		return jsonable_encoder(result)
+
+	@staticmethod
+	async def publish_upload(
+		session: AsyncSession, user_id: uuid.UUID, upload_id: uuid.UUID, event: Optional[str] = None
+	) -> dict:
+		"""Загрузить на YouTube уже отрендеренную версию по записи YouTubeUpload.
+
+		Запись сначала занимается (_claim_upload): ручной повтор и задача
+		'publish' не загружают одну версию дважды. event — отметка в истории
+		попыток после того, как запись занята (например, 'manual_retry').
+		"""
 		upload_query = select(YouTubeUpload).where(YouTubeUpload.id == upload_id)
 		result = await session.execute(upload_query)
 		upload = result.scalar_one_or_none()
@@ -245,44 +959,132 @@ class UploadService:
 		if not version:
 			raise ValueError("Версия видео не найдена")
 
-		integration_query = select(Integration).where(
-			Integration.user_id == user_id, Integration.kind == "youtube", Integration.is_valid == True
-		)
-		result = await session.execute(integration_query)
-		integration = result.scalar_one_or_none()
-
-		if not integration:
-			raise ValueError("YouTube интеграция не найдена")
-
-		upload.status = "processing"
-		await session.commit()
-
-		try:
-			video_id, youtube_url = await YouTubeService.upload_video(
-				version.storage_path_render,
-				version.orientation,
-				integration.auth_data,
-				upload.privacy,
-			)
-
-			upload.youtube_video_id = video_id
-			upload.youtube_url = youtube_url
-			upload.status = "success"
-			upload.uploaded_at = datetime.now()
-			upload.error_text = None
-
-			await session.commit()
+		source = await session.get(SourceAsset, version.source_id)
+		if not source or source.user_id != user_id:
+			raise ValueError("Загрузка не найдена")
 
+		# Загрузку могла завершить другая задача или повторная попытка
+		if upload.status == "success":
 			return {
 				"id": upload.id,
 				"status": "success",
-				"youtube_url": youtube_url,
+				"youtube_url": upload.youtube_url,
 			}
 
+		if not await UploadService._claim_upload(session, upload):
+			# Загрузку уже выполняет (или завершила) другая задача или запрос
+			return {"id": upload.id, "status": upload.status, "youtube_url": upload.youtube_url}
+		if event:
+			upload.attempt_history = UploadRetryPolicy.append_history(upload.attempt_history, {
+				"attempt": upload.attempts,
+				"at": datetime.now(timezone.utc).isoformat(),
+				"event": event,
+			})
+
+		try:
+			# Файл версии мог быть удалён — восстанавливаем его из кэша или рендером
+			if not os.path.exists(version.storage_path_render):
+				await UploadService._restore_render(session, version)
+				# Сессия загрузки относится к прежнему файлу
+				upload.upload_session_uri = None
+				upload.upload_offset = 0
+			await session.commit()
 		except Exception as e:
 			upload.status = "error"
 			upload.error_text = str(e)
 			await session.commit()
-
 			raise
 
+		try:
+			video_id, youtube_url, _ = await UploadService._upload_with_quota(
+				session, user_id, upload, version.storage_path_render,
+				UploadService._version_title(source.original_filename, version.orientation, version.transform_profile),
+			)
+		except Exception as e:
+			retry_at = await UploadService._handle_upload_failure(session, user_id, upload, e)
+			if not retry_at:
+				raise
+			return {
+				"id": upload.id,
+				"status": "deferred",
+				"error_text": str(e),
+				"retry_at": retry_at,
+			}
+
+		UploadService._record_success(upload, video_id, youtube_url)
+		await session.commit()
+
+		return {
+			"id": upload.id,
+			"status": "success",
+			"youtube_url": youtube_url,
+		}
+
+	@staticmethod
+	async def _claim_upload(session: AsyncSession, upload: YouTubeUpload) -> bool:
+		"""Занять загрузку условным UPDATE (статус 'processing').
+
+		Ручной повтор и запланированная задача 'publish' могут взяться за одну
+		запись одновременно; загружает только тот, чей UPDATE изменил строку.
+		Запись в 'processing' без продвижения дольше UPLOAD_CLAIM_TIMEOUT
+		(упавший воркер) занимается заново. Возвращает False, если запись
+		занята другим; upload в любом случае обновляется из БД.
+		"""
+		now = datetime.now(timezone.utc)
+		stale_before = now - timedelta(seconds=settings.UPLOAD_CLAIM_TIMEOUT)
+		result = await session.execute(
+			update(YouTubeUpload)
+			.where(
+				YouTubeUpload.id == upload.id,
+				or_(
+					YouTubeUpload.status.in_(("queued", "deferred", "error")),
+					and_(
+						YouTubeUpload.status == "processing",
+						or_(YouTubeUpload.claimed_at.is_(None), YouTubeUpload.claimed_at < stale_before),
+					),
+				),
+			)
+			.values(status="processing", claimed_at=now)
+			.returning(YouTubeUpload.id)
+			.execution_options(synchronize_session=False)
+		)
+		claimed = result.scalar_one_or_none() is not None
+		await session.commit()
+		await session.refresh(upload)
+		return claimed
+
+	@staticmethod
+	async def _restore_render(session: AsyncSession, version: VideoVersion) -> None:
+		"""Заново получить файл версии по сохранённому seed.
+
+		Профиль детерминирован, поэтому результат совпадает с исходным рендером;
+		при наличии записи в кэше рендеров повторного кодирования нет.
+		"""
+		profile = version.transform_profile or {}
+		source = await session.get(SourceAsset, version.source_id)
+		if profile.get("seed") is None or not source or not os.path.exists(source.storage_path):
+			raise ValueError("Файл версии удалён и не может быть восстановлен")
+
+		video_info = await ProbeCacheService.get_video_info(session, source.storage_path, source.content_hash)
+		original_orientation = UploadService._detect_orientation(video_info["width"], video_info["height"])
+		render = {
+			"version_id": version.id,
+			"orientation": version.orientation,
+			"render_orientation": version.orientation if version.orientation != original_orientation else None,
+			"output_path": version.storage_path_render,
+			"thumbnail_path": version.thumbnail_path,
+			"contact_sheet_path": version.contact_sheet_path,
+		}
+		UploadService._prepare_render(
+			render,
+			source.storage_path,
+			video_info,
+			"fast" if profile.get("mode") == "fast" else "full",
+			source.content_hash,
+			profile["seed"],
+			profile.get("encoder"),
+		)
+		os.makedirs(os.path.dirname(version.storage_path_render), exist_ok=True)
+		await UploadService._render_one(source.storage_path, video_info, render)
+		if render.get("error"):
+			raise render["error"]
@@ -1,118 +1,221 @@
+import asyncio
+import math
 import os
 import random
-import subprocess
+import shutil
 from pathlib import Path
-from typing import Dict, Tuple, Optional
-import ffmpeg
-from mutagen import File as MutagenFile
+from typing import Dict, List, Tuple, Optional
 
 from app.core.config import settings
+from app.services.ffmpeg_runner import FFmpegRunner
+from app.services.encode_scheduler import encode_scheduler
+from app.services.encoder_profiles import EncoderProfileService
+from app.services.mp4_scrubber import Mp4MetadataScrubber
 
 
 class VideoProcessor:
 	"""Обработка видео: очистка метаданных, уникализация, генерация ориентаций"""
 
+	# Timescale видеодорожки для быстрой уникализации (выбирается случайно)
+	FAST_TIMESCALES = [15360, 30000, 60000, 90000, 12800]
+	FAST_AUDIO_BITRATE = 128000
+	# Окно изменения размера файла при уникализации (доля от исходного)
+	SIZE_CHANGE_RANGE = (-0.02, -0.002)
+	# Окно изменения длительности, секунды: только укорочение — удлинить исходник нельзя
+	DURATION_CHANGE_RANGE = (-0.1, -0.02)
+	MIN_VIDEO_BITRATE = 100000
+	# Размер буфера VBV в секундах потока: меньше — точнее битрейт на отрезках
+	VBV_BUFFER_SECONDS = 1.0
+	# Качество generate_orientation (единственный рендер без целевого размера)
+	ORIENTATION_CRF = 23
+	# Допустимое отклонение размера результата от целевого
+	SIZE_TOLERANCE = 0.01
+	# Превью: первый кадр версии не шире 1280 (рекомендация YouTube)
+	THUMBNAIL_FILTER = "scale='min(1280,iw)':-2"
+	# Контактный лист: сетка кадров, равномерно распределённых по длительности
+	CONTACT_SHEET_COLUMNS = 4
+	CONTACT_SHEET_ROWS = 4
+	CONTACT_SHEET_TILE_WIDTH = 320
+
+	@staticmethod
+	def parse_rational(value: Optional[str]) -> float:
+		"""Безопасно разобрать дробь ffprobe вида '30000/1001' (без eval)"""
+		if not value:
+			return 0.0
+		numerator, _, denominator = str(value).partition("/")
+		try:
+			numerator_value = float(numerator)
+			denominator_value = float(denominator) if denominator else 1.0
+		except ValueError:
+			return 0.0
+		if denominator_value == 0:
+			return 0.0
+		result = numerator_value / denominator_value
+		# float() принимает и 'nan'/'inf' — в кэш они попасть не должны
+		return result if math.isfinite(result) and result > 0 else 0.0
+
+	@staticmethod
+	def _to_int(value: Optional[str]) -> Optional[int]:
+		"""Числовое поле ffprobe (строка) в int, пустое или нулевое — None"""
+		try:
+			return int(float(value)) or None
+		except (TypeError, ValueError):
+			return None
+
 	@staticmethod
 	async def get_video_info(file_path: str) -> Dict[str, float]:
 		"""Получить информацию о видео"""
-		probe = ffmpeg.probe(file_path)
+		info, _ = await VideoProcessor.probe_video(file_path)
+		return info
+
+	@staticmethod
+	async def probe_video(file_path: str) -> Tuple[Dict, Dict]:
+		"""Получить информацию о видео и полный ответ ffprobe.
+
+		Помимо длительности, размера и FPS возвращает параметры, по которым
+		планируется кодирование: кодеки, битрейты, интервал ключевых кадров
+		(GOP) и раскладку аудио.
+		"""
+		probe = await FFmpegRunner.probe(file_path)
 		video_stream = next(
 			(stream for stream in probe["streams"] if stream["codec_type"] == "video"), None
 		)
 		if not video_stream:
 			raise ValueError("Видео поток не найден")
+		audio_stream = next(
+			(stream for stream in probe["streams"] if stream["codec_type"] == "audio"), None
+		)
 
-		return {
-			"duration": float(probe["format"]["duration"]),
+		fmt = probe["format"]
+		fps = VideoProcessor.parse_rational(
+			video_stream.get("r_frame_rate")
+		) or VideoProcessor.parse_rational(video_stream.get("avg_frame_rate"))
+
+		# GOP оцениваем по ключевым кадрам в начале файла (только пакеты, без декодирования)
+		keyframes = await FFmpegRunner.probe_keyframes(file_path, read_seconds=settings.PROBE_GOP_SECONDS)
+		intervals = [b - a for a, b in zip(keyframes, keyframes[1:])]
+		gop_seconds = sum(intervals) / len(intervals) if intervals else None
+
+		audio = audio_stream or {}
+		info = {
+			"duration": float(fmt["duration"]),
 			"width": int(video_stream["width"]),
 			"height": int(video_stream["height"]),
-			"fps": eval(video_stream["r_frame_rate"]),
+			"fps": fps,
+			"size": int(fmt.get("size") or os.path.getsize(file_path)),
+			"bitrate": VideoProcessor._to_int(fmt.get("bit_rate")),
+			"format_name": fmt.get("format_name"),
+			"video_codec": video_stream.get("codec_name"),
+			"video_profile": video_stream.get("profile"),
+			"pix_fmt": video_stream.get("pix_fmt"),
+			"video_bitrate": VideoProcessor._to_int(video_stream.get("bit_rate")),
+			"gop_seconds": gop_seconds,
+			"gop_frames": round(gop_seconds * fps) if gop_seconds and fps else None,
+			"has_audio": audio_stream is not None,
+			"audio_codec": audio.get("codec_name"),
+			"audio_bitrate": VideoProcessor._to_int(audio.get("bit_rate")),
+			"audio_channels": audio.get("channels"),
+			"audio_channel_layout": audio.get("channel_layout"),
+			"audio_sample_rate": VideoProcessor._to_int(audio.get("sample_rate")),
 		}
+		return info, probe
 
 	@staticmethod
 	async def clean_metadata(input_path: str, output_path: str) -> str:
-		"""Очистка метаданных из видео"""
-		# Используем subprocess для более точного контроля параметров ffmpeg
-		cmd = [
-			"ffmpeg",
-			"-i", input_path,
-			"-map_metadata", "-1",
-			"-map_metadata:s:v", "-1",
-			"-map_metadata:s:a", "-1",
-			"-c", "copy",
-			"-y",  # overwrite output
-			output_path
-		]
-		
-		subprocess.run(cmd, check=True, capture_output=True)
-
-		# Дополнительная очистка через mutagen для аудио
-		if os.path.exists(output_path):
-			try:
-				audio_file = MutagenFile(output_path)
-				if audio_file:
-					audio_file.delete()
-					audio_file.save()
-			except Exception:
-				pass  # Игнорируем ошибки очистки аудио метаданных
+		"""Очистка метаданных из видео.
 
+		Работает на уровне атомов MP4 (см. Mp4MetadataScrubber): mdat не
+		перекодируется и не перемуксовывается. При совпадении путей файл
+		очищается на месте.
+		"""
+		if os.path.abspath(input_path) == os.path.abspath(output_path):
+			await VideoProcessor.scrub_metadata(output_path)
+		else:
+			await asyncio.to_thread(Mp4MetadataScrubber.scrub_copy, input_path, output_path)
 		return output_path
 
 	@staticmethod
-	async def uniquify_video(
-		input_path: str, output_path: str, info: Dict[str, float]
-	) -> Tuple[str, Dict]:
-		"""Уникализация видео: изменение длительности, размера, FPS, битрейта"""
-		# Генерируем случайные изменения
-		duration_change = random.uniform(-0.1, 0.1)
-		fps_change_percent = random.uniform(-0.01, 0.01)
-		bitrate_change_percent = random.uniform(-0.01, 0.01)
-
-		new_duration = info["duration"] + duration_change
-		new_fps = info["fps"] * (1 + fps_change_percent)
-
-		# Вычисляем битрейт (приблизительно)
-		file_size = os.path.getsize(input_path)
-		original_bitrate = (file_size * 8) / info["duration"]
-		new_bitrate = int(original_bitrate * (1 + bitrate_change_percent))
-
-		# Применяем изменения
-		stream = ffmpeg.input(input_path)
-		stream = ffmpeg.filter(stream, "setpts", f"PTS-STARTPTS")
-		stream = ffmpeg.output(
-			stream,
-			output_path,
-			t=new_duration,
-			r=new_fps,
-			b=new_bitrate,
-			codec="libx264",
-			preset="medium",
-			crf=23,
-		)
+	async def scrub_metadata(file_path: str) -> Dict:
+		"""Очистить метаданные файла на месте и проверить результат"""
+		report = await asyncio.to_thread(Mp4MetadataScrubber.scrub_in_place, file_path)
+		remaining = await asyncio.to_thread(Mp4MetadataScrubber.find_metadata, file_path)
+		if remaining:
+			raise ValueError(f"Не удалось удалить метаданные: {', '.join(remaining)}")
+		return report
+
+	@staticmethod
+	def plan_uniquify(
+		input_path: str,
+		info: Dict[str, float],
+		seed: Optional[int] = None,
+		encoder: Optional[Dict] = None,
+	) -> Dict:
+		"""Сгенерировать параметры уникализации.
 
-		ffmpeg.run(stream, overwrite_output=True, quiet=True)
+		Параметры определяются seed: один и тот же seed для того же исходника
+		даёт тот же профиль (и тот же рендер). Без seed он выбирается случайно.
 
-		transform_profile = {
+		Размер результата планируется заранее: целевой размер выбирается
+		в окне SIZE_CHANGE_RANGE от исходного (никогда не больше исходника),
+		битрейт видео выводится из него по модели исходника — аудио,
+		накладные расходы контейнера и итоговая длительность. Кодирование
+		в режиме CBR (см. _build_video_codec_args) попадает в окно за один
+		проход, без пробных кодирований.
+		encoder — профиль кодирования (EncoderProfileService.resolve),
+		по умолчанию ENCODER_PROFILE. Битрейт аудио берётся из профиля
+		(но не выше исходного), сэкономленное место отдаётся видео.
+		"""
+		encoder = encoder or EncoderProfileService.resolve()
+		if seed is None:
+			seed = random.getrandbits(32)
+		rng = random.Random(seed)
+		duration_change = rng.uniform(*VideoProcessor.DURATION_CHANGE_RANGE)
+		fps_change_percent = rng.uniform(-0.01, 0.01)
+		bitrate_change_percent = rng.uniform(-0.01, 0.01)
+		size_change_percent = rng.uniform(*VideoProcessor.SIZE_CHANGE_RANGE)
+
+		source_duration = info["duration"]
+		output_duration = source_duration + duration_change
+
+		# Модель битрейта исходника по данным ffprobe
+		source_size = info.get("size") or os.path.getsize(input_path)
+		source_total_bitrate = source_size * 8 / source_duration
+		source_audio_bitrate = 0
+		if info.get("has_audio", True):
+			source_audio_bitrate = info.get("audio_bitrate") or VideoProcessor.FAST_AUDIO_BITRATE
+		source_video_bitrate = info.get("video_bitrate") or max(source_total_bitrate - source_audio_bitrate, 1)
+		overhead_bitrate = max(0, source_total_bitrate - source_video_bitrate - source_audio_bitrate)
+
+		audio_bitrate = source_audio_bitrate
+		if audio_bitrate and encoder.get("audio_bitrate"):
+			audio_bitrate = min(audio_bitrate, encoder["audio_bitrate"])
+		audio_bitrate = int(audio_bitrate * (1 + bitrate_change_percent))
+		target_size = int(source_size * (1 + size_change_percent))
+		video_bitrate = int(
+			target_size * 8 / output_duration - audio_bitrate - overhead_bitrate
+		)
+		video_bitrate = max(video_bitrate, VideoProcessor.MIN_VIDEO_BITRATE)
+
+		return {
+			"seed": seed,
 			"duration_change": duration_change,
 			"fps_change_percent": fps_change_percent,
-			"bitrate_change_percent": bitrate_change_percent,
+			"bitrate_change_percent": video_bitrate / source_video_bitrate - 1,
+			"audio_bitrate_change_percent": bitrate_change_percent,
+			"size_change_percent": size_change_percent,
+			"duration": output_duration,
+			"fps": info["fps"] * (1 + fps_change_percent),
+			"bitrate": video_bitrate,
+			"audio_bitrate": audio_bitrate or None,
+			"target_size": target_size,
+			"encoder": encoder,
 		}
 
-		return output_path, transform_profile
-
 	@staticmethod
-	async def generate_orientation(
-		input_path: str, output_path: str, orientation: str, original_info: Dict[str, float]
-	) -> Dict[str, float]:
-		"""Генерация ориентации: square (1:1), portrait (9:16), landscape (16:9)"""
-		width = original_info["width"]
-		height = original_info["height"]
-
+	def get_orientation_size(orientation: str, width: int, height: int) -> Tuple[int, int]:
+		"""Размер кадра для ориентации: square (1:1), portrait (9:16), landscape (16:9)"""
 		if orientation == "square":
-			target_size = min(width, height)
-			vf = f"scale={target_size}:{target_size}:force_original_aspect_ratio=decrease,pad={target_size}:{target_size}:(ow-iw)/2:(oh-ih)/2"
-			new_width = target_size
-			new_height = target_size
+			target_width = target_height = min(width, height)
 		elif orientation == "portrait":
 			# 9:16
 			target_height = height
@@ -120,9 +223,6 @@ class VideoProcessor:
 			if target_width > width:
 				target_width = width
 				target_height = int(target_width * 16 / 9)
-			vf = f"scale={target_width}:{target_height}:force_original_aspect_ratio=decrease,pad={target_width}:{target_height}:(ow-iw)/2:(oh-ih)/2"
-			new_width = target_width
-			new_height = target_height
 		elif orientation == "landscape":
 			# 16:9
 			target_width = width
@@ -130,31 +230,648 @@ class VideoProcessor:
 			if target_height > height:
 				target_height = height
 				target_width = int(target_height * 16 / 9)
-			vf = f"scale={target_width}:{target_height}:force_original_aspect_ratio=decrease,pad={target_width}:{target_height}:(ow-iw)/2:(oh-ih)/2"
-			new_width = target_width
-			new_height = target_height
 		else:
 			raise ValueError(f"Неизвестная ориентация: {orientation}")
 
-		stream = ffmpeg.input(input_path)
-		stream = ffmpeg.filter(stream, "scale", new_width, new_height)
-		stream = ffmpeg.filter(stream, "pad", new_width, new_height, "(ow-iw)/2", "(oh-ih)/2")
-		stream = ffmpeg.output(stream, output_path, vcodec="libx264", preset="medium", crf=23)
+		# libx264 требует чётные размеры кадра
+		return target_width - target_width % 2, target_height - target_height % 2
 
-		ffmpeg.run(stream, overwrite_output=True, quiet=True)
+	@staticmethod
+	def _build_video_filter(
+		width: int, height: int, profile: Optional[Dict] = None
+	) -> str:
+		"""Цепочка фильтров: сброс PTS, масштаб с полями и (опционально) новый FPS"""
+		filters = [
+			"setpts=PTS-STARTPTS",
+			f"scale={width}:{height}:force_original_aspect_ratio=decrease",
+			f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2",
+		]
+		if profile:
+			filters.append(f"fps={profile['fps']}")
+		return ",".join(filters)
+
+	@staticmethod
+	def _plan_output(
+		input_path: str,
+		info: Dict[str, float],
+		orientation: Optional[str] = None,
+		transform_profile: Optional[Dict] = None,
+	) -> Dict:
+		"""Рассчитать размер кадра и параметры уникализации одного выхода"""
+		profile = transform_profile or VideoProcessor.plan_uniquify(input_path, info)
+		if orientation:
+			width, height = VideoProcessor.get_orientation_size(
+				orientation, info["width"], info["height"]
+			)
+		else:
+			width, height = info["width"], info["height"]
+		return {"width": width, "height": height, "profile": profile}
+
+	@staticmethod
+	def _build_output_args(
+		plan: Dict, video_label: str, output_path: str, threads: int
+	) -> List[str]:
+		"""Аргументы ffmpeg для одного выхода: маппинг, очистка метаданных, кодирование"""
+		profile = plan["profile"]
+		return [
+			"-map", f"[{video_label}]",
+			"-map", "0:a:0?",
+			"-map_metadata", "-1",
+			"-map_chapters", "-1",
+			"-t", f"{profile['duration']:.3f}",
+			*VideoProcessor._build_video_codec_args(plan, threads),
+			*VideoProcessor._build_audio_codec_args(plan),
+			output_path,
+		]
+
+	@staticmethod
+	def _build_video_codec_args(plan: Dict, threads: int) -> List[str]:
+		"""Параметры видеокодировщика (общие для обычного и сегментного рендера).
+
+		Пресет, tune, GOP и x264-params берутся из профиля кодирования.
+		CBR с HRD: maxrate = bitrate и filler-данные выравнивают поток,
+		поэтому размер видеодорожки равен bitrate × длительность независимо
+		от сложности сцены.
+		"""
+		profile = plan["profile"]
+		bitrate = profile["bitrate"]
+		x264_params = {"nal-hrd": "cbr", "force-cfr": 1}
+		return [
+			*VideoProcessor._build_encoder_args(profile["encoder"], profile["fps"], threads, x264_params),
+			"-b:v", str(bitrate),
+			"-minrate", str(bitrate),
+			"-maxrate", str(bitrate),
+			"-bufsize", str(int(bitrate * VideoProcessor.VBV_BUFFER_SECONDS)),
+		]
+
+	@staticmethod
+	def _build_encoder_args(
+		encoder: Dict, fps: float, threads: int, x264_params: Optional[Dict] = None
+	) -> List[str]:
+		"""Параметры libx264 из профиля кодирования (без управления битрейтом)"""
+		args = [
+			"-c:v", "libx264",
+			"-threads", str(threads),
+			"-preset", encoder["preset"],
+		]
+		if encoder.get("tune"):
+			args.extend(["-tune", encoder["tune"]])
+		if encoder.get("gop_seconds") and fps:
+			args.extend(["-g", str(max(1, round(fps * encoder["gop_seconds"])))])
+		params = {**(encoder.get("x264_params") or {}), **(x264_params or {})}
+		if params:
+			args.extend(["-x264-params", ":".join(f"{key}={value}" for key, value in params.items())])
+		return args
+
+	@staticmethod
+	def _build_audio_codec_args(plan: Dict) -> List[str]:
+		"""Параметры аудиокодировщика: кодек профиля, битрейт из плана (см. plan_uniquify)"""
+		profile = plan["profile"]
+		args = ["-c:a", profile["encoder"].get("audio_codec") or "aac"]
+		audio_bitrate = profile.get("audio_bitrate")
+		if audio_bitrate:
+			args.extend(["-b:a", str(audio_bitrate)])
+		return args
+
+	@staticmethod
+	def _build_image_outputs(index: int, output: Dict, duration: float) -> Tuple[List[str], List[str], List[str]]:
+		"""Ветви фильтра и выходы для превью первого кадра и контактного листа.
+
+		Возвращает (метки ветвей для split, части графа, аргументы выходов).
+		Кадры берутся из уже декодированной и отмасштабированной цепочки версии,
+		поэтому отдельного декодирования готового видео не требуется.
+		"""
+		labels, graph, args = [], [], []
+		if output.get("thumbnail_path"):
+			labels.append(f"[t{index}]")
+			graph.append(f"[t{index}]{VideoProcessor.THUMBNAIL_FILTER}[th{index}]")
+			args.extend([
+				"-map", f"[th{index}]",
+				"-frames:v", "1",
+				"-update", "1",
+				"-q:v", "2",
+				output["thumbnail_path"],
+			])
+		if output.get("contact_sheet_path"):
+			labels.append(f"[c{index}]")
+			graph.append(f"[c{index}]{VideoProcessor._contact_sheet_filter(duration)}[cs{index}]")
+			args.extend([
+				"-map", f"[cs{index}]",
+				"-frames:v", "1",
+				"-update", "1",
+				"-q:v", "4",
+				output["contact_sheet_path"],
+			])
+		return labels, graph, args
+
+	@staticmethod
+	def _contact_sheet_filter(duration: float) -> str:
+		"""Фильтр контактного листа: равномерная выборка кадров в сетку"""
+		tiles = VideoProcessor.CONTACT_SHEET_COLUMNS * VideoProcessor.CONTACT_SHEET_ROWS
+		return (
+			f"fps={tiles / max(duration, 0.1):.6f},"
+			f"scale={VideoProcessor.CONTACT_SHEET_TILE_WIDTH}:-2,"
+			f"tile={VideoProcessor.CONTACT_SHEET_COLUMNS}x{VideoProcessor.CONTACT_SHEET_ROWS}"
+		)
+
+	@staticmethod
+	async def render_contact_sheet(video_path: str, output_path: str, duration: float) -> None:
+		"""Контактный лист по готовому видео.
+
+		Декодируются только ключевые кадры (-skip_frame nokey), поэтому
+		проход намного дешевле полного декодирования. Ошибка не ломает
+		версию: лист просто не сохраняется.
+		"""
+		try:
+			await FFmpegRunner.ffmpeg(
+				[
+					"-skip_frame", "nokey",
+					"-i", video_path,
+					"-map", "0:v:0",
+					"-vf", VideoProcessor._contact_sheet_filter(duration),
+					"-frames:v", "1",
+					"-update", "1",
+					"-q:v", "4",
+					output_path,
+				],
+				timeout=settings.FFMPEG_REMUX_TIMEOUT,
+			)
+		except Exception as e:
+			print(f"⚠️ Не удалось построить контактный лист {output_path}: {e}")
+
+	@staticmethod
+	def _plan_result(plan: Dict) -> Tuple[Dict[str, float], Dict]:
+		"""Информация о готовой версии и применённый transform_profile"""
+		profile = plan["profile"]
+		new_info = {
+			"duration": profile["duration"],
+			"width": plan["width"],
+			"height": plan["height"],
+			"fps": profile["fps"],
+		}
+		transform_profile = {
+			"seed": profile["seed"],
+			"duration_change": profile["duration_change"],
+			"fps_change_percent": profile["fps_change_percent"],
+			"bitrate_change_percent": profile["bitrate_change_percent"],
+			"audio_bitrate_change_percent": profile.get("audio_bitrate_change_percent"),
+			"size_change_percent": profile.get("size_change_percent"),
+			"target_size": profile.get("target_size"),
+			"encoder": profile.get("encoder"),
+		}
+		return new_info, transform_profile
+
+	@staticmethod
+	def _check_output_size(output_path: str, plan: Dict) -> None:
+		"""Сравнить размер результата с целевым (без перекодирования)"""
+		target_size = plan["profile"].get("target_size")
+		if not target_size:
+			return
+		actual_size = os.path.getsize(output_path)
+		deviation = actual_size / target_size - 1
+		if abs(deviation) > VideoProcessor.SIZE_TOLERANCE:
+			print(
+				f"⚠️ {output_path}: размер {actual_size} байт отличается от целевого "
+				f"{target_size} на {deviation * 100:.2f}%"
+			)
+
+	@staticmethod
+	async def render_versions(
+		input_path: str,
+		outputs: List[Dict],
+		info: Dict[str, float],
+	) -> List[Tuple[Dict[str, float], Dict]]:
+		"""Рендер нескольких версий из одного декодирования.
+
+		Исходник декодируется один раз, фильтр split раздаёт кадры в отдельные
+		цепочки scale/pad/fps и кодировщики — всё в одном процессе ffmpeg.
+		Каждый элемент outputs: {"output_path", "orientation", "transform_profile"},
+		у каждого выхода свои параметры уникализации.
+		"""
+		plans = [
+			VideoProcessor._plan_output(
+				input_path, info, output.get("orientation"), output.get("transform_profile")
+			)
+			for output in outputs
+		]
+
+		chains = [
+			VideoProcessor._build_video_filter(plan["width"], plan["height"], plan["profile"])
+			for plan in plans
+		]
+		# Превью и контактный лист — дополнительные ветви той же цепочки
+		extras = [
+			VideoProcessor._build_image_outputs(index, output, plan["profile"]["duration"])
+			for index, (plan, output) in enumerate(zip(plans, outputs))
+		]
+		if len(chains) == 1:
+			sources = ["[0:v]"]
+			graph = []
+		else:
+			split_labels = "".join(f"[s{index}]" for index in range(len(chains)))
+			sources = [f"[s{index}]" for index in range(len(chains))]
+			graph = [f"[0:v]split={len(chains)}{split_labels}"]
+		for index, (source, chain, (extra_labels, extra_graph, _)) in enumerate(zip(sources, chains, extras)):
+			if extra_labels:
+				graph.append(f"{source}{chain},split={len(extra_labels) + 1}[v{index}]{''.join(extra_labels)}")
+				graph.extend(extra_graph)
+			else:
+				graph.append(f"{source}{chain}[v{index}]")
+
+		# Каждый выход — отдельный кодировщик, поэтому занимает свой слот
+		async with encode_scheduler.slot(weight=len(plans)) as threads:
+			args = [
+				"-threads", str(threads),
+				"-i", input_path,
+				"-filter_complex", ";".join(graph),
+				"-filter_complex_threads", str(threads),
+			]
+			for index, (plan, output) in enumerate(zip(plans, outputs)):
+				args.extend(
+					VideoProcessor._build_output_args(plan, f"v{index}", output["output_path"], threads)
+				)
+				args.extend(extras[index][2])
+
+			await FFmpegRunner.ffmpeg(args, timeout=settings.FFMPEG_RENDER_TIMEOUT)
+
+		# ffmpeg всё равно пишет тег кодировщика и время создания — убираем их
+		for plan, output in zip(plans, outputs):
+			await VideoProcessor.scrub_metadata(output["output_path"])
+			VideoProcessor._check_output_size(output["output_path"], plan)
+
+		return [VideoProcessor._plan_result(plan) for plan in plans]
+
+	@staticmethod
+	async def render_version(
+		input_path: str,
+		output_path: str,
+		info: Dict[str, float],
+		orientation: Optional[str] = None,
+		transform_profile: Optional[Dict] = None,
+		thumbnail_path: Optional[str] = None,
+		contact_sheet_path: Optional[str] = None,
+	) -> Tuple[Dict[str, float], Dict]:
+		"""Рендер версии за один проход ffmpeg.
+
+		Очистка метаданных, смена ориентации и уникализация (длительность, FPS,
+		битрейт) выполняются одним кодированием, без промежуточных файлов.
+		Если orientation не указана, размер кадра сохраняется. Превью и
+		контактный лист (если заданы пути) — дополнительные выходы того же прохода.
+		"""
+		if VideoProcessor.should_segment(info):
+			return await VideoProcessor.render_segmented(
+				input_path, output_path, info, orientation, transform_profile, thumbnail_path,
+				contact_sheet_path,
+			)
+		results = await VideoProcessor.render_versions(
+			input_path,
+			[{
+				"output_path": output_path,
+				"orientation": orientation,
+				"transform_profile": transform_profile,
+				"thumbnail_path": thumbnail_path,
+				"contact_sheet_path": contact_sheet_path,
+			}],
+			info,
+		)
+		return results[0]
+
+	@staticmethod
+	def should_segment(info: Dict[str, float]) -> bool:
+		"""Стоит ли кодировать исходник сегментами параллельно.
+
+		Один libx264 плохо масштабируется на много ядер, поэтому длинные
+		и 4K-исходники выгоднее резать по GOP и кодировать параллельно.
+		"""
+		if not settings.SEGMENT_ENCODING or encode_scheduler.total_slots < 2:
+			return False
+		duration = info.get("duration") or 0
+		if duration < 2 * settings.SEGMENT_MIN_SECONDS:
+			return False
+		is_4k = (info.get("width") or 0) * (info.get("height") or 0) >= 3840 * 2160
+		return is_4k or duration >= settings.SEGMENT_SOURCE_MIN_DURATION
+
+	@staticmethod
+	def _plan_segments(keyframes: List[float], duration: float, count: int) -> List[Tuple[float, float]]:
+		"""Разбить [0, duration) на count частей по ближайшим ключевым кадрам.
+
+		keyframes — времена ключевых кадров от начала файла. Каждая часть
+		начинается с ключевого кадра, поэтому её декодирование не зависит от
+		соседних. Возвращает список (начало, длительность).
+		"""
+		min_length = settings.SEGMENT_MIN_SECONDS
+		cuts = [0.0]
+		for index in range(1, count):
+			target = duration * index / count
+			cut = min(keyframes, key=lambda k: abs(k - target)) if keyframes else None
+			if cut is not None and cut - cuts[-1] >= min_length and duration - cut >= min_length:
+				cuts.append(cut)
+		cuts.append(duration)
+		return [(start, end - start) for start, end in zip(cuts, cuts[1:])]
+
+	@staticmethod
+	async def render_segmented(
+		input_path: str,
+		output_path: str,
+		info: Dict[str, float],
+		orientation: Optional[str] = None,
+		transform_profile: Optional[Dict] = None,
+		thumbnail_path: Optional[str] = None,
+		contact_sheet_path: Optional[str] = None,
+	) -> Tuple[Dict[str, float], Dict]:
+		"""Рендер версии параллельным кодированием сегментов.
+
+		Исходник режется по ключевым кадрам на части, каждая кодируется
+		отдельным процессом ffmpeg в своём слоте планировщика с одним и тем же
+		планом (размер кадра, FPS, битрейт). Аудио кодируется один раз целиком.
+		Части склеиваются concat-демуксером без перекодирования (-c copy).
+		Превью снимается кодированием первого сегмента. Ни один процесс
+		не видит всё видео, поэтому контактный лист строится после склейки
+		по ключевым кадрам результата (render_contact_sheet).
+		"""
+		plan = VideoProcessor._plan_output(input_path, info, orientation, transform_profile)
+		profile = plan["profile"]
+		duration = profile["duration"]
+
+		keyframes = await FFmpegRunner.probe_keyframes(input_path)
+		if keyframes:
+			# Смещения от первого кадра: -ss отсчитывается от начала файла
+			keyframes = [k - keyframes[0] for k in keyframes]
+		segments = VideoProcessor._plan_segments(keyframes, duration, encode_scheduler.total_slots)
+		if len(segments) < 2:
+			results = await VideoProcessor.render_versions(
+				input_path,
+				[{
+					"output_path": output_path,
+					"orientation": orientation,
+					"transform_profile": profile,
+					"thumbnail_path": thumbnail_path,
+					"contact_sheet_path": contact_sheet_path,
+				}],
+				info,
+			)
+			return results[0]
+
+		work_dir = Path(f"{output_path}.segments")
+		work_dir.mkdir(parents=True, exist_ok=True)
+		video_filter = VideoProcessor._build_video_filter(plan["width"], plan["height"], profile)
+		segment_paths = [str(work_dir / f"{index:04d}.mp4") for index in range(len(segments))]
+		audio_path = str(work_dir / "audio.m4a")
+		has_audio = info.get("has_audio", True)
+
+		async def encode_segment(start: float, length: float, segment_path: str) -> None:
+			# Первый сегмент заодно отдаёт кадр превью
+			with_thumbnail = thumbnail_path and start == 0
+			if with_thumbnail:
+				filter_args = [
+					"-filter_complex",
+					f"[0:v]{video_filter},split=2[v][t];[t]{VideoProcessor.THUMBNAIL_FILTER}[th]",
+					"-map", "[v]",
+				]
+			else:
+				filter_args = ["-map", "0:v:0", "-vf", video_filter]
+
+			async with encode_scheduler.slot() as threads:
+				args = [
+					"-threads", str(threads),
+					"-ss", f"{start:.6f}",
+					"-i", input_path,
+					*filter_args,
+					"-t", f"{length:.6f}",
+					"-an",
+					*VideoProcessor._build_video_codec_args(plan, threads),
+					segment_path,
+				]
+				if with_thumbnail:
+					args.extend(["-map", "[th]", "-frames:v", "1", "-update", "1", "-q:v", "2", thumbnail_path])
+				await FFmpegRunner.ffmpeg(args, timeout=settings.FFMPEG_RENDER_TIMEOUT)
+
+		async def encode_audio() -> None:
+			await FFmpegRunner.ffmpeg(
+				[
+					"-i", input_path,
+					"-map", "0:a:0",
+					"-vn",
+					"-t", f"{duration:.3f}",
+					*VideoProcessor._build_audio_codec_args(plan),
+					audio_path,
+				],
+				timeout=settings.FFMPEG_RENDER_TIMEOUT,
+			)
+
+		tasks = [
+			asyncio.create_task(encode_segment(start, length, segment_path))
+			for (start, length), segment_path in zip(segments, segment_paths)
+		]
+		if has_audio:
+			tasks.append(asyncio.create_task(encode_audio()))
+
+		try:
+			try:
+				await asyncio.gather(*tasks)
+			except BaseException:
+				# Одна часть упала — остальные процессы ffmpeg не нужны
+				for task in tasks:
+					task.cancel()
+				await asyncio.gather(*tasks, return_exceptions=True)
+				raise
+
+			list_path = work_dir / "segments.txt"
+			list_path.write_text("".join(f"file '{path}'\n" for path in segment_paths))
+
+			args = ["-f", "concat", "-safe", "0", "-i", str(list_path)]
+			if has_audio:
+				args.extend(["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"])
+			args.extend([
+				"-map_metadata", "-1",
+				"-map_chapters", "-1",
+				"-c", "copy",
+				output_path,
+			])
+			await FFmpegRunner.ffmpeg(args, timeout=settings.FFMPEG_REMUX_TIMEOUT)
+		finally:
+			await asyncio.to_thread(shutil.rmtree, work_dir, True)
+
+		await VideoProcessor.scrub_metadata(output_path)
+		VideoProcessor._check_output_size(output_path, plan)
+		if contact_sheet_path:
+			await VideoProcessor.render_contact_sheet(output_path, contact_sheet_path, duration)
+		print(f"🧩 {output_path}: закодировано {len(segments)} сегментами параллельно")
+		return VideoProcessor._plan_result(plan)
+
+	@staticmethod
+	async def uniquify_video(
+		input_path: str,
+		output_path: str,
+		info: Dict[str, float],
+		seed: Optional[int] = None,
+		encoder: Optional[Dict] = None,
+	) -> Tuple[str, Dict]:
+		"""Уникализация видео: изменение длительности, размера, FPS, битрейта"""
+		_, transform_profile = await VideoProcessor.render_version(
+			input_path,
+			output_path,
+			info,
+			transform_profile=VideoProcessor.plan_uniquify(input_path, info, seed, encoder),
+		)
+		return output_path, transform_profile
+
+	@staticmethod
+	def plan_fast(info: Dict[str, float], seed: Optional[int] = None) -> Dict:
+		"""Параметры быстрой уникализации, детерминированные seed"""
+		if seed is None:
+			seed = random.getrandbits(32)
+		rng = random.Random(seed)
+		fps_change_percent = rng.uniform(-0.01, 0.01)
+		audio_bitrate_change_percent = rng.uniform(-0.01, 0.01)
+		padding_percent = rng.uniform(0.001, 0.02)
+		timescale = rng.choice(VideoProcessor.FAST_TIMESCALES)
+		trim = rng.uniform(0, 0.1)
+
+		# Растяжение временных меток меняет FPS и длительность одновременно
+		pts_scale = 1 / (1 + fps_change_percent)
+		source_audio_bitrate = info.get("audio_bitrate") or VideoProcessor.FAST_AUDIO_BITRATE
+
+		return {
+			"seed": seed,
+			"fps_change_percent": fps_change_percent,
+			"audio_bitrate_change_percent": audio_bitrate_change_percent,
+			"padding_percent": padding_percent,
+			"video_track_timescale": timescale,
+			"pts_scale": pts_scale,
+			"duration": info["duration"] * pts_scale - trim,
+			"audio_bitrate": int(source_audio_bitrate * (1 + audio_bitrate_change_percent)),
+		}
+
+	@staticmethod
+	async def uniquify_fast(
+		input_path: str,
+		output_path: str,
+		info: Dict[str, float],
+		plan: Optional[Dict] = None,
+		thumbnail_path: Optional[str] = None,
+	) -> Tuple[Dict[str, float], Dict]:
+		"""Быстрая уникализация без перекодирования видео.
+
+		Видеопоток копируется как есть, меняются только:
+		- временные метки (bsf setts) — FPS и длительность на ±1%;
+		- обрезка конца на ролике (до 0.1 с, по границе пакета);
+		- timescale видеодорожки;
+		- аудио перекодируется с atempo под новую длительность и битрейтом ±1%;
+		- в конец контейнера дописывается free-бокс (размер файла +0.1…2%).
+		Стоимость определяется вводом-выводом, а не CPU.
+		plan — результат plan_fast; без него параметры выбираются случайно.
+		thumbnail_path — превью из первого кадра тем же запуском ffmpeg
+		(декодируется только один кадр).
+		"""
+		plan = plan or VideoProcessor.plan_fast(info)
+		fps_change_percent = plan["fps_change_percent"]
+		new_duration = plan["duration"]
+
+		args = [
+			"-i", input_path,
+			"-map", "0:v:0",
+			"-map", "0:a:0?",
+			"-map_metadata", "-1",
+			"-map_chapters", "-1",
+			"-c:v", "copy",
+			"-bsf:v", f"setts=ts=TS*{plan['pts_scale']:.9f}",
+			"-video_track_timescale", str(plan["video_track_timescale"]),
+			"-c:a", "aac",
+			"-b:a", str(plan["audio_bitrate"]),
+			"-af", f"atempo={1 + fps_change_percent:.6f}",
+			"-t", f"{new_duration:.3f}",
+			output_path,
+		]
+		if thumbnail_path:
+			args.extend([
+				"-map", "0:v:0",
+				"-vf", VideoProcessor.THUMBNAIL_FILTER,
+				"-frames:v", "1",
+				"-update", "1",
+				"-q:v", "2",
+				thumbnail_path,
+			])
+		await FFmpegRunner.ffmpeg(args, timeout=settings.FFMPEG_REMUX_TIMEOUT)
+
+		padding_bytes = int(os.path.getsize(output_path) * plan["padding_percent"])
+		await asyncio.to_thread(VideoProcessor._append_free_box, output_path, padding_bytes)
+		await VideoProcessor.scrub_metadata(output_path)
+
+		new_info = {
+			"duration": new_duration,
+			"width": info["width"],
+			"height": info["height"],
+			"fps": info["fps"] * (1 + fps_change_percent),
+		}
+		transform_profile = {
+			"mode": "fast",
+			"seed": plan["seed"],
+			"duration_change": new_duration - info["duration"],
+			"fps_change_percent": fps_change_percent,
+			"audio_bitrate_change_percent": plan["audio_bitrate_change_percent"],
+			"video_track_timescale": plan["video_track_timescale"],
+			"padding_bytes": padding_bytes,
+		}
+		return new_info, transform_profile
+
+	@staticmethod
+	def _append_free_box(file_path: str, payload_size: int) -> None:
+		"""Дописать в конец MP4 пустой free-бокс (игнорируется плеерами)"""
+		payload_size = min(payload_size, 0xFFFFFFFF - 8)
+		with open(file_path, "ab") as f:
+			f.write((payload_size + 8).to_bytes(4, "big") + b"free")
+			remaining = payload_size
+			zeros = bytes(min(remaining, settings.UPLOAD_CHUNK_SIZE))
+			while remaining > 0:
+				f.write(zeros[:remaining])
+				remaining -= len(zeros)
+
+	@staticmethod
+	async def generate_orientation(
+		input_path: str,
+		output_path: str,
+		orientation: str,
+		original_info: Dict[str, float],
+		encoder: Optional[Dict] = None,
+	) -> Dict[str, float]:
+		"""Генерация ориентации: square (1:1), portrait (9:16), landscape (16:9)"""
+		width, height = VideoProcessor.get_orientation_size(
+			orientation, original_info["width"], original_info["height"]
+		)
+		encoder = encoder or EncoderProfileService.resolve()
+		audio_args = ["-c:a", encoder.get("audio_codec") or "aac"]
+		if encoder.get("audio_bitrate"):
+			audio_args.extend(["-b:a", str(encoder["audio_bitrate"])])
+
+		async with encode_scheduler.slot() as threads:
+			await FFmpegRunner.ffmpeg(
+				[
+					"-threads", str(threads),
+					"-i", input_path,
+					"-vf", VideoProcessor._build_video_filter(width, height),
+					*VideoProcessor._build_encoder_args(encoder, original_info["fps"], threads),
+					"-crf", str(VideoProcessor.ORIENTATION_CRF),
+					*audio_args,
+					output_path,
+				],
+				timeout=settings.FFMPEG_RENDER_TIMEOUT,
+			)
+		await VideoProcessor.scrub_metadata(output_path)
 
 		return {
 			"duration": original_info["duration"],
-			"width": new_width,
-			"height": new_height,
+			"width": width,
+			"height": height,
 			"fps": original_info["fps"],
 		}
 
 	@staticmethod
 	async def extract_thumbnail(video_path: str, output_path: str) -> str:
 		"""Извлечь первый кадр как превью"""
-		ffmpeg.input(video_path, ss="00:00:00").output(
-			output_path, vframes=1
-		).overwrite_output().run(quiet=True)
+		await FFmpegRunner.ffmpeg(
+			["-ss", "0", "-i", video_path, "-frames:v", "1", output_path],
+			timeout=settings.FFMPEG_THUMBNAIL_TIMEOUT,
+		)
 		return output_path
 
@@ -1,12 +1,11 @@
 import os
 from typing import Optional, Dict, Any
-from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from googleapiclient.errors import HttpError
 
 from app.core.config import settings
+from app.services.google_client_cache import GoogleClientCache
+from app.services.oauth_token_manager import OAuthTokenManager
+from app.services.youtube_uploader import ProgressCallback, YouTubeResumableUploader
 
 
 class YouTubeService:
@@ -72,8 +71,7 @@ class YouTubeService:
 			credentials["token_uri"] = "https://oauth2.googleapis.com/token"
 		
 		try:
-			creds = Credentials.from_authorized_user_info(credentials)
-			return build("youtube", "v3", credentials=creds)
+			return GoogleClientCache.get_client("youtube", "v3", credentials)
 		except Exception as e:
 			raise ValueError(
 				f"Ошибка создания YouTube клиента: {str(e)}. "
@@ -81,9 +79,10 @@ class YouTubeService:
 			) from e
 	
 	@staticmethod
-	def get_account_info(credentials: dict) -> Dict[str, Any]:
+	async def get_account_info(credentials: dict) -> Dict[str, Any]:
 		"""Получить информацию об аккаунте YouTube"""
 		try:
+			credentials = await OAuthTokenManager.get_credentials(credentials)
 			youtube = YouTubeService.get_client(credentials)
 			response = youtube.channels().list(part="snippet", mine=True).execute()
 			items = response.get("items") or []
@@ -100,58 +99,52 @@ class YouTubeService:
 			print(f"⚠️ Не удалось получить данные YouTube аккаунта: {error}")
 			return {}
 
+	@staticmethod
+	async def get_access_token(credentials: dict) -> str:
+		"""Действующий access token, при необходимости обновлённый по refresh token"""
+		return await OAuthTokenManager.get_access_token(credentials)
+
 	@staticmethod
 	async def upload_video(
 		file_path: str,
 		title: Optional[str],
 		credentials: dict,
 		privacy: str = "unlisted",
+		session_uri: Optional[str] = None,
+		on_progress: Optional[ProgressCallback] = None,
 	) -> tuple[str, str]:
-		"""Загрузить видео на YouTube"""
-		try:
-			youtube = YouTubeService.get_client(credentials)
-
-			body = {
-				"snippet": {
-					"title": title or os.path.basename(file_path),
-					"description": "",
-					"tags": [],
-					"categoryId": "22",  # People & Blogs
-				},
-				"status": {
-					"privacyStatus": privacy,
-					"selfDeclaredMadeForKids": False,
-				},
-			}
-
-			media = MediaFileUpload(file_path, chunksize=-1, resumable=True, mimetype="video/*")
-
-			insert_request = youtube.videos().insert(part="snippet,status", body=body, media_body=media)
-
-			response = None
-			while response is None:
-				status, response = insert_request.next_chunk()
-				if status:
-					pass  # Можно добавить прогресс-бар
+		"""Загрузить видео на YouTube.
+
+		session_uri — сохранённая сессия resumable upload: загрузка продолжается
+		с последнего подтверждённого байта. on_progress получает URI сессии и
+		смещение после каждой принятой части.
+		"""
+		body = {
+			"snippet": {
+				"title": title or os.path.basename(file_path),
+				"description": "",
+				"tags": [],
+				"categoryId": "22",  # People & Blogs
+			},
+			"status": {
+				"privacyStatus": privacy,
+				"selfDeclaredMadeForKids": False,
+			},
+		}
 
-			video_id = response["id"]
-			youtube_url = f"https://www.youtube.com/watch?v={video_id}"
+		access_token = await YouTubeService.get_access_token(credentials)
+		response = await YouTubeResumableUploader.upload(
+			file_path, body, access_token, session_uri=session_uri, on_progress=on_progress
+		)
 
-			return video_id, youtube_url
+		video_id = response["id"]
+		youtube_url = f"https://www.youtube.com/watch?v={video_id}"
 
-		except HttpError as e:
-			error_message = f"YouTube API error: {e.resp.status} - {e.content.decode()}"
-			raise Exception(error_message) from e
+		return video_id, youtube_url
 
 	@staticmethod
 	async def set_thumbnail(video_id: str, thumbnail_path: str, credentials: dict) -> None:
 		"""Установить миниатюру для видео"""
-		try:
-			youtube = YouTubeService.get_client(credentials)
-			youtube.thumbnails().set(
-				videoId=video_id, media_body=MediaFileUpload(thumbnail_path)
-			).execute()
-		except HttpError as e:
-			error_message = f"YouTube API error при установке thumbnail: {e.resp.status} - {e.content.decode()}"
-			raise Exception(error_message) from e
+		access_token = await YouTubeService.get_access_token(credentials)
+		await YouTubeResumableUploader.set_thumbnail(video_id, thumbnail_path, access_token)
 
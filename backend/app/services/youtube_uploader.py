@@ -0,0 +1,186 @@
+"""Асинхронная возобновляемая загрузка видео на YouTube (resumable upload)"""
+import asyncio
+import os
+import re
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+
+class YouTubeApiError(Exception):
+	"""Ошибка YouTube API с HTTP-статусом и причиной из тела ответа"""
+
+	def __init__(self, status: int, reason: Optional[str], message: str):
+		self.status = status
+		self.reason = reason
+		label = f"{status} {reason}" if reason else str(status)
+		super().__init__(f"YouTube API error: {label} - {message}")
+
+
+# Колбэк прогресса: (URI сессии, подтверждённое сервером смещение)
+ProgressCallback = Callable[[str, int], Awaitable[None]]
+
+
+class YouTubeResumableUploader:
+	"""Загрузка файла по протоколу resumable upload через httpx.
+
+	Сессия открывается POST с метаданными видео, затем файл отправляется
+	частями PUT с Content-Range. После каждой части сервер подтверждает
+	принятое смещение (308 + Range), оно передаётся в on_progress для
+	сохранения. По сохранённому URI сессии загрузка продолжается с последнего
+	подтверждённого байта; истёкшая сессия (404/410) открывается заново.
+	Event loop не блокируется: сеть — httpx, чтение файла — в пуле потоков.
+	"""
+
+	# Размер части должен быть кратен 256 КБ (кроме последней)
+	CHUNK_ALIGNMENT = 256 * 1024
+	TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+	@staticmethod
+	def get_chunk_size() -> int:
+		"""YOUTUBE_UPLOAD_CHUNK_SIZE, выровненный вниз до кратного 256 КБ"""
+		alignment = YouTubeResumableUploader.CHUNK_ALIGNMENT
+		return max(settings.YOUTUBE_UPLOAD_CHUNK_SIZE // alignment, 1) * alignment
+
+	@staticmethod
+	async def upload(
+		file_path: str,
+		metadata: Dict[str, Any],
+		access_token: str,
+		session_uri: Optional[str] = None,
+		on_progress: Optional[ProgressCallback] = None,
+	) -> Dict[str, Any]:
+		"""Загрузить файл, при наличии session_uri — продолжить сессию.
+
+		Возвращает ресурс видео из ответа API.
+		"""
+		file_size = os.path.getsize(file_path)
+		headers = {"Authorization": f"Bearer {access_token}"}
+
+		async with httpx.AsyncClient(timeout=YouTubeResumableUploader.TIMEOUT) as client:
+			offset = 0
+			if session_uri:
+				offset, video = await YouTubeResumableUploader._query_offset(
+					client, headers, session_uri, file_size
+				)
+				if video is not None:
+					return video
+				if offset is None:
+					print("ℹ️ Сессия загрузки YouTube истекла, открываем новую")
+					session_uri = None
+			if not session_uri:
+				session_uri = await YouTubeResumableUploader._start_session(
+					client, headers, metadata, file_size
+				)
+				offset = 0
+			elif offset:
+				print(f"ℹ️ Продолжаем загрузку на YouTube с байта {offset} из {file_size}")
+			if on_progress:
+				await on_progress(session_uri, offset)
+
+			chunk_size = YouTubeResumableUploader.get_chunk_size()
+			while True:
+				chunk = await asyncio.to_thread(
+					YouTubeResumableUploader._read_chunk, file_path, offset, chunk_size
+				)
+				end = offset + len(chunk) - 1
+				response = await client.put(
+					session_uri,
+					content=chunk,
+					headers={**headers, "Content-Range": f"bytes {offset}-{end}/{file_size}"},
+				)
+				if response.status_code in (200, 201):
+					return response.json()
+				if response.status_code != 308:
+					raise YouTubeResumableUploader._error(response)
+				offset = YouTubeResumableUploader._parse_range(response)
+				if on_progress:
+					await on_progress(session_uri, offset)
+
+	@staticmethod
+	async def set_thumbnail(video_id: str, image_path: str, access_token: str) -> None:
+		"""Установить превью видео простой загрузкой (uploadType=media).
+
+		Тот же httpx вместо googleapiclient: запрос не блокирует event loop.
+		"""
+		image = await asyncio.to_thread(Path(image_path).read_bytes)
+		async with httpx.AsyncClient(timeout=YouTubeResumableUploader.TIMEOUT) as client:
+			response = await client.post(
+				settings.YOUTUBE_THUMBNAIL_URL,
+				params={"videoId": video_id, "uploadType": "media"},
+				content=image,
+				headers={"Authorization": f"Bearer {access_token}", "Content-Type": "image/jpeg"},
+			)
+		if response.status_code != 200:
+			raise YouTubeResumableUploader._error(response)
+
+	@staticmethod
+	async def _start_session(
+		client: httpx.AsyncClient, headers: Dict[str, str], metadata: Dict[str, Any], file_size: int
+	) -> str:
+		"""Открыть сессию загрузки. Возвращает её URI"""
+		response = await client.post(
+			settings.YOUTUBE_UPLOAD_URL,
+			params={"uploadType": "resumable", "part": ",".join(metadata)},
+			json=metadata,
+			headers={
+				**headers,
+				"X-Upload-Content-Length": str(file_size),
+				"X-Upload-Content-Type": "video/*",
+			},
+		)
+		if response.status_code != 200:
+			raise YouTubeResumableUploader._error(response)
+		session_uri = response.headers.get("Location")
+		if not session_uri:
+			raise YouTubeApiError(response.status_code, None, "Сервер не вернул URI сессии загрузки")
+		return session_uri
+
+	@staticmethod
+	async def _query_offset(
+		client: httpx.AsyncClient, headers: Dict[str, str], session_uri: str, file_size: int
+	) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
+		"""Узнать у сервера, сколько байт сессии уже принято.
+
+		Возвращает (смещение, None); (None, видео), если загрузка уже
+		завершена; (None, None), если сессия истекла.
+		"""
+		response = await client.put(
+			session_uri, headers={**headers, "Content-Range": f"bytes */{file_size}"}
+		)
+		if response.status_code in (200, 201):
+			return None, response.json()
+		if response.status_code in (404, 410):
+			return None, None
+		if response.status_code != 308:
+			raise YouTubeResumableUploader._error(response)
+		return YouTubeResumableUploader._parse_range(response), None
+
+	@staticmethod
+	def _parse_range(response: httpx.Response) -> int:
+		"""Следующий байт к отправке по заголовку Range (bytes=0-N) ответа 308"""
+		match = re.match(r"bytes=0-(\d+)", response.headers.get("Range", ""))
+		return int(match.group(1)) + 1 if match else 0
+
+	@staticmethod
+	def _read_chunk(file_path: str, offset: int, size: int) -> bytes:
+		with open(file_path, "rb") as f:
+			f.seek(offset)
+			return f.read(size)
+
+	@staticmethod
+	def _error(response: httpx.Response) -> YouTubeApiError:
+		"""YouTubeApiError по ответу API (error.errors[0].reason, error.message)"""
+		reason = None
+		message = response.text
+		try:
+			error = response.json().get("error", {})
+			if isinstance(error, dict):
+				message = error.get("message") or message
+				reason = (error.get("errors") or [{}])[0].get("reason")
+		except ValueError:
+			pass
+		return YouTubeApiError(response.status_code, reason, message)
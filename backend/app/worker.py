@@ -0,0 +1,119 @@
+"""Воркер очереди задач: обработка и загрузка видео вне HTTP-запросов"""
+import asyncio
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, Dict
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine, Base
+from app.models import ProcessingJob
+from app.services.job_service import JobService
+from app.services.encode_scheduler import encode_scheduler
+from app.services.upload_service import UploadService
+from app.services.quota_service import QuotaExhaustedError
+
+JobHandler = Callable[..., Awaitable[dict]]
+
+# Обработчики задач по виду (ProcessingJob.kind)
+JOB_HANDLERS: Dict[str, JobHandler] = {
+	"upload": UploadService.run_upload_job,
+	"variants": UploadService.run_variants_job,
+	"publish": UploadService.run_publish_job,
+}
+
+
+async def _heartbeat(job_id: uuid.UUID) -> None:
+	"""Периодически продлевать аренду задачи, пока она выполняется"""
+	while True:
+		await asyncio.sleep(settings.JOB_HEARTBEAT_INTERVAL)
+		try:
+			async with AsyncSessionLocal() as session:
+				await JobService.heartbeat(session, job_id)
+		except Exception as e:
+			print(f"⚠️ Не удалось обновить heartbeat задачи {job_id}: {e}")
+
+
+async def _report_stats() -> None:
+	"""Периодически выводить загрузку планировщика кодирования"""
+	while True:
+		await asyncio.sleep(settings.WORKER_STATS_INTERVAL)
+		stats = encode_scheduler.stats()
+		print(
+			f"📊 Кодирование: слотов занято {stats['slots_in_use']}/{stats['total_slots']} "
+			f"(по {stats['threads_per_slot']} потоков), в очереди {stats['queued_jobs']}"
+		)
+
+
+async def _execute(job_id: uuid.UUID) -> None:
+	"""Выполнить захваченную задачу в отдельной сессии БД"""
+	async with AsyncSessionLocal() as session:
+		job = await session.get(ProcessingJob, job_id)
+
+		if job.attempts > settings.JOB_MAX_ATTEMPTS:
+			# Воркер падал на этой задаче (например, ffmpeg убит по OOM) —
+			# обработчик её не завершит, исходник освобождаем здесь
+			await UploadService.release_job_source(session, job)
+			await JobService.fail(session, job, "Превышено число попыток выполнения задачи")
+			return
+
+		handler = JOB_HANDLERS.get(job.kind)
+		if not handler:
+			await UploadService.release_job_source(session, job)
+			await JobService.fail(session, job, f"Неизвестный тип задачи: {job.kind}")
+			return
+
+		heartbeat = asyncio.create_task(_heartbeat(job.id))
+		try:
+			result = await handler(session, job)
+		except QuotaExhaustedError as e:
+			# Квоты нет ни на одном канале — ждём её, а не падаем
+			await session.rollback()
+			await JobService.defer(session, job, e.retry_at, str(e))
+			print(f"⏸️ Задача {job.id} ({job.kind}) отложена до {e.retry_at.isoformat()}")
+		except Exception as e:
+			print(f"❌ Задача {job.id} ({job.kind}) завершилась ошибкой: {e}")
+			await session.rollback()
+			await JobService.fail(session, job, str(e))
+		else:
+			await JobService.complete(session, job, result)
+			print(f"✅ Задача {job.id} ({job.kind}) выполнена")
+		finally:
+			heartbeat.cancel()
+
+
+async def _consume(worker_id: str) -> None:
+	"""Цикл одного потребителя очереди"""
+	while True:
+		try:
+			async with AsyncSessionLocal() as session:
+				job = await JobService.claim(session, worker_id)
+		except Exception as e:
+			print(f"⚠️ Ошибка при захвате задачи: {e}")
+			job = None
+
+		if not job:
+			await asyncio.sleep(settings.WORKER_POLL_INTERVAL)
+			continue
+
+		print(f"▶️ {worker_id} взял задачу {job.id} ({job.kind}), попытка {job.attempts}")
+		await _execute(job.id)
+
+
+async def main() -> None:
+	"""Запустить воркер: MAX_PARALLEL_UPLOADS параллельных потребителей очереди"""
+	async with engine.begin() as conn:
+		await conn.run_sync(Base.metadata.create_all)
+
+	worker_name = f"{socket.gethostname()}:{os.getpid()}"
+	stats = encode_scheduler.stats()
+	print(
+		f"🚀 Воркер {worker_name} запущен, параллельность: {settings.MAX_PARALLEL_UPLOADS}, "
+		f"слотов кодирования: {stats['total_slots']} × {stats['threads_per_slot']} потоков "
+		f"({stats['cpu_count']} ядер)"
+	)
+
+	await asyncio.gather(
+		_report_stats(),
+		*(_consume(f"{worker_name}/{index}") for index in range(settings.MAX_PARALLEL_UPLOADS)),
+	)
@@ -0,0 +1,40 @@
+"""Скрипт обновления схемы существующей БД (ALTER TABLE для новых колонок)"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Добавляем корневую директорию в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.database import engine, Base
+import app.models  # noqa: F401 — регистрирует модели в Base.metadata
+from sqlalchemy import text
+
+MIGRATIONS_DIR = Path(__file__).parent.parent.parent / "Project description" / "migrations"
+
+
+def split_statements(sql: str) -> list[str]:
+	"""SQL-инструкции файла миграции без комментариев"""
+	lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+	return [statement.strip() for statement in "\n".join(lines).split(";") if statement.strip()]
+
+
+async def migrate():
+	"""Создать новые таблицы и применить миграции по порядку имён файлов"""
+	async with engine.begin() as conn:
+		print("🔨 Создание новых таблиц...")
+		await conn.run_sync(Base.metadata.create_all)
+
+		for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+			print(f"📜 Миграция {path.name}")
+			for statement in split_statements(path.read_text(encoding="utf-8")):
+				await conn.execute(text(statement))
+	print("✅ Схема БД обновлена")
+
+
+if __name__ == "__main__":
+	try:
+		asyncio.run(migrate())
+	except Exception as e:
+		print(f"❌ Ошибка обновления схемы: {e}")
+		sys.exit(1)
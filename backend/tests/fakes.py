@@ -0,0 +1,62 @@
+"""Заглушка AsyncSession для сервисов, которые только строят запросы и коммитят"""
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class FakeResult:
+	def __init__(self, value: Any = None, rows: Optional[list] = None):
+		self.value = value
+		self.rows = rows or []
+
+	def scalar_one_or_none(self) -> Any:
+		return self.value
+
+	def scalar_one(self) -> Any:
+		return self.value
+
+	def all(self) -> list:
+		return self.rows
+
+	def scalars(self) -> "FakeResult":
+		return self
+
+
+class FakeSession:
+	"""Записывает выполненные запросы; execute возвращает заранее заданные результаты по очереди"""
+
+	def __init__(self, *results: FakeResult):
+		self.results: List[FakeResult] = list(results)
+		self.statements: list = []
+		self.added: list = []
+		self.deleted: list = []
+		# Объекты для session.get: (модель, первичный ключ) -> объект
+		self.objects: Dict[Tuple[Any, Any], Any] = {}
+		self.commits = 0
+		self.rollbacks = 0
+
+	async def __aenter__(self) -> "FakeSession":
+		return self
+
+	async def __aexit__(self, *exc_info: Any) -> None:
+		pass
+
+	async def get(self, model: Any, key: Any) -> Any:
+		return self.objects.get((model, key))
+
+	async def execute(self, statement: Any) -> FakeResult:
+		self.statements.append(statement)
+		return self.results.pop(0) if self.results else FakeResult()
+
+	def add(self, instance: Any) -> None:
+		self.added.append(instance)
+
+	async def delete(self, instance: Any) -> None:
+		self.deleted.append(instance)
+
+	async def commit(self) -> None:
+		self.commits += 1
+
+	async def rollback(self) -> None:
+		self.rollbacks += 1
+
+	async def refresh(self, instance: Any) -> None:
+		pass
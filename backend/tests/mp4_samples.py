@@ -0,0 +1,121 @@
+"""Сборка минимальных MP4/MOV в памяти для тестов разбора боксов"""
+import struct
+from typing import List, Optional
+
+
+def box(box_type: bytes, *payload: bytes) -> bytes:
+	body = b"".join(payload)
+	return struct.pack(">I4s", 8 + len(body), box_type) + body
+
+
+def full_box(box_type: bytes, *payload: bytes, version: int = 0) -> bytes:
+	return box(box_type, struct.pack(">B3x", version), *payload)
+
+
+def mvhd(timescale: int, duration: int, creation_time: int = 0) -> bytes:
+	return full_box(
+		b"mvhd", struct.pack(">IIII", creation_time, creation_time, timescale, duration), bytes(80)
+	)
+
+
+def tkhd(width: int, height: int, creation_time: int = 0) -> bytes:
+	return full_box(
+		b"tkhd",
+		struct.pack(">IIIII", creation_time, creation_time, 1, 0, 0),
+		bytes(8 + 8 + 36),
+		struct.pack(">II", width << 16, height << 16),
+	)
+
+
+def mdhd(timescale: int, duration: int) -> bytes:
+	return full_box(b"mdhd", struct.pack(">IIIIHH", 0, 0, timescale, duration, 0, 0))
+
+
+def hdlr(handler: bytes) -> bytes:
+	return full_box(b"hdlr", struct.pack(">I4s12x", 0, handler), b"\0")
+
+
+def video_stsd(codec: bytes = b"avc1") -> bytes:
+	return full_box(b"stsd", struct.pack(">I", 1), box(codec, bytes(78)))
+
+
+def audio_stsd(channels: int, sample_rate: int, codec: bytes = b"mp4a") -> bytes:
+	entry = struct.pack(">6xH8xHHHHI", 1, channels, 16, 0, 0, sample_rate << 16)
+	return full_box(b"stsd", struct.pack(">I", 1), box(codec, entry))
+
+
+def trak(
+	handler: bytes,
+	stsd: bytes,
+	timescale: int,
+	sample_count: int,
+	sample_delta: int,
+	sample_sizes: List[int],
+	chunk_offset: int,
+	width: int = 0,
+	height: int = 0,
+	keyframes: Optional[List[int]] = None,
+	extra: bytes = b"",
+) -> bytes:
+	stbl = [
+		stsd,
+		full_box(b"stts", struct.pack(">III", 1, sample_count, sample_delta)),
+		full_box(
+			b"stsz", struct.pack(">II", 0, len(sample_sizes)), struct.pack(f">{len(sample_sizes)}I", *sample_sizes)
+		),
+		full_box(b"stco", struct.pack(">II", 1, chunk_offset)),
+	]
+	if keyframes is not None:
+		stbl.append(full_box(b"stss", struct.pack(f">I{len(keyframes)}I", len(keyframes), *keyframes)))
+	return box(
+		b"trak",
+		tkhd(width, height),
+		box(
+			b"mdia",
+			mdhd(timescale, sample_count * sample_delta),
+			hdlr(handler),
+			box(b"minf", box(b"stbl", *stbl)),
+		),
+		extra,
+	)
+
+
+def build_mp4(
+	ftyp: bool = True,
+	width: int = 640,
+	height: int = 360,
+	frames: int = 50,
+	fps: int = 25,
+	frame_size: int = 100,
+	audio: bool = True,
+	movie_duration: Optional[int] = None,
+	fragmented: bool = False,
+	metadata: bool = False,
+) -> bytes:
+	"""MP4 с видеодорожкой (ключевой кадр раз в 25 кадров) и опционально AAC-аудио"""
+	timescale = 1000
+	mdat_payload = bytes(frames * frame_size + (frames * 10 if audio else 0))
+	head = box(b"ftyp", b"isom", struct.pack(">I", 512), b"isomiso2avc1mp41") if ftyp else b""
+
+	def moov(mdat_offset: int) -> bytes:
+		tracks = [
+			trak(
+				b"vide", video_stsd(), fps * 100, frames, 100, [frame_size] * frames, mdat_offset,
+				width=width, height=height, keyframes=list(range(1, frames + 1, 25)),
+			)
+		]
+		if audio:
+			tracks.append(
+				trak(b"soun", audio_stsd(2, 48000), 48000, frames, 1920, [10] * frames, mdat_offset)
+			)
+		children = [mvhd(timescale, movie_duration if movie_duration is not None else frames * 1000 // fps, 3_000_000_000)]
+		children += tracks
+		if fragmented:
+			children.append(box(b"mvex", full_box(b"trex", bytes(20))))
+		if metadata:
+			children.append(box(b"udta", box(b"\xa9too", b"Lavf60.3.100")))
+		return box(b"moov", *children)
+
+	# Смещение mdat зависит от размера moov, а размер moov от смещения не зависит
+	mdat_offset = len(head) + len(moov(0)) + 8
+	return head + moov(mdat_offset) + box(b"mdat", mdat_payload)
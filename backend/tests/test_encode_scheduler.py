@@ -0,0 +1,67 @@
+import asyncio
+
+from app.services.encode_scheduler import EncodeScheduler
+
+
+def test_slot_budget_is_derived_from_cpu_count():
+	scheduler = EncodeScheduler(cpu_count=16, threads_per_slot=4)
+
+	assert scheduler.total_slots == 4
+
+
+def test_single_encoder_gets_full_thread_budget():
+	scheduler = EncodeScheduler(cpu_count=8, threads_per_slot=4, total_slots=2)
+
+	async def run():
+		async with scheduler.slot() as threads:
+			assert scheduler.stats()["slots_in_use"] == 1
+			return threads
+
+	assert asyncio.run(run()) == 4
+	assert scheduler.stats()["slots_in_use"] == 0
+
+
+def test_oversized_weight_shares_threads_of_all_slots():
+	scheduler = EncodeScheduler(cpu_count=8, threads_per_slot=4, total_slots=2)
+
+	async def run():
+		async with scheduler.slot(weight=5) as threads:
+			assert scheduler.stats()["slots_in_use"] == 2
+			return threads
+
+	threads = asyncio.run(run())
+	# 5 кодировщиков не должны получить больше потоков, чем 2 слота по 4
+	assert threads == 1
+	assert 5 * threads <= scheduler.total_slots * scheduler.threads_per_slot
+
+
+def test_thread_budget_never_drops_below_one():
+	scheduler = EncodeScheduler(cpu_count=2, threads_per_slot=1, total_slots=2)
+
+	async def run():
+		async with scheduler.slot(weight=10) as threads:
+			return threads
+
+	assert asyncio.run(run()) == 1
+
+
+def test_work_over_capacity_waits_for_a_free_slot():
+	scheduler = EncodeScheduler(cpu_count=4, threads_per_slot=2, total_slots=2)
+	order = []
+
+	async def job(name: str, weight: int, hold: float):
+		async with scheduler.slot(weight=weight):
+			order.append(f"{name}+")
+			await asyncio.sleep(hold)
+			order.append(f"{name}-")
+
+	async def run():
+		first = asyncio.create_task(job("a", 2, 0.05))
+		await asyncio.sleep(0)
+		second = asyncio.create_task(job("b", 1, 0))
+		await asyncio.sleep(0.01)
+		assert scheduler.stats()["queued_jobs"] == 1
+		await asyncio.gather(first, second)
+
+	asyncio.run(run())
+	assert order == ["a+", "a-", "b+", "b-"]
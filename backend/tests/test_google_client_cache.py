@@ -0,0 +1,92 @@
+import pytest
+
+from app.core.config import settings
+from app.services import google_client_cache
+from app.services.google_client_cache import GoogleClientCache
+
+CREDENTIALS = {"token": "t1", "refresh_token": "r", "client_id": "c", "client_secret": "s"}
+
+
+@pytest.fixture
+def builds(monkeypatch):
+	"""Подменяет сборку клиента счётчиком; часы — управляемые"""
+	built = []
+	clock = {"now": 1000.0}
+
+	def build(document, credentials):
+		client = object()
+		built.append(client)
+		return client
+
+	monkeypatch.setattr(google_client_cache, "build_from_document", build)
+	monkeypatch.setattr(google_client_cache.Credentials, "from_authorized_user_info", staticmethod(lambda info: info))
+	monkeypatch.setattr(GoogleClientCache, "get_document", staticmethod(lambda name, version: {}))
+	monkeypatch.setattr(google_client_cache.time, "monotonic", lambda: clock["now"])
+	monkeypatch.setattr(settings, "GOOGLE_CLIENT_CACHE_TTL", 60)
+	monkeypatch.setattr(settings, "GOOGLE_CLIENT_CACHE_SIZE", 2)
+	GoogleClientCache.invalidate()
+	yield built, clock
+	GoogleClientCache.invalidate()
+
+
+def _credentials(token):
+	return {**CREDENTIALS, "token": token}
+
+
+def test_same_credentials_reuse_client(builds):
+	built, _ = builds
+
+	first = GoogleClientCache.get_client("youtube", "v3", _credentials("t1"))
+	second = GoogleClientCache.get_client("youtube", "v3", dict(_credentials("t1"), expiry="ignored"))
+
+	assert first is second
+	assert len(built) == 1
+
+
+def test_changed_token_builds_new_client(builds):
+	built, _ = builds
+
+	first = GoogleClientCache.get_client("youtube", "v3", _credentials("t1"))
+	second = GoogleClientCache.get_client("youtube", "v3", _credentials("t2"))
+
+	assert first is not second
+	assert len(built) == 2
+
+
+def test_client_expires_after_ttl(builds):
+	built, clock = builds
+	first = GoogleClientCache.get_client("youtube", "v3", _credentials("t1"))
+
+	clock["now"] += 59
+	assert GoogleClientCache.get_client("youtube", "v3", _credentials("t1")) is first
+
+	clock["now"] += 2
+	assert GoogleClientCache.get_client("youtube", "v3", _credentials("t1")) is not first
+	assert len(built) == 2
+
+
+def test_least_recently_used_client_is_evicted(builds):
+	built, _ = builds
+	first = GoogleClientCache.get_client("youtube", "v3", _credentials("t1"))
+	GoogleClientCache.get_client("youtube", "v3", _credentials("t2"))
+	# Обращение освежает t1: при переполнении вытесняется t2
+	GoogleClientCache.get_client("youtube", "v3", _credentials("t1"))
+	GoogleClientCache.get_client("youtube", "v3", _credentials("t3"))
+
+	assert len(GoogleClientCache._clients) == 2
+	assert GoogleClientCache.get_client("youtube", "v3", _credentials("t1")) is first
+	assert len(built) == 3
+
+	GoogleClientCache.get_client("youtube", "v3", _credentials("t2"))
+	assert len(built) == 4
+
+
+def test_invalidate_drops_clients_for_credentials(builds):
+	built, _ = builds
+	first = GoogleClientCache.get_client("youtube", "v3", _credentials("t1"))
+	other = GoogleClientCache.get_client("drive", "v3", _credentials("t2"))
+
+	GoogleClientCache.invalidate(_credentials("t1"))
+
+	assert GoogleClientCache.get_client("youtube", "v3", _credentials("t1")) is not first
+	assert GoogleClientCache.get_client("drive", "v3", _credentials("t2")) is other
@@ -0,0 +1,119 @@
+import asyncio
+import uuid
+
+from app.models import Integration
+from app.services.integration_service import IntegrationService
+from app.services.telegram_service import TelegramService
+from tests.fakes import FakeResult, FakeSession
+
+
+def _integration(account_id=None, **auth_data):
+	if account_id:
+		auth_data["account_info"] = {"id": account_id, "display_name": account_id}
+	return Integration(id=uuid.uuid4(), user_id=uuid.uuid4(), kind="youtube", auth_data=auth_data, is_valid=True)
+
+
+def _find(integrations, account_id):
+	session = FakeSession(FakeResult(rows=integrations))
+	return asyncio.run(IntegrationService.get_account_integration(session, uuid.uuid4(), "youtube", account_id))
+
+
+def test_same_channel_updates_its_integration():
+	first, second = _integration("UC1"), _integration("UC2")
+
+	assert _find([first, second], "UC2") is second
+
+
+def test_new_channel_takes_integration_without_account():
+	configured = _integration(oauth_config={"client_id": "id"})
+
+	assert _find([_integration("UC1"), configured], "UC2") is configured
+
+
+def test_new_channel_gets_its_own_integration():
+	assert _find([_integration("UC1")], "UC2") is None
+
+
+def test_create_adds_second_integration_of_same_kind():
+	session = FakeSession()
+
+	integration = asyncio.run(IntegrationService.create_or_update_integration(
+		session, uuid.uuid4(), "youtube",
+		{"token": "t", "refresh_token": "r", "oauth_config": {"client_id": "id"}},
+		account_info={"id": "UC2"},
+		create=True,
+	))
+
+	# Существующая интеграция не запрашивалась и не перезаписана
+	assert session.statements == []
+	assert session.added == [integration]
+	assert integration.auth_data["account_info"] == {"id": "UC2"}
+	assert integration.auth_data["oauth_config"] == {"client_id": "id"}
+
+
+def test_integration_by_id_is_scoped_to_user_and_kind():
+	channel = _integration("UC2")
+	session = FakeSession(FakeResult(channel))
+
+	found = asyncio.run(IntegrationService.get_integration_by_id(session, channel.user_id, "youtube", channel.id))
+
+	assert found is channel
+	where = str(session.statements[0].whereclause)
+	assert "integrations.id = " in where
+	assert "integrations.user_id = " in where
+	assert "integrations.kind = " in where
+
+
+def test_delete_by_id_removes_that_channel():
+	channel = _integration("UC2")
+	session = FakeSession(FakeResult(channel))
+
+	assert asyncio.run(IntegrationService.delete_integration(session, channel.user_id, "youtube", channel.id))
+
+	assert session.deleted == [channel]
+	assert session.commits == 1
+
+
+def test_delete_unknown_id_is_not_found():
+	session = FakeSession(FakeResult(None))
+
+	assert not asyncio.run(IntegrationService.delete_integration(session, uuid.uuid4(), "youtube", uuid.uuid4()))
+	assert session.deleted == []
+
+
+def _test_channel(monkeypatch, channel, outcome):
+	async def decrypt(session, integration):
+		return {"integration_id": str(integration.id), "chat_id": "1"}
+
+	async def check(auth_data):
+		if isinstance(outcome, Exception):
+			raise outcome
+		return outcome
+
+	monkeypatch.setattr(IntegrationService, "decrypt_auth_data", staticmethod(decrypt))
+	monkeypatch.setattr(TelegramService, "test_connection", staticmethod(check))
+	channel.kind = "telegram"
+	session = FakeSession(FakeResult(channel))
+	result = asyncio.run(IntegrationService.test_connection(session, channel.user_id, "telegram", channel.id))
+	return session, result
+
+
+def test_connection_by_id_updates_that_integration(monkeypatch):
+	channel = _integration("chat-2")
+
+	session, result = _test_channel(monkeypatch, channel, {"status": "ok", "meta": {"id": "chat-2", "title": "Ops"}})
+
+	assert result["status"] == "ok"
+	assert channel.auth_data["account_info"] == {"id": "chat-2", "title": "Ops"}
+	# Интеграция найдена по id одним запросом, без выбора «первой» записи вида
+	assert len(session.statements) == 1
+	assert "integrations.id = " in str(session.statements[0].whereclause)
+
+
+def test_failed_connection_marks_that_integration_invalid(monkeypatch):
+	channel = _integration("chat-2")
+
+	_, result = _test_channel(monkeypatch, channel, RuntimeError("chat not found"))
+
+	assert result == {"status": "error", "message": "chat not found"}
+	assert channel.is_valid is False
@@ -0,0 +1,165 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.endpoints.uploads import _job_to_response
+from app.core.config import settings
+from app.models import ProcessingJob
+from app.services.job_service import JobService
+from tests.fakes import FakeResult, FakeSession
+
+
+def _compile(statement):
+	return statement.compile(dialect=postgresql.dialect())
+
+
+def _job(**values) -> ProcessingJob:
+	defaults = {
+		"id": uuid.uuid4(),
+		"user_id": uuid.uuid4(),
+		"kind": "upload",
+		"payload": {"original_filename": "a.mp4"},
+		"status": "queued",
+		"attempts": 0,
+	}
+	return ProcessingJob(**{**defaults, **values})
+
+
+def test_claim_skips_locked_rows_and_takes_oldest():
+	session = FakeSession(FakeResult(_job()))
+
+	asyncio.run(JobService.claim(session, "worker-1"))
+
+	sql = str(_compile(session.statements[0]))
+	assert "FOR UPDATE SKIP LOCKED" in sql
+	assert "ORDER BY processing_jobs.created_at" in sql
+	assert "LIMIT" in sql
+
+
+def test_claim_lease_cutoff_is_lease_timeout_before_now():
+	session = FakeSession(FakeResult(None))
+
+	asyncio.run(JobService.claim(session, "worker-1"))
+
+	params = _compile(session.statements[0]).params
+	now = params["available_at_1"]
+	assert params["heartbeat_at_1"] == now - timedelta(seconds=settings.JOB_LEASE_TIMEOUT)
+	assert params["status_1"] == "queued"
+	assert params["status_2"] == "processing"
+
+
+def test_claim_marks_job_processing():
+	started_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+	job = _job(status="processing", attempts=1, worker_id="dead", started_at=started_at)
+	session = FakeSession(FakeResult(job))
+
+	claimed = asyncio.run(JobService.claim(session, "worker-2"))
+
+	assert claimed is job
+	assert job.status == "processing"
+	assert job.attempts == 2
+	assert job.worker_id == "worker-2"
+	assert job.heartbeat_at is not None
+	# Повторный захват брошенной задачи не сбрасывает время начала
+	assert job.started_at == started_at
+	assert session.commits == 1
+
+
+def test_claim_empty_queue_releases_transaction():
+	session = FakeSession(FakeResult(None))
+
+	assert asyncio.run(JobService.claim(session, "worker-1")) is None
+	assert session.rollbacks == 1
+	assert session.commits == 0
+
+
+def test_heartbeat_only_extends_processing_jobs():
+	session = FakeSession()
+	job_id = uuid.uuid4()
+
+	asyncio.run(JobService.heartbeat(session, job_id))
+
+	params = _compile(session.statements[0]).params
+	assert params["id_1"] == job_id
+	assert params["status_1"] == "processing"
+	assert session.commits == 1
+
+
+def test_defer_returns_job_to_queue_without_spending_attempt():
+	job = _job(status="processing", attempts=2, worker_id="worker-1")
+	available_at = datetime.now(timezone.utc) + timedelta(hours=1)
+
+	asyncio.run(JobService.defer(FakeSession(), job, available_at, "Нет квоты"))
+
+	assert job.status == "queued"
+	assert job.attempts == 1
+	assert job.worker_id is None
+	assert job.available_at == available_at
+	assert job.error_text == "Нет квоты"
+
+
+def test_complete_and_fail_set_finished_at():
+	done = _job(status="processing", error_text="old")
+	failed = _job(status="processing")
+
+	asyncio.run(JobService.complete(FakeSession(), done, {"status": "success"}))
+	asyncio.run(JobService.fail(FakeSession(), failed, "boom"))
+
+	assert done.status == "success" and done.error_text is None and done.finished_at
+	assert failed.status == "error" and failed.error_text == "boom" and failed.finished_at
+
+
+def test_count_by_status_is_scoped_to_user():
+	user_id = uuid.uuid4()
+	session = FakeSession(FakeResult(rows=[("queued", 2), ("error", 1)]))
+
+	counts = asyncio.run(JobService.count_by_status(session, user_id))
+
+	assert counts == {"queued": 2, "error": 1}
+	assert _compile(session.statements[0]).params["user_id_1"] == user_id
+
+
+def test_job_response_accepts_failed_version_without_render_info():
+	job = _job(
+		status="success",
+		attempts=1,
+		result={
+			"source_id": str(uuid.uuid4()),
+			"original_filename": "a.mp4",
+			"status": "success",
+			"versions": [
+				{"id": str(uuid.uuid4()), "orientation": "square", "status": "error", "error_text": "ffmpeg"},
+			],
+		},
+	)
+
+	response = _job_to_response(job)
+
+	version = response.result.versions[0]
+	assert version.status == "error"
+	assert (version.duration_sec, version.width, version.height) == (0, 0, 0)
+
+
+def test_publish_job_result_is_returned_by_kind():
+	upload_id = uuid.uuid4()
+	job = _job(
+		kind="publish",
+		payload={"upload_id": str(upload_id)},
+		status="success",
+		result={
+			"id": str(upload_id),
+			"status": "deferred",
+			"error_text": "quotaExceeded",
+			"retry_at": "2026-01-01T08:00:00+00:00",
+		},
+	)
+
+	response = _job_to_response(job)
+
+	assert response.kind == "publish"
+	assert response.result.id == upload_id
+	assert response.result.status == "deferred"
+	assert response.result.retry_at.hour == 8
+	assert response.model_dump(mode="json")["result"]["retry_at"].startswith("2026-01-01T08:00:00")
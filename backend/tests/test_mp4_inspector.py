@@ -0,0 +1,100 @@
+import struct
+
+import pytest
+
+from app.services.mp4_inspector import Mp4InspectionError, Mp4Inspector
+from tests.mp4_samples import box, build_mp4
+
+
+def _preflight(tmp_path, data: bytes):
+	path = tmp_path / "upload.part"
+	path.write_bytes(data)
+	return Mp4Inspector.preflight(str(path))
+
+
+def test_inspect_buffer_reads_stream_parameters():
+	info = Mp4Inspector.inspect_buffer(build_mp4(width=1280, height=720, frames=50, fps=25))
+
+	assert info["duration"] == pytest.approx(2.0)
+	assert (info["width"], info["height"]) == (1280, 720)
+	assert info["fps"] == pytest.approx(25.0)
+	assert info["video_codec"] == "avc1"
+	assert info["format_name"] == "isom"
+	assert info["gop_frames"] == 25
+	assert info["gop_seconds"] == pytest.approx(1.0)
+	# 50 кадров по 100 байт за 2 секунды
+	assert info["video_bitrate"] == 20000
+	assert info["has_audio"] is True
+	assert info["audio_codec"] == "mp4a"
+	assert info["audio_channels"] == 2
+	assert info["audio_sample_rate"] == 48000
+	assert info["audio_bitrate"] == 2000
+
+
+def test_inspect_buffer_without_audio():
+	info = Mp4Inspector.inspect_buffer(build_mp4(audio=False))
+
+	assert info["has_audio"] is False
+	assert info["audio_bitrate"] is None
+
+
+def test_mov_without_ftyp_is_accepted(tmp_path):
+	info = _preflight(tmp_path, build_mp4(ftyp=False))
+
+	assert info["format_name"] == "qt"
+	assert info["duration"] == pytest.approx(2.0)
+
+
+def test_fragmented_mp4_falls_back_to_ffprobe(tmp_path):
+	assert _preflight(tmp_path, build_mp4(fragmented=True, movie_duration=0)) is None
+
+
+def test_zero_movie_duration_falls_back_to_ffprobe(tmp_path):
+	assert _preflight(tmp_path, build_mp4(movie_duration=0)) is None
+
+
+@pytest.mark.parametrize("header", [
+	b"\x1a\x45\xdf\xa3" + bytes(60),  # EBML: webm/mkv
+	b"RIFF" + struct.pack("<I", 60) + b"AVI LIST" + bytes(52),
+])
+def test_other_containers_fall_back_to_ffprobe(tmp_path, header):
+	assert _preflight(tmp_path, header) is None
+
+
+def test_truncated_file_is_rejected(tmp_path):
+	data = build_mp4()
+
+	with pytest.raises(Mp4InspectionError, match="обрезан"):
+		_preflight(tmp_path, data[:-40])
+
+
+def test_missing_moov_is_rejected(tmp_path):
+	data = box(b"ftyp", b"isom", bytes(4)) + box(b"mdat", bytes(100))
+
+	with pytest.raises(Mp4InspectionError, match="moov"):
+		_preflight(tmp_path, data)
+
+
+def test_chunk_offset_past_end_is_rejected():
+	data = bytearray(build_mp4(audio=False))
+	# Смещение чанка указывает за конец файла
+	stco = data.find(b"stco")
+	struct.pack_into(">I", data, stco + 12, len(data) + 10)
+
+	with pytest.raises(Mp4InspectionError, match="за конец файла"):
+		Mp4Inspector.inspect_buffer(bytes(data))
+
+
+def test_empty_file_is_rejected(tmp_path):
+	with pytest.raises(Mp4InspectionError):
+		_preflight(tmp_path, b"")
+
+
+def test_iter_boxes_handles_largesize_and_to_end_boxes():
+	large = struct.pack(">I4sQ", 1, b"free", 24) + bytes(8)
+	to_end = struct.pack(">I4s", 0, b"mdat") + bytes(5)
+	data = large + to_end
+
+	boxes = list(Mp4Inspector.iter_boxes(data, 0, len(data)))
+
+	assert boxes == [(b"free", 0, 16, 24), (b"mdat", 24, 32, len(data))]
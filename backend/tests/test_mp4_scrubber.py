@@ -0,0 +1,75 @@
+import errno
+import fcntl
+
+from app.services.mp4_inspector import Mp4Inspector
+from app.services.mp4_scrubber import XMP_UUID, Mp4MetadataScrubber
+from tests.mp4_samples import box, build_mp4
+
+
+def _write(tmp_path, data: bytes, name: str = "video.mp4"):
+	path = tmp_path / name
+	path.write_bytes(data)
+	return path
+
+
+def test_find_metadata_reports_atoms_and_timestamps(tmp_path):
+	path = _write(tmp_path, build_mp4(metadata=True))
+
+	found = Mp4MetadataScrubber.find_metadata(str(path))
+
+	assert "/moov/udta" in found
+	assert "/moov/mvhd@time" in found
+
+
+def test_scrub_in_place_keeps_layout_and_media(tmp_path):
+	original = build_mp4(metadata=True)
+	path = _write(tmp_path, original)
+
+	report = Mp4MetadataScrubber.scrub_in_place(str(path))
+
+	scrubbed = path.read_bytes()
+	assert report["removed"] == ["/moov/udta"]
+	assert "/moov/mvhd" in report["timestamps_reset"]
+	assert Mp4MetadataScrubber.find_metadata(str(path)) == []
+	# Размеры боксов не меняются — смещения чанков и mdat остаются прежними
+	assert len(scrubbed) == len(original)
+	mdat = original.index(b"mdat") - 4
+	assert scrubbed[mdat:] == original[mdat:]
+	assert b"Lavf" not in scrubbed
+	assert Mp4Inspector.inspect_buffer(scrubbed)["duration"] == Mp4Inspector.inspect_buffer(original)["duration"]
+
+
+def test_xmp_uuid_box_is_removed(tmp_path):
+	data = build_mp4() + box(b"uuid", XMP_UUID, b"<x:xmpmeta/>")
+	path = _write(tmp_path, data)
+
+	report = Mp4MetadataScrubber.scrub_in_place(str(path))
+
+	assert report["removed"] == ["/uuid"]
+	assert b"xmpmeta" not in path.read_bytes()
+
+
+def test_scrub_copy_leaves_input_untouched(tmp_path):
+	original = build_mp4(metadata=True)
+	source = _write(tmp_path, original, "source.mp4")
+	output = tmp_path / "clean.mp4"
+
+	Mp4MetadataScrubber.scrub_copy(str(source), str(output))
+
+	assert source.read_bytes() == original
+	assert Mp4MetadataScrubber.find_metadata(str(output)) == []
+
+
+def test_scrub_copy_without_reflink_copies_in_kernel(monkeypatch, tmp_path):
+	source = _write(tmp_path, build_mp4(metadata=True), "source.mp4")
+	output = tmp_path / "clean.mp4"
+
+	def ioctl(*args):
+		raise OSError(errno.EOPNOTSUPP, "Operation not supported")
+
+	monkeypatch.setattr(fcntl, "ioctl", ioctl)
+
+	Mp4MetadataScrubber.scrub_copy(str(source), str(output))
+
+	assert output.stat().st_size == source.stat().st_size
+	assert Mp4MetadataScrubber.find_metadata(str(output)) == []
@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import itertools
+
+import pytest
+
+from app.services.multipart_upload import MultipartUploadReader, UploadTooLargeError
+
+BOUNDARY = "testboundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def _body(*parts) -> bytes:
+	"""parts: (имя поля, имя файла или None, содержимое)"""
+	chunks = []
+	for name, filename, data in parts:
+		disposition = f'form-data; name="{name}"'
+		if filename is not None:
+			disposition += f'; filename="{filename}"'
+		chunks.append(
+			f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n"
+			f"Content-Type: application/octet-stream\r\n\r\n".encode()
+			+ data
+			+ b"\r\n"
+		)
+	return b"".join(chunks) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def _read(reader: MultipartUploadReader, body: bytes, chunk_size: int = 7):
+	async def stream():
+		for start in range(0, len(body), chunk_size):
+			yield body[start:start + chunk_size]
+
+	return asyncio.run(reader.read(stream()))
+
+
+@pytest.fixture
+def staging(tmp_path):
+	counter = itertools.count()
+	return lambda: tmp_path / f"{next(counter)}.part"
+
+
+def test_files_are_streamed_to_staging_with_hash(staging):
+	first, second = b"a" * 1000, b"b" * 10
+	reader = MultipartUploadReader(CONTENT_TYPE, 10_000, staging)
+
+	fields, files = _read(reader, _body(
+		("seed", None, b"42"),
+		("files", "one.mp4", first),
+		("files", "two.mp4", second),
+	))
+
+	assert fields == {"seed": ["42"]}
+	assert [f["filename"] for f in files] == ["one.mp4", "two.mp4"]
+	for item, data in zip(files, (first, second)):
+		assert item["size_bytes"] == len(data)
+		assert item["content_hash"] == hashlib.sha256(data).hexdigest()
+		with open(item["path"], "rb") as f:
+			assert f.read() == data
+
+
+def test_oversized_file_aborts_without_reading_rest_of_body(staging, tmp_path):
+	reader = MultipartUploadReader(CONTENT_TYPE, 100, staging)
+	body = _body(("files", "ok.mp4", b"y" * 50), ("files", "big.mp4", b"x" * 500), ("files", "tail.mp4", b"z" * 5000))
+	consumed = []
+
+	async def stream():
+		for start in range(0, len(body), 64):
+			consumed.append(start)
+			yield body[start:start + 64]
+
+	with pytest.raises(UploadTooLargeError, match="big.mp4"):
+		asyncio.run(reader.read(stream()))
+
+	# Чтение остановлено внутри большого файла, принятые файлы удалены
+	assert consumed[-1] < body.index(b"tail.mp4")
+	assert list(tmp_path.iterdir()) == []
+
+
+def test_request_body_over_total_limit_is_rejected(staging, tmp_path):
+	reader = MultipartUploadReader(CONTENT_TYPE, 10_000, staging, max_total_size=1000)
+
+	with pytest.raises(UploadTooLargeError, match="Тело запроса"):
+		_read(reader, _body(("files", "one.mp4", b"a" * 900), ("files", "two.mp4", b"b" * 900)))
+
+	assert list(tmp_path.iterdir()) == []
+
+
+def test_empty_file_is_reported(staging, tmp_path):
+	reader = MultipartUploadReader(CONTENT_TYPE, 100, staging)
+
+	_, files = _read(reader, _body(("files", "empty.mp4", b"")))
+
+	assert "пуст" in files[0]["error"]
+	assert list(tmp_path.iterdir()) == []
+
+
+def test_truncated_body_removes_written_files(staging, tmp_path):
+	reader = MultipartUploadReader(CONTENT_TYPE, 10_000, staging)
+	body = _body(("files", "one.mp4", b"a" * 100), ("files", "two.mp4", b"b" * 100))
+
+	with pytest.raises(ValueError):
+		_read(reader, body[:-60])
+
+	assert list(tmp_path.iterdir()) == []
+
+
+def test_cleanup_removes_files_left_in_staging(staging, tmp_path):
+	reader = MultipartUploadReader(CONTENT_TYPE, 10_000, staging)
+	_read(reader, _body(("files", "one.mp4", b"a" * 10)))
+
+	reader.cleanup()
+
+	assert list(tmp_path.iterdir()) == []
+
+
+def test_non_multipart_request_is_rejected(staging):
+	with pytest.raises(ValueError, match="multipart/form-data"):
+		MultipartUploadReader("application/json", 100, staging)
+
+
+def test_oversized_text_field_is_rejected(staging, tmp_path):
+	reader = MultipartUploadReader(CONTENT_TYPE, 10_000_000, staging)
+	body = _body(
+		("files", "one.mp4", b"a" * 10),
+		("note", None, b"x" * (MultipartUploadReader.MAX_FIELD_SIZE + 1)),
+	)
+
+	with pytest.raises(UploadTooLargeError, match="note"):
+		_read(reader, body, chunk_size=4096)
+
+	assert list(tmp_path.iterdir()) == []
+
+
+def test_text_field_at_limit_is_accepted(staging):
+	reader = MultipartUploadReader(CONTENT_TYPE, 10_000_000, staging)
+	value = b"x" * MultipartUploadReader.MAX_FIELD_SIZE
+
+	fields, _ = _read(reader, _body(("note", None, value)), chunk_size=4096)
+
+	assert fields == {"note": [value.decode()]}
@@ -0,0 +1,125 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from google.auth.exceptions import RefreshError
+
+from app.models import Integration
+from app.services import oauth_token_manager
+from app.services.integration_service import IntegrationService
+from app.services.oauth_token_manager import OAuthTokenManager
+from tests.fakes import FakeSession
+
+INTEGRATION_ID = uuid.uuid4()
+CREDENTIALS = {
+	"token": "old",
+	"refresh_token": "refresh",
+	"client_id": "client",
+	"client_secret": "secret",
+	"integration_id": str(INTEGRATION_ID),
+	"account_info": {"id": "UC1"},
+}
+
+
+class StubCredentials:
+	"""Credentials google-auth: refresh выдаёт новый токен или RefreshError"""
+
+	refreshes = 0
+	error = None
+
+	def __init__(self, info):
+		self.token = info["token"]
+		self.expiry = None
+
+	def refresh(self, request):
+		StubCredentials.refreshes += 1
+		# Обновление идёт в пуле потоков — даём остальным вызовам встать в очередь
+		time.sleep(0.05)
+		if StubCredentials.error:
+			raise StubCredentials.error
+		self.token = f"new-{StubCredentials.refreshes}"
+		self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+	"""Менеджер токенов с подменёнными Google и базой; возвращает (сессия, интеграция, записи)"""
+	integration = Integration(id=INTEGRATION_ID, user_id=uuid.uuid4(), kind="youtube", auth_data={}, is_valid=True)
+	session = FakeSession()
+	session.objects[(Integration, INTEGRATION_ID)] = integration
+	saved = []
+
+	async def save(session, user_id, kind, auth_data, is_valid=True, integration=None, **kwargs):
+		saved.append({"user_id": user_id, "kind": kind, "auth_data": auth_data, "is_valid": is_valid, "integration": integration})
+		return integration
+
+	monkeypatch.setattr(StubCredentials, "refreshes", 0)
+	monkeypatch.setattr(StubCredentials, "error", None)
+	monkeypatch.setattr(oauth_token_manager.Credentials, "from_authorized_user_info", staticmethod(StubCredentials))
+	monkeypatch.setattr(oauth_token_manager, "AsyncSessionLocal", lambda: session)
+	monkeypatch.setattr(IntegrationService, "create_or_update_integration", staticmethod(save))
+	monkeypatch.setattr(OAuthTokenManager, "_tokens", {})
+	monkeypatch.setattr(OAuthTokenManager, "_locks", {})
+	return session, integration, saved
+
+
+def test_concurrent_calls_share_one_refresh(manager):
+	async def run():
+		return await asyncio.gather(*(OAuthTokenManager.get_credentials(dict(CREDENTIALS)) for _ in range(5)))
+
+	results = asyncio.run(run())
+
+	assert StubCredentials.refreshes == 1
+	assert {result["token"] for result in results} == {"new-1"}
+
+
+def test_fresh_token_is_served_from_cache(manager):
+	first = asyncio.run(OAuthTokenManager.get_credentials(dict(CREDENTIALS)))
+	second = asyncio.run(OAuthTokenManager.get_credentials(dict(CREDENTIALS)))
+
+	assert first["token"] == second["token"] == "new-1"
+	assert StubCredentials.refreshes == 1
+
+
+def test_refreshed_token_is_written_back(manager):
+	_, integration, saved = manager
+
+	result = asyncio.run(OAuthTokenManager.get_credentials(dict(CREDENTIALS)))
+
+	assert len(saved) == 1
+	write = saved[0]
+	assert write["integration"] is integration
+	assert write["kind"] == "youtube"
+	assert write["user_id"] == integration.user_id
+	assert write["auth_data"]["token"] == "new-1"
+	assert write["auth_data"]["expiry"] == result["expiry"]
+	assert write["auth_data"]["refresh_token"] == "refresh"
+	# Служебные поля credentials в токены интеграции не попадают
+	assert "integration_id" not in write["auth_data"]
+	assert "account_info" not in write["auth_data"]
+
+
+def test_failed_refresh_marks_integration_invalid(manager):
+	session, integration, saved = manager
+	StubCredentials.error = RefreshError("invalid_grant: Token has been expired or revoked.")
+
+	with pytest.raises(RefreshError):
+		asyncio.run(OAuthTokenManager.get_credentials(dict(CREDENTIALS)))
+
+	assert integration.is_valid is False
+	assert session.commits == 1
+	assert saved == []
+
+
+def test_failed_refresh_without_integration_only_raises(manager):
+	session, integration, _ = manager
+	StubCredentials.error = RefreshError("invalid_grant")
+	credentials = {key: value for key, value in CREDENTIALS.items() if key != "integration_id"}
+
+	with pytest.raises(RefreshError):
+		asyncio.run(OAuthTokenManager.get_credentials(credentials))
+
+	assert integration.is_valid is True
+	assert session.commits == 0
@@ -0,0 +1,152 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.models import SourceProbe
+from app.services.encoder_profiles import EncoderProfileService
+from app.services.ffmpeg_runner import FFmpegRunner
+from app.services.probe_cache import ProbeCacheService
+from app.services.quota_service import QuotaService
+from app.services.upload_service import UploadService
+from app.services.video_processor import VideoProcessor
+from tests.fakes import FakeSession
+
+
+@pytest.mark.parametrize(
+	"value, expected",
+	[
+		("30000/1001", 30000 / 1001),
+		("25/1", 25.0),
+		("24", 24.0),
+		("29.97", 29.97),
+		("0/0", 0.0),
+		("30/0", 0.0),
+		("0/1", 0.0),
+		("", 0.0),
+		(None, 0.0),
+		("N/A", 0.0),
+		("nan", 0.0),
+		("inf/1", 0.0),
+		("-30/1", 0.0),
+	],
+)
+def test_parse_rational(value, expected):
+	assert VideoProcessor.parse_rational(value) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("value, expected", [("128000", 128000), ("64000.0", 64000), ("0", None), (None, None), ("N/A", None)])
+def test_to_int(value, expected):
+	assert VideoProcessor._to_int(value) == expected
+
+
+PROBE = {
+	"format": {"duration": "10.0", "size": "1000000", "bit_rate": "800000", "format_name": "mov,mp4,m4a,3gp,3g2,mj2"},
+	"streams": [
+		{
+			"codec_type": "video", "codec_name": "h264", "width": 1920, "height": 1080,
+			"r_frame_rate": "0/0", "avg_frame_rate": "30000/1001", "bit_rate": "700000",
+		},
+		{"codec_type": "audio", "codec_name": "aac", "bit_rate": "96000", "channels": 2, "sample_rate": "48000"},
+	],
+}
+
+
+@pytest.fixture
+def probes(monkeypatch):
+	calls = []
+
+	async def probe(path):
+		calls.append(path)
+		return PROBE
+
+	async def probe_keyframes(path, read_seconds=None):
+		return [0.0, 2.0, 4.0]
+
+	monkeypatch.setattr(FFmpegRunner, "probe", staticmethod(probe))
+	monkeypatch.setattr(FFmpegRunner, "probe_keyframes", staticmethod(probe_keyframes))
+	return calls
+
+
+def test_fps_falls_back_to_average_rate(probes):
+	info, raw = asyncio.run(VideoProcessor.probe_video("/src.mp4"))
+
+	assert info["fps"] == pytest.approx(29.97, abs=0.01)
+	assert info["gop_seconds"] == 2.0
+	assert info["gop_frames"] == 60
+	assert info["audio_sample_rate"] == 48000
+	assert raw is PROBE
+
+
+def test_cached_info_skips_ffprobe(probes):
+	session = FakeSession()
+	session.objects[(SourceProbe, "abc")] = SourceProbe(content_hash="abc", info={"fps": 25.0})
+
+	info = asyncio.run(ProbeCacheService.get_video_info(session, "/src.mp4", "abc"))
+
+	assert info == {"fps": 25.0}
+	assert probes == []
+
+
+def test_probe_result_is_stored_by_hash(probes):
+	session = FakeSession()
+
+	info = asyncio.run(ProbeCacheService.get_video_info(session, "/src.mp4", "abc"))
+
+	assert probes == ["/src.mp4"]
+	params = session.statements[0].compile().params
+	assert params["content_hash"] == "abc"
+	assert params["info"] == info
+	assert session.commits == 1
+
+
+@pytest.fixture
+def upload_job(monkeypatch, tmp_path):
+	"""process_and_upload без квоты, рендера и загрузки"""
+	async def nothing(*args, **kwargs):
+		return None
+
+	async def no_uploads(session, source_id):
+		return set()
+
+	async def no_renders(*args, **kwargs):
+		return
+		yield
+
+	monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+	monkeypatch.setattr(QuotaService, "ensure_available", staticmethod(nothing))
+	monkeypatch.setattr(EncoderProfileService, "resolve_for_user", staticmethod(nothing))
+	monkeypatch.setattr(UploadService, "_get_uploaded_orientations", staticmethod(no_uploads))
+	monkeypatch.setattr(UploadService, "_iter_renders", staticmethod(no_renders))
+
+	def run(session, video_info):
+		return asyncio.run(UploadService.process_and_upload(
+			session, uuid.uuid4(), uuid.uuid4(), "/src.mp4", "clip.mp4", False, [],
+			content_hash="abc", video_info=video_info,
+		))
+
+	return run
+
+
+def test_preflight_info_is_used_without_seeding_cache(probes, upload_job):
+	session = FakeSession()
+	preflight = {"duration": 10.0, "width": 1920, "height": 1080, "fps": 30.0, "video_codec": "avc1"}
+
+	upload_job(session, preflight)
+
+	assert probes == []
+	# Кэш ffprobe не заполняется сведениями разбора боксов
+	assert not any("source_probes" in str(statement) for statement in session.statements)
+	assert session.added[0].fps == 30.0
+
+
+def test_cached_probe_wins_over_preflight_info(probes, upload_job):
+	session = FakeSession()
+	session.objects[(SourceProbe, "abc")] = SourceProbe(
+		content_hash="abc", info={"duration": 10.0, "width": 1080, "height": 1920, "fps": 25.0}
+	)
+
+	upload_job(session, {"duration": 10.0, "width": 1920, "height": 1080, "fps": 30.0})
+
+	assert session.added[0].fps == 25.0
@@ -0,0 +1,128 @@
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.models import Integration, YouTubeQuota
+from app.services.quota_service import QuotaExhaustedError, QuotaService
+from tests.fakes import FakeSession
+
+# 12:00 UTC — 04:00 или 05:00 по тихоокеанскому времени, те же сутки квоты
+NOW = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def quota(monkeypatch):
+	monkeypatch.setattr(settings, "YOUTUBE_DAILY_QUOTA", 8640)  # 0.1 единицы в секунду
+	monkeypatch.setattr(settings, "YOUTUBE_UPLOAD_QUOTA_COST", 1600)
+
+
+def _bucket(tokens, updated_at=NOW, used_today=0, blocked_until=None, quota_day=None):
+	return YouTubeQuota(
+		integration_id=uuid.uuid4(),
+		tokens=tokens,
+		quota_day=quota_day or QuotaService._quota_day(updated_at),
+		used_today=used_today,
+		blocked_until=blocked_until,
+		updated_at=updated_at,
+	)
+
+
+def test_refill_adds_tokens_for_elapsed_time_up_to_capacity():
+	bucket = _bucket(100.0, updated_at=NOW - timedelta(seconds=1000))
+
+	QuotaService._refill(bucket, NOW)
+
+	assert bucket.tokens == pytest.approx(200.0)
+	assert bucket.updated_at == NOW
+
+	QuotaService._refill(bucket, NOW + timedelta(days=2))
+	assert bucket.tokens == 8640
+
+
+def test_refill_starts_new_quota_day_and_clears_expired_block():
+	bucket = _bucket(0.0, used_today=3200, blocked_until=NOW, quota_day=date(2026, 3, 9))
+
+	QuotaService._refill(bucket, NOW)
+
+	assert bucket.quota_day == QuotaService._quota_day(NOW)
+	assert bucket.used_today == 0
+	assert bucket.blocked_until is None
+
+
+def test_refilled_does_not_mutate_stored_bucket():
+	bucket = _bucket(100.0, updated_at=NOW - timedelta(seconds=1000))
+
+	state = QuotaService._refilled(bucket, NOW)
+
+	assert state.tokens == pytest.approx(200.0)
+	assert bucket.tokens == 100.0
+
+
+def test_ready_at_waits_for_missing_tokens_or_block():
+	assert QuotaService._ready_at(_bucket(1600.0), 1600, NOW) == NOW
+	assert QuotaService._ready_at(_bucket(1500.0), 1600, NOW) == NOW + timedelta(seconds=1000)
+
+	blocked_until = NOW + timedelta(hours=5)
+	assert QuotaService._ready_at(_bucket(8640.0, blocked_until=blocked_until), 1600, NOW) == blocked_until
+
+
+def test_quota_day_follows_pacific_midnight():
+	# 06:30 UTC 10 марта — ещё 9 марта в Лос-Анджелесе (PDT, UTC-7)
+	assert QuotaService._quota_day(datetime(2026, 3, 10, 6, 30, tzinfo=timezone.utc)) == date(2026, 3, 9)
+	assert QuotaService.next_reset(NOW) == datetime(2026, 3, 11, 7, 0, tzinfo=timezone.utc)
+
+
+def test_cost_is_capped_by_bucket_capacity():
+	assert QuotaService._cost(None) == 1600
+	assert QuotaService._cost(100_000) == 8640
+
+
+def test_project_returns_none_when_refill_keeps_up():
+	assert QuotaService._project(1000.0, 0.05, 0.1, NOW) is None
+	assert QuotaService._project(1000.0, 0.2, 0.1, NOW) == NOW + timedelta(seconds=10000)
+
+
+def _channels(monkeypatch, buckets):
+	integrations = [Integration(id=bucket.integration_id, kind="youtube") for bucket in buckets]
+
+	async def get_channels(session, user_id):
+		return [(integration, {"token": str(integration.id)}) for integration in integrations]
+
+	async def lock_buckets(session, integration_ids):
+		return {bucket.integration_id: bucket for bucket in buckets}
+
+	monkeypatch.setattr(QuotaService, "_get_channels", staticmethod(get_channels))
+	monkeypatch.setattr(QuotaService, "_lock_buckets", staticmethod(lock_buckets))
+	return integrations
+
+
+def test_acquire_takes_channel_with_most_tokens(monkeypatch):
+	now = datetime.now(timezone.utc)
+	low, high = _bucket(2000.0, updated_at=now), _bucket(5000.0, updated_at=now)
+	_, high_integration = _channels(monkeypatch, [low, high])
+	session = FakeSession()
+
+	integration, credentials = asyncio.run(QuotaService.acquire(session, uuid.uuid4()))
+
+	assert integration is high_integration
+	assert credentials == {"token": str(high_integration.id)}
+	assert high.tokens == pytest.approx(3400.0, abs=1.0)
+	assert high.used_today == 1600
+	assert low.tokens == pytest.approx(2000.0, abs=1.0)
+	assert session.commits == 1
+
+
+def test_acquire_without_quota_reports_earliest_refill(monkeypatch):
+	now = datetime.now(timezone.utc)
+	empty, almost = _bucket(0.0, updated_at=now), _bucket(1500.0, updated_at=now)
+	_channels(monkeypatch, [empty, almost])
+
+	with pytest.raises(QuotaExhaustedError) as failure:
+		asyncio.run(QuotaService.acquire(FakeSession(), uuid.uuid4()))
+
+	# Второму каналу не хватает 100 единиц — 1000 секунд пополнения
+	assert failure.value.retry_at - now == pytest.approx(timedelta(seconds=1000), abs=timedelta(seconds=5))
+	assert empty.tokens < 1
@@ -0,0 +1,123 @@
+import asyncio
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.services.render_cache import RenderCache
+
+
+INFO = {"duration": 12.5, "width": 1080.0, "height": 1920.0}
+PROFILE = {"preset": "light", "seed": 7}
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+	monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path / "storage"))
+	monkeypatch.setattr(settings, "RENDER_CACHE", True)
+	monkeypatch.setattr(settings, "RENDER_CACHE_MAX_BYTES", 10**9)
+	return tmp_path
+
+
+def _write(path, data):
+	path.write_bytes(data)
+	return str(path)
+
+
+def _key(name):
+	return RenderCache.make_key(name * 64, "vertical", "variants", {"seed": 1})
+
+
+def test_key_depends_on_source_orientation_and_plan():
+	key = RenderCache.make_key("a" * 64, "vertical", "variants", {"seed": 1})
+
+	assert key == RenderCache.make_key("a" * 64, "vertical", "variants", {"seed": 1})
+	assert key != RenderCache.make_key("b" * 64, "vertical", "variants", {"seed": 1})
+	assert key != RenderCache.make_key("a" * 64, "horizontal", "variants", {"seed": 1})
+	assert key != RenderCache.make_key("a" * 64, "vertical", "variants", {"seed": 2})
+
+
+def test_store_then_fetch_restores_video_and_extras(cache):
+	key = _key("a")
+	output = _write(cache / "render.mp4", b"video")
+	thumbnail = _write(cache / "thumb.jpg", b"thumb")
+	asyncio.run(RenderCache.store(key, output, INFO, PROFILE, {"thumbnail": thumbnail}))
+
+	target = cache / "again.mp4"
+	target_thumb = cache / "again.jpg"
+	cached = asyncio.run(
+		RenderCache.fetch(key, str(target), {"thumbnail": str(target_thumb), "contact_sheet": str(cache / "cs.jpg")})
+	)
+
+	assert cached == (INFO, PROFILE, {"thumbnail": str(target_thumb)})
+	assert target.read_bytes() == b"video"
+	assert target_thumb.read_bytes() == b"thumb"
+
+
+def test_cache_entries_are_independent_copies(cache):
+	key = _key("a")
+	output = cache / "render.mp4"
+	_write(output, b"video")
+	asyncio.run(RenderCache.store(key, str(output), INFO, PROFILE))
+	video_path, _ = RenderCache._entry_paths(key)
+
+	# Удаление версии не должно держать место записи кэша и наоборот
+	assert video_path.stat().st_nlink == 1
+	assert output.stat().st_nlink == 1
+	os.remove(output)
+	assert video_path.read_bytes() == b"video"
+
+
+def test_fetch_miss_and_disabled_cache(cache, monkeypatch):
+	assert asyncio.run(RenderCache.fetch(_key("a"), str(cache / "out.mp4"))) is None
+
+	output = _write(cache / "render.mp4", b"video")
+	asyncio.run(RenderCache.store(_key("a"), output, INFO, PROFILE))
+	monkeypatch.setattr(settings, "RENDER_CACHE", False)
+
+	assert asyncio.run(RenderCache.fetch(_key("a"), str(cache / "out.mp4"))) is None
+
+
+def test_entry_without_metadata_is_a_miss(cache):
+	key = _key("a")
+	output = _write(cache / "render.mp4", b"video")
+	asyncio.run(RenderCache.store(key, output, INFO, PROFILE))
+	_, meta_path = RenderCache._entry_paths(key)
+	os.remove(meta_path)
+
+	assert asyncio.run(RenderCache.fetch(key, str(cache / "out.mp4"))) is None
+
+
+def test_evict_removes_least_recently_used_entries(cache):
+	keys = [_key(name) for name in "abc"]
+	for index, key in enumerate(keys):
+		output = _write(cache / f"{index}.mp4", b"x" * 100)
+		thumbnail = _write(cache / f"{index}.jpg", b"y" * 50)
+		asyncio.run(RenderCache.store(key, output, INFO, PROFILE, {"thumbnail": thumbnail}))
+		video_path, meta_path = RenderCache._entry_paths(key)
+		for path in (video_path, meta_path):
+			os.utime(path, (1000 + index, 1000 + index))
+
+	# Попадание освежает запись: вытеснять нужно следующую по давности
+	asyncio.run(RenderCache.fetch(keys[0], str(cache / "hit.mp4")))
+	entry_size = sum(
+		path.stat().st_size for path in RenderCache._entry_paths(keys[2])[0].parent.glob(f"{keys[2]}*")
+	)
+
+	removed = RenderCache.evict(2 * entry_size)
+
+	assert removed == 1
+	assert not RenderCache._entry_paths(keys[1])[0].exists()
+	assert not RenderCache._entry_paths(keys[1])[1].exists()
+	assert not list(RenderCache._entry_paths(keys[1])[0].parent.glob(f"{keys[1]}*"))
+	assert RenderCache._entry_paths(keys[0])[0].exists()
+	assert RenderCache._entry_paths(keys[2])[0].exists()
+
+
+def test_store_evicts_over_limit(cache, monkeypatch):
+	monkeypatch.setattr(settings, "RENDER_CACHE_MAX_BYTES", 0)
+	output = _write(cache / "render.mp4", b"video")
+
+	asyncio.run(RenderCache.store(_key("a"), output, INFO, PROFILE))
+
+	assert not RenderCache._entry_paths(_key("a"))[0].exists()
@@ -0,0 +1,107 @@
+import errno
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.services.storage_service import StorageService
+from scripts.migrate_db import split_statements
+
+
+def test_blob_path_is_sharded_by_hash(monkeypatch, tmp_path):
+	monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+	content_hash = "abcdef" + "0" * 58
+
+	path = StorageService.get_blob_path(content_hash)
+
+	assert path == tmp_path / "sources" / "ab" / "cd" / content_hash
+
+
+def test_staging_path_defaults_to_storage_tmp(monkeypatch, tmp_path):
+	monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+	monkeypatch.setattr(settings, "UPLOAD_STAGING_PATH", "")
+
+	path = StorageService.get_staging_path()
+
+	assert path.parent == tmp_path / "tmp"
+	assert path.parent.is_dir()
+	assert path.suffix == ".part"
+
+
+def test_place_file_renames_on_same_filesystem(tmp_path):
+	source = tmp_path / "upload.part"
+	source.write_bytes(b"video")
+	destination = tmp_path / "sources" / "ab" / "cd" / "blob"
+
+	StorageService.place_file(source, destination)
+
+	assert destination.read_bytes() == b"video"
+	assert not source.exists()
+
+
+def test_place_file_copies_across_devices(monkeypatch, tmp_path):
+	source = tmp_path / "upload.part"
+	data = os.urandom(300_000)
+	source.write_bytes(data)
+	destination = tmp_path / "dest" / "blob"
+	real_replace = os.replace
+
+	def replace(src, dst):
+		# Перенос из staging — «другое устройство»; финальное переименование рядом с destination работает
+		if str(src) == str(source):
+			raise OSError(errno.EXDEV, "Invalid cross-device link")
+		real_replace(src, dst)
+
+	monkeypatch.setattr(os, "replace", replace)
+
+	StorageService.place_file(source, destination)
+
+	assert destination.read_bytes() == data
+	assert not source.exists()
+	assert [p.name for p in destination.parent.iterdir()] == ["blob"]
+
+
+def test_place_file_propagates_other_errors(monkeypatch, tmp_path):
+	source = tmp_path / "upload.part"
+	source.write_bytes(b"video")
+
+	def replace(src, dst):
+		raise OSError(errno.EACCES, "Permission denied")
+
+	monkeypatch.setattr(os, "replace", replace)
+
+	with pytest.raises(PermissionError):
+		StorageService.place_file(source, tmp_path / "dest" / "blob")
+	assert source.exists()
+
+
+def test_kernel_copy_falls_back_to_sendfile(monkeypatch, tmp_path):
+	source = tmp_path / "src"
+	data = os.urandom(100_000)
+	source.write_bytes(data)
+	destination = tmp_path / "dst"
+
+	def copy_file_range(*args):
+		raise OSError(errno.ENOSYS, "Function not implemented")
+
+	monkeypatch.setattr(os, "copy_file_range", copy_file_range, raising=False)
+
+	with open(source, "rb") as src, open(destination, "wb") as dst:
+		StorageService._kernel_copy(src.fileno(), dst.fileno(), len(data))
+
+	assert destination.read_bytes() == data
+
+
+def test_migration_statements_skip_comments():
+	sql = """
+	-- комментарий
+	ALTER TABLE users ADD COLUMN IF NOT EXISTS a TEXT;
+
+	-- ещё комментарий
+	ALTER TABLE users ADD COLUMN IF NOT EXISTS b TEXT;
+	"""
+
+	assert split_statements(sql) == [
+		"ALTER TABLE users ADD COLUMN IF NOT EXISTS a TEXT",
+		"ALTER TABLE users ADD COLUMN IF NOT EXISTS b TEXT",
+	]
@@ -0,0 +1,90 @@
+import asyncio
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.models import SourceAsset, VideoVersion, YouTubeUpload
+from app.services.upload_service import UploadService
+from tests.fakes import FakeResult, FakeSession
+
+USER_ID = uuid.uuid4()
+
+
+@pytest.fixture
+def version(tmp_path):
+	path = tmp_path / "version.mp4"
+	path.write_bytes(b"video")
+	return VideoVersion(
+		id=uuid.uuid4(), source_id=uuid.uuid4(), orientation="square",
+		storage_path_render=str(path), transform_profile={"seed": 1},
+	)
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+	"""Подменяет загрузку на YouTube списком вызовов"""
+	calls = []
+
+	async def upload_with_quota(session, user_id, upload, file_path, title):
+		calls.append(upload.id)
+		return "video123", "https://youtu.be/video123", {}
+
+	monkeypatch.setattr(UploadService, "_upload_with_quota", staticmethod(upload_with_quota))
+	return calls
+
+
+def _publish(version, status, claimed, event=None):
+	upload = YouTubeUpload(id=uuid.uuid4(), version_id=version.id, status=status, attempts=1, attempt_history=[])
+	session = FakeSession(
+		FakeResult(upload),
+		FakeResult(version),
+		FakeResult(upload.id if claimed else None),
+	)
+	session.objects[(SourceAsset, version.source_id)] = SourceAsset(
+		id=version.source_id, user_id=USER_ID, original_filename="clip.mp4"
+	)
+	result = asyncio.run(UploadService.publish_upload(session, USER_ID, upload.id, event=event))
+	return result, upload, session
+
+
+def test_claim_is_conditional_update_with_stale_takeover():
+	session = FakeSession(FakeResult(uuid.uuid4()))
+	upload = YouTubeUpload(id=uuid.uuid4(), status="deferred")
+
+	assert asyncio.run(UploadService._claim_upload(session, upload)) is True
+
+	statement = session.statements[0].compile(dialect=postgresql.dialect())
+	sql = str(statement)
+	assert sql.startswith("UPDATE youtube_uploads SET status=")
+	assert "youtube_uploads.status IN" in sql
+	assert "youtube_uploads.claimed_at <" in sql
+	assert "RETURNING youtube_uploads.id" in sql
+	params = statement.params
+	assert params["status"] == "processing"
+	assert params["claimed_at_1"] == params["claimed_at"] - timedelta(seconds=settings.UPLOAD_CLAIM_TIMEOUT)
+	assert session.commits == 1
+
+
+def test_publish_skips_upload_claimed_by_another_worker(version, uploads):
+	result, upload, _ = _publish(version, "deferred", claimed=False)
+
+	assert uploads == []
+	assert result["id"] == upload.id
+
+
+def test_claimed_manual_retry_uploads_once_and_records_event(version, uploads):
+	result, upload, _ = _publish(version, "error", claimed=True, event="manual_retry")
+
+	assert uploads == [upload.id]
+	assert result["status"] == "success"
+	events = [entry.get("event") for entry in upload.attempt_history]
+	assert events == ["manual_retry", "success"]
+
+
+def test_unclaimed_manual_retry_leaves_history_untouched(version, uploads):
+	_, upload, _ = _publish(version, "processing", claimed=False, event="manual_retry")
+
+	assert upload.attempt_history == []
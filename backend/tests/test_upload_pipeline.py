@@ -0,0 +1,141 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services.upload_service import UploadService
+from app.services.video_processor import VideoProcessor
+
+
+@pytest.fixture
+def renders_log(monkeypatch):
+	"""Подменяет рендер записью событий: ('one', ориентация) / ('batch', [ориентации])"""
+	log = []
+
+	def prepare(render, source_path, video_info, mode, content_hash, seed, encoder=None):
+		render.update({"plan": {}, "mode": mode, "cache_key": None})
+		return render
+
+	async def render_one(source_path, video_info, render):
+		log.append(("one", render["orientation"]))
+
+	async def render_batch(source_path, video_info, renders):
+		log.append(("batch", [r["orientation"] for r in renders]))
+
+	async def fetch_cached(render):
+		return False
+
+	monkeypatch.setattr(UploadService, "_prepare_render", staticmethod(prepare))
+	monkeypatch.setattr(UploadService, "_render_one", staticmethod(render_one))
+	monkeypatch.setattr(UploadService, "_render_batch", staticmethod(render_batch))
+	monkeypatch.setattr(UploadService, "_fetch_cached", staticmethod(fetch_cached))
+	monkeypatch.setattr(VideoProcessor, "should_segment", staticmethod(lambda info: False))
+	monkeypatch.setattr(settings, "RENDER_FANOUT", True)
+	return log
+
+
+def _collect(orientations, uniquify_mode="full"):
+	async def run():
+		events = []
+		async for render in UploadService._iter_renders(
+			"/src.mp4", Path("/tmp"), {"duration": 10}, orientations, "landscape", uniquify_mode
+		):
+			events.append(("yield", render["orientation"]))
+		return events
+
+	return asyncio.run(run())
+
+
+def test_pipeline_renders_first_version_alone_then_fans_out(monkeypatch, renders_log):
+	monkeypatch.setattr(settings, "UPLOAD_PIPELINE", True)
+
+	yielded = _collect(["landscape", "square", "portrait"])
+
+	assert renders_log == [("one", "landscape"), ("batch", ["square", "portrait"])]
+	assert yielded == [("yield", "landscape"), ("yield", "square"), ("yield", "portrait")]
+
+
+def test_without_pipeline_all_versions_share_one_decode(monkeypatch, renders_log):
+	monkeypatch.setattr(settings, "UPLOAD_PIPELINE", False)
+
+	_collect(["landscape", "square", "portrait"])
+
+	assert renders_log == [("batch", ["landscape", "square", "portrait"])]
+
+
+def test_fast_version_already_overlaps_fanout(monkeypatch, renders_log):
+	monkeypatch.setattr(settings, "UPLOAD_PIPELINE", True)
+
+	_collect(["landscape", "square", "portrait"], uniquify_mode="fast")
+
+	assert renders_log == [("one", "landscape"), ("batch", ["square", "portrait"])]
+
+
+def test_pipeline_stage_runs_producer_ahead_of_consumer():
+	events = []
+
+	async def source():
+		for index in range(3):
+			events.append(f"render {index}")
+			yield index
+
+	async def run():
+		async for item in UploadService._pipeline(source(), buffer_size=2):
+			events.append(f"upload {item}")
+			await asyncio.sleep(0)
+
+	asyncio.run(run())
+	# Рендер следующей версии начинается до окончания загрузки предыдущей
+	assert events.index("render 1") < events.index("upload 0")
+	assert [e for e in events if e.startswith("upload")] == ["upload 0", "upload 1", "upload 2"]
+
+
+def _collect_variants(count):
+	async def run():
+		return [
+			render["orientation"]
+			async for render in UploadService._iter_variant_renders(
+				"/src.mp4", Path("/tmp"), {"duration": 600}, "landscape", "landscape", count, seed=1
+			)
+		]
+
+	return asyncio.run(run())
+
+
+def test_variants_are_batched_by_slots(monkeypatch, renders_log):
+	monkeypatch.setattr(settings, "VARIANT_BATCH_SIZE", 2)
+
+	assert len(_collect_variants(3)) == 3
+	assert renders_log == [("batch", ["landscape", "landscape"]), ("one", "landscape")]
+
+
+def test_segmented_source_renders_variants_one_by_one(monkeypatch, renders_log):
+	monkeypatch.setattr(settings, "VARIANT_BATCH_SIZE", 2)
+	monkeypatch.setattr(VideoProcessor, "should_segment", staticmethod(lambda info: True))
+
+	_collect_variants(3)
+
+	assert renders_log == [("one", "landscape")] * 3
+
+
+def test_variants_get_distinct_titles(renders_log):
+	async def run():
+		return [
+			render
+			async for render in UploadService._iter_variant_renders(
+				"/src.mp4", Path("/tmp"), {"duration": 600}, "square", "landscape", 3, seed=1
+			)
+		]
+
+	titles = [
+		UploadService._version_title("clip.mp4", render["orientation"], {"variant": render["variant"]})
+		for render in asyncio.run(run())
+	]
+
+	assert titles == [
+		"clip.mp4 (square, вариант 1)",
+		"clip.mp4 (square, вариант 2)",
+		"clip.mp4 (square, вариант 3)",
+	]
+	assert UploadService._version_title("clip.mp4", "square", {"seed": 1}) == "clip.mp4 (square)"
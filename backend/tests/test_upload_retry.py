@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.quota_service import QuotaExhaustedError, QuotaService
+from app.services.upload_retry import UploadRetryPolicy
+from app.services.youtube_uploader import YouTubeApiError
+
+NOW = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+	"error, expected",
+	[
+		(QuotaExhaustedError(NOW), ("quota", None, None)),
+		(YouTubeApiError(403, "quotaExceeded", "quota"), ("quota", 403, "quotaExceeded")),
+		(YouTubeApiError(429, None, "slow down"), ("rate_limit", 429, None)),
+		(YouTubeApiError(403, "userRateLimitExceeded", "slow down"), ("rate_limit", 403, "userRateLimitExceeded")),
+		(YouTubeApiError(401, None, "expired"), ("auth", 401, None)),
+		(YouTubeApiError(503, None, "unavailable"), ("server", 503, None)),
+		(YouTubeApiError(400, "backendError", "retry"), ("server", 400, "backendError")),
+		(httpx.ReadTimeout("timeout"), ("network", None, None)),
+		(ConnectionResetError(), ("network", None, None)),
+		(YouTubeApiError(400, "invalidTitle", "bad title"), ("permanent", 400, "invalidTitle")),
+		(ValueError("file missing"), ("permanent", None, None)),
+	],
+)
+def test_classify(error, expected):
+	assert UploadRetryPolicy.classify(error) == expected
+
+
+def test_backoff_doubles_with_equal_jitter(monkeypatch):
+	monkeypatch.setattr(settings, "UPLOAD_AUTO_RETRY", True)
+	error = YouTubeApiError(503, None, "unavailable")
+
+	for failures, delay in ((1, 30), (2, 60), (3, 120), (6, 960)):
+		retry_at = UploadRetryPolicy.next_retry_at(error, "server", failures, NOW)
+		assert NOW + timedelta(seconds=delay / 2) <= retry_at <= NOW + timedelta(seconds=delay)
+
+	assert UploadRetryPolicy.next_retry_at(error, "server", 7, NOW) is None
+
+
+def test_backoff_is_capped_and_overridable(monkeypatch):
+	monkeypatch.setattr(settings, "UPLOAD_AUTO_RETRY", True)
+	monkeypatch.setattr(settings, "UPLOAD_RETRY_POLICIES", {"network": {"max_attempts": 20}})
+
+	retry_at = UploadRetryPolicy.next_retry_at(ConnectionResetError(), "network", 15, NOW)
+
+	assert NOW + timedelta(seconds=450) <= retry_at <= NOW + timedelta(seconds=900)
+
+
+def test_quota_waits_for_reset_without_attempt_limit(monkeypatch):
+	monkeypatch.setattr(settings, "UPLOAD_AUTO_RETRY", True)
+	retry_at = NOW + timedelta(hours=2)
+
+	assert UploadRetryPolicy.next_retry_at(QuotaExhaustedError(retry_at), "quota", 100, NOW) == retry_at
+	assert UploadRetryPolicy.next_retry_at(
+		YouTubeApiError(403, "quotaExceeded", "quota"), "quota", 100, NOW
+	) == QuotaService.next_reset(NOW)
+
+
+def test_permanent_errors_and_disabled_retry_are_not_repeated(monkeypatch):
+	monkeypatch.setattr(settings, "UPLOAD_AUTO_RETRY", True)
+	assert UploadRetryPolicy.next_retry_at(ValueError(), "permanent", 1, NOW) is None
+
+	monkeypatch.setattr(settings, "UPLOAD_AUTO_RETRY", False)
+	assert UploadRetryPolicy.next_retry_at(ConnectionResetError(), "network", 1, NOW) is None
+
+
+def test_failures_are_counted_since_manual_retry_or_success():
+	history = [
+		{"error_class": "server"},
+		{"event": "manual_retry"},
+		{"error_class": "server"},
+		{"error_class": "network"},
+		{"error_class": "server"},
+	]
+
+	assert UploadRetryPolicy.count_failures(history, "server") == 2
+	assert UploadRetryPolicy.count_failures(history, "network") == 1
+	assert UploadRetryPolicy.count_failures([*history, {"event": "success"}], "server") == 0
+
+
+def test_history_keeps_last_entries():
+	history = [{"attempt": index} for index in range(UploadRetryPolicy.HISTORY_LIMIT)]
+
+	updated = UploadRetryPolicy.append_history(history, {"attempt": "new"})
+
+	assert len(updated) == UploadRetryPolicy.HISTORY_LIMIT
+	assert updated[0] == {"attempt": 1}
+	assert updated[-1] == {"attempt": "new"}
+	assert len(history) == UploadRetryPolicy.HISTORY_LIMIT
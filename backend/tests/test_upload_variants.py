@@ -0,0 +1,117 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.models import SourceAsset
+from app.services.encoder_profiles import EncoderProfileService
+from app.services.probe_cache import ProbeCacheService
+from app.services.quota_service import QuotaService
+from app.services.upload_service import UploadService
+from tests.fakes import FakeResult, FakeSession
+
+
+def _where(statement) -> str:
+	return str(statement.whereclause)
+
+
+def test_pending_uploads_count_as_uploaded_orientations():
+	session = FakeSession(FakeResult(rows=["portrait", "square"]))
+
+	orientations = asyncio.run(UploadService._get_uploaded_orientations(session, uuid.uuid4()))
+
+	assert orientations == {"portrait", "square"}
+	assert "youtube_uploads.status != " in _where(session.statements[0])
+
+
+def test_published_variant_seeds_come_from_variant_profiles():
+	session = FakeSession(FakeResult(rows=[
+		{"seed": 11, "variant": 1},
+		{"seed": 13, "variant": 3},
+		# Обычная версия ориентации, не вариант
+		{"seed": 99},
+		None,
+	]))
+
+	seeds = asyncio.run(UploadService._get_published_variant_seeds(session, uuid.uuid4(), "portrait"))
+
+	assert seeds == {11, 13}
+	where = _where(session.statements[0])
+	assert "youtube_uploads.status != " in where
+	assert "video_versions.orientation = " in where
+
+
+@pytest.fixture
+def variants_job(monkeypatch, tmp_path):
+	"""process_variants без квоты, рендера и загрузки; возвращает (запуск, опубликованные)"""
+	published = []
+
+	async def nothing(*args, **kwargs):
+		return None
+
+	async def video_info(session, path, content_hash):
+		return {"duration": 10.0, "width": 1080, "height": 1920, "fps": 30.0}
+
+	def prepare(render, source_path, info, mode, content_hash, seed, encoder=None):
+		render.update({"plan": {"seed": seed}, "cache_key": None})
+		return render
+
+	async def render_one(source_path, info, render):
+		render["info"] = info
+		render["transform_profile"] = render["plan"]
+
+	async def publish(session, user_id, source_id, original_filename, render):
+		published.append((render["variant"], render["transform_profile"]["seed"]))
+		return {"version_id": render["version_id"]}
+
+	monkeypatch.setattr(QuotaService, "ensure_available", staticmethod(nothing))
+	monkeypatch.setattr(EncoderProfileService, "resolve_for_user", staticmethod(nothing))
+	monkeypatch.setattr(ProbeCacheService, "get_video_info", staticmethod(video_info))
+	monkeypatch.setattr(UploadService, "_prepare_render", staticmethod(prepare))
+	monkeypatch.setattr(UploadService, "_render_one", staticmethod(render_one))
+	monkeypatch.setattr(UploadService, "_publish_version", staticmethod(publish))
+	monkeypatch.setattr(UploadService, "_new_render", staticmethod(
+		lambda versions_dir, orientation, original: {
+			"version_id": uuid.uuid4(),
+			"orientation": orientation,
+			"render_orientation": None,
+			"output_path": str(versions_dir / "v.mp4"),
+		}
+	))
+	monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+	monkeypatch.setattr(settings, "UPLOAD_PIPELINE", False)
+	monkeypatch.setattr(settings, "VARIANT_BATCH_SIZE", 1)
+
+	source_path = tmp_path / "source.mp4"
+	source_path.write_bytes(b"video")
+	user_id = uuid.uuid4()
+	source = SourceAsset(
+		id=uuid.uuid4(), user_id=user_id, storage_path=str(source_path),
+		original_filename="clip.mp4", content_hash="abc",
+	)
+
+	def run(session, count, seed):
+		session.objects[(SourceAsset, source.id)] = source
+		return asyncio.run(UploadService.process_variants(session, user_id, source.id, count, seed=seed))
+
+	return run, published
+
+
+def test_reclaimed_variants_job_skips_published_variants(variants_job):
+	run, published = variants_job
+	# Прошлая попытка успела поставить в загрузку варианты 1 и 2
+	session = FakeSession(FakeResult(rows=[{"seed": 100, "variant": 1}, {"seed": 101, "variant": 2}]))
+
+	result = run(session, 4, seed=100)
+
+	assert published == [(3, 102), (4, 103)]
+	assert len(result["versions"]) == 2
+
+
+def test_new_variants_job_renders_all_variants(variants_job):
+	run, published = variants_job
+
+	run(FakeSession(FakeResult(rows=[])), 3, seed=7)
+
+	assert published == [(1, 7), (2, 8), (3, 9)]
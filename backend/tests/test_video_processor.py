@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from app.services.encode_scheduler import encode_scheduler
+from app.services.ffmpeg_runner import FFmpegRunner
+from app.services.video_processor import VideoProcessor
+
+INFO = {"duration": 100.0, "width": 1920, "height": 1080, "fps": 30.0, "size": 10_000_000, "has_audio": False}
+
+
+@pytest.fixture
+def ffmpeg_calls(monkeypatch):
+	"""Подменяет ffmpeg записью аргументов"""
+	calls = []
+
+	async def ffmpeg(args, timeout=None):
+		calls.append(args)
+
+	async def probe_keyframes(path):
+		return [float(second) for second in range(0, 100, 10)]
+
+	async def scrub_metadata(path):
+		return {}
+
+	monkeypatch.setattr(FFmpegRunner, "ffmpeg", staticmethod(ffmpeg))
+	monkeypatch.setattr(FFmpegRunner, "probe_keyframes", staticmethod(probe_keyframes))
+	monkeypatch.setattr(VideoProcessor, "scrub_metadata", staticmethod(scrub_metadata))
+	monkeypatch.setattr(VideoProcessor, "_check_output_size", staticmethod(lambda path, plan: None))
+	monkeypatch.setattr(encode_scheduler, "total_slots", 2)
+	return calls
+
+
+def _render_segmented(tmp_path, contact_sheet_path):
+	plan = VideoProcessor.plan_uniquify("/src.mp4", INFO, seed=1)
+	return asyncio.run(VideoProcessor.render_segmented(
+		"/src.mp4", str(tmp_path / "out.mp4"), INFO, transform_profile=plan,
+		contact_sheet_path=contact_sheet_path,
+	))
+
+
+def test_segmented_render_builds_contact_sheet_after_concat(tmp_path, ffmpeg_calls):
+	sheet = str(tmp_path / "sheet.jpg")
+
+	_render_segmented(tmp_path, sheet)
+
+	*encodes, concat, contact_sheet = ffmpeg_calls
+	assert len(encodes) == 2
+	assert "concat" in concat
+	# Лист строится по ключевым кадрам склеенного результата
+	assert contact_sheet[:4] == ["-skip_frame", "nokey", "-i", str(tmp_path / "out.mp4")]
+	assert contact_sheet[-1] == sheet
+	assert "tile=" in contact_sheet[contact_sheet.index("-vf") + 1]
+
+
+def test_segmented_render_without_contact_sheet(tmp_path, ffmpeg_calls):
+	_render_segmented(tmp_path, None)
+
+	assert "concat" in ffmpeg_calls[-1]
+
+
+def test_contact_sheet_failure_does_not_fail_render(monkeypatch, tmp_path):
+	async def ffmpeg(args, timeout=None):
+		raise RuntimeError("boom")
+
+	monkeypatch.setattr(FFmpegRunner, "ffmpeg", staticmethod(ffmpeg))
+
+	asyncio.run(VideoProcessor.render_contact_sheet("/out.mp4", str(tmp_path / "sheet.jpg"), 10.0))
+
+
+def _plan(audio_bitrate, encoder_audio_bitrate, has_audio=True):
+	info = {**INFO, "has_audio": has_audio, "audio_bitrate": audio_bitrate, "video_bitrate": 700_000}
+	encoder = {"name": "test", "preset": "medium", "audio_codec": "aac", "audio_bitrate": encoder_audio_bitrate}
+	return VideoProcessor.plan_uniquify("/src.mp4", info, seed=7, encoder=encoder)
+
+
+def test_plan_uses_profile_audio_bitrate():
+	low, high = _plan(192_000, 96_000), _plan(192_000, 192_000)
+
+	assert 0.99 * 96_000 <= low["audio_bitrate"] <= 1.01 * 96_000
+	# Сэкономленные на аудио биты уходят в видео, целевой размер тот же
+	assert low["target_size"] == high["target_size"]
+	assert low["bitrate"] > high["bitrate"]
+	assert VideoProcessor._build_audio_codec_args({"profile": low}) == ["-c:a", "aac", "-b:a", str(low["audio_bitrate"])]
+
+
+def test_plan_never_raises_audio_bitrate_above_source():
+	plan = _plan(64_000, 192_000)
+
+	assert plan["audio_bitrate"] <= 1.01 * 64_000
+
+
+def test_plan_without_audio_has_no_audio_bitrate():
+	assert _plan(None, 128_000, has_audio=False)["audio_bitrate"] is None
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_plan_always_shortens_and_records_actual_change(seed):
+	plan = VideoProcessor.plan_uniquify("/src.mp4", INFO, seed=seed)
+
+	low, high = VideoProcessor.DURATION_CHANGE_RANGE
+	assert low <= plan["duration_change"] <= high
+	assert plan["duration"] == pytest.approx(INFO["duration"] + plan["duration_change"])
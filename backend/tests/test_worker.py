@@ -0,0 +1,94 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app import worker
+from app.core.config import settings
+from app.models import ProcessingJob, SourceAsset
+from app.services.storage_service import StorageService
+from tests.fakes import FakeSession
+
+
+@pytest.fixture
+def released(monkeypatch):
+	"""Хеши исходников, ссылки на которые сняты"""
+	hashes = []
+
+	async def release_blob(session, content_hash):
+		hashes.append(content_hash)
+
+	monkeypatch.setattr(StorageService, "release_blob", staticmethod(release_blob))
+	return hashes
+
+
+@pytest.fixture
+def session(monkeypatch):
+	"""Сессия, которую воркер получает из AsyncSessionLocal"""
+	fake = FakeSession()
+	monkeypatch.setattr(worker, "AsyncSessionLocal", lambda: fake)
+	return fake
+
+
+def _run(job: ProcessingJob, session: FakeSession) -> None:
+	session.objects[(ProcessingJob, job.id)] = job
+	asyncio.run(worker._execute(job.id))
+
+
+def _upload_job(**values) -> ProcessingJob:
+	payload = {"source_id": str(uuid.uuid4()), "path": "/storage/sources/ab/cd/abcd", "content_hash": "abcd"}
+	return ProcessingJob(
+		id=uuid.uuid4(), user_id=uuid.uuid4(), kind="upload", payload=payload, status="processing", **values
+	)
+
+
+def test_exhausted_attempts_release_unregistered_source(released, session):
+	job = _upload_job(attempts=settings.JOB_MAX_ATTEMPTS + 1)
+
+	_run(job, session)
+
+	assert job.status == "error"
+	assert released == ["abcd"]
+	assert job.payload["source_released"] is True
+
+
+def test_unknown_kind_releases_source(released, session):
+	job = _upload_job(attempts=1)
+	job.kind = "legacy"
+
+	_run(job, session)
+
+	assert job.status == "error"
+	assert "Неизвестный тип задачи" in job.error_text
+	assert released == ["abcd"]
+
+
+def test_registered_source_is_not_released(released, session):
+	job = _upload_job(attempts=settings.JOB_MAX_ATTEMPTS + 1)
+	source_id = uuid.UUID(job.payload["source_id"])
+	session.objects[(SourceAsset, source_id)] = SourceAsset(id=source_id)
+
+	_run(job, session)
+
+	assert job.status == "error"
+	assert released == []
+
+
+def test_source_is_released_only_once(released, session):
+	job = _upload_job(attempts=settings.JOB_MAX_ATTEMPTS + 1)
+	job.payload = {**job.payload, "source_released": True}
+
+	_run(job, session)
+
+	assert released == []
+
+
+def test_source_without_hash_is_removed(tmp_path, session):
+	path = tmp_path / "source.mp4"
+	path.write_bytes(b"video")
+	job = _upload_job(attempts=settings.JOB_MAX_ATTEMPTS + 1)
+	job.payload = {"source_id": job.payload["source_id"], "path": str(path)}
+
+	_run(job, session)
+
+	assert not path.exists()
@@ -0,0 +1,202 @@
+import asyncio
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.config import settings
+from app.services.youtube_uploader import YouTubeApiError, YouTubeResumableUploader
+
+CHUNK = YouTubeResumableUploader.CHUNK_ALIGNMENT
+
+
+class StubUploadServer(ThreadingHTTPServer):
+	"""Минимальный сервер resumable upload: сессии, 308 + Range, сбои по запросу"""
+
+	def __init__(self):
+		super().__init__(("127.0.0.1", 0), StubUploadHandler)
+		self.sessions = {}  # путь сессии -> принятые байты
+		self.opened = 0
+		self.drop_puts = set()  # номера PUT с данными, после которых рвётся соединение
+		self.puts = 0
+		self.reject_sessions = None  # ответ на открытие сессии (статус, тело) вместо сессии
+		self.thumbnails = []  # (запрос, Content-Type, тело) загруженных превью
+
+	@property
+	def url(self) -> str:
+		return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubUploadHandler(BaseHTTPRequestHandler):
+	def log_message(self, *args):
+		pass
+
+	def do_POST(self):
+		server = self.server
+		body = self.rfile.read(int(self.headers["Content-Length"]))
+		if self.path.startswith("/thumbnails"):
+			server.thumbnails.append((self.path, self.headers["Content-Type"], body))
+			if self.headers["Authorization"] != "Bearer token":
+				return self._reply(401, {"error": {"message": "bad token", "errors": [{"reason": "authError"}]}})
+			return self._reply(200, {"items": []})
+		if server.reject_sessions:
+			return self._reply(*server.reject_sessions)
+		server.opened += 1
+		path = f"/session/{server.opened}"
+		server.sessions[path] = bytearray()
+		self.send_response(200)
+		self.send_header("Location", server.url + path)
+		self.send_header("Content-Length", "0")
+		self.end_headers()
+
+	def do_PUT(self):
+		server = self.server
+		body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+		received = server.sessions.get(self.path)
+		if received is None:
+			return self._reply(404, {"error": {"message": "session expired"}})
+
+		match = re.match(r"bytes (\d+)-\d+/(\d+)", self.headers["Content-Range"])
+		total = int(self.headers["Content-Range"].rsplit("/", 1)[1])
+		if match:
+			server.puts += 1
+			if int(match.group(1)) == len(received):
+				received.extend(body)
+			if server.puts in server.drop_puts:
+				# Данные приняты, но ответ до клиента не дошёл
+				self.close_connection = True
+				self.connection.shutdown(2)
+				return
+		if len(received) >= total:
+			return self._reply(200, {"id": "video123", "size": len(received)})
+		self.send_response(308)
+		if received:
+			self.send_header("Range", f"bytes=0-{len(received) - 1}")
+		self.send_header("Content-Length", "0")
+		self.end_headers()
+
+	def _reply(self, status, payload):
+		data = json.dumps(payload).encode()
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		self.wfile.write(data)
+
+
+@pytest.fixture
+def server(monkeypatch):
+	server = StubUploadServer()
+	thread = threading.Thread(target=server.serve_forever, daemon=True)
+	thread.start()
+	monkeypatch.setattr(settings, "YOUTUBE_UPLOAD_URL", server.url + "/upload")
+	monkeypatch.setattr(settings, "YOUTUBE_THUMBNAIL_URL", server.url + "/thumbnails/set")
+	monkeypatch.setattr(settings, "YOUTUBE_UPLOAD_CHUNK_SIZE", CHUNK)
+	yield server
+	server.shutdown()
+	server.server_close()
+
+
+@pytest.fixture
+def video(tmp_path):
+	path = tmp_path / "video.mp4"
+	path.write_bytes(bytes(range(256)) * (CHUNK * 3 // 256 + 100))
+	return path
+
+
+def _upload(video, session_uri=None):
+	progress = []
+
+	async def on_progress(uri, offset):
+		progress.append((uri, offset))
+
+	async def run():
+		return await YouTubeResumableUploader.upload(
+			str(video), {"snippet": {"title": "t"}}, "token", session_uri, on_progress
+		)
+
+	try:
+		return asyncio.run(run()), progress
+	except Exception as e:
+		e.progress = progress
+		raise
+
+
+def test_upload_sends_chunks_and_reports_offsets(server, video):
+	result, progress = _upload(video)
+
+	assert result["id"] == "video123"
+	assert bytes(server.sessions["/session/1"]) == video.read_bytes()
+	session_uri = server.url + "/session/1"
+	assert progress == [(session_uri, 0), (session_uri, CHUNK), (session_uri, 2 * CHUNK), (session_uri, 3 * CHUNK)]
+
+
+def test_broken_connection_resumes_from_persisted_session(server, video):
+	server.drop_puts = {2}
+
+	with pytest.raises(Exception) as failure:
+		_upload(video)
+	# Последнее сохранённое смещение — после первой части
+	session_uri, offset = failure.value.progress[-1]
+	assert offset == CHUNK
+
+	result, progress = _upload(video, session_uri)
+
+	assert result["id"] == "video123"
+	assert server.opened == 1
+	# Сервер успел принять вторую часть — продолжаем с подтверждённого им байта
+	assert progress[0] == (session_uri, 2 * CHUNK)
+	assert bytes(server.sessions["/session/1"]) == video.read_bytes()
+
+
+def test_finished_session_returns_video_without_upload(server, video):
+	_, progress = _upload(video)
+	puts = server.puts
+
+	result, _ = _upload(video, progress[-1][0])
+
+	assert result["id"] == "video123"
+	assert server.puts == puts
+
+
+def test_expired_session_is_reopened(server, video):
+	result, progress = _upload(video, server.url + "/session/expired")
+
+	assert result["id"] == "video123"
+	assert server.opened == 1
+	assert progress[0] == (server.url + "/session/1", 0)
+
+
+def test_api_error_is_raised_with_reason(server, video):
+	server.reject_sessions = (403, {"error": {"message": "quota", "errors": [{"reason": "quotaExceeded"}]}})
+
+	with pytest.raises(YouTubeApiError) as failure:
+		_upload(video)
+
+	assert failure.value.status == 403
+	assert failure.value.reason == "quotaExceeded"
+
+
+def test_thumbnail_is_posted_as_media(server, tmp_path):
+	image = tmp_path / "thumb.jpg"
+	image.write_bytes(b"\xff\xd8jpeg")
+
+	asyncio.run(YouTubeResumableUploader.set_thumbnail("video123", str(image), "token"))
+
+	path, content_type, body = server.thumbnails[0]
+	assert path == "/thumbnails/set?videoId=video123&uploadType=media"
+	assert content_type == "image/jpeg"
+	assert body == b"\xff\xd8jpeg"
+
+
+def test_thumbnail_error_is_raised_with_reason(server, tmp_path):
+	image = tmp_path / "thumb.jpg"
+	image.write_bytes(b"jpeg")
+
+	with pytest.raises(YouTubeApiError) as failure:
+		asyncio.run(YouTubeResumableUploader.set_thumbnail("video123", str(image), "expired"))
+
+	assert failure.value.status == 401
+	assert failure.value.reason == "authError"
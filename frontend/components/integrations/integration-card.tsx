@@ -260,7 +260,7 @@ export function IntegrationCard({ kind, integration, onUpdate }: IntegrationCard
 		setIsDisconnecting(true)
 		setError(null)
 		try {
-			await disconnectIntegration(kind)
+			await disconnectIntegration(kind, integration?.id)
 			onUpdate()
 		} catch (err) {
 			setError(err instanceof Error ? err.message : 'Ошибка отключения')
@@ -273,7 +273,7 @@ export function IntegrationCard({ kind, integration, onUpdate }: IntegrationCard
 		setIsTesting(true)
 		setError(null)
 		try {
-			const result = await testIntegration(kind)
+			const result = await testIntegration(kind, integration?.id)
 			if (result.status === 'ok') {
 				alert(`✅ ${result.message || 'Подключение успешно'}`)
 			} else {
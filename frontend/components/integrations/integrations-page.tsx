@@ -18,6 +18,8 @@ export function IntegrationsPage() {
 	}
 
 	const integrations = data?.integrations || []
+	// Каналов YouTube может быть несколько — по карточке на канал
+	const youtubeIntegrations = integrations.filter((i) => i.kind === 'youtube')
 
 	return (
 		<div className="min-h-screen bg-white">
@@ -48,11 +50,14 @@ export function IntegrationsPage() {
 
 				{!isLoading && !error && (
 					<div className="grid grid-cols-1 md:grid-cols-2 gap-6">
-						<IntegrationCard
-							kind="youtube"
-							integration={integrations.find((i) => i.kind === 'youtube')}
-							onUpdate={handleRefresh}
-						/>
+						{(youtubeIntegrations.length ? youtubeIntegrations : [undefined]).map((integration) => (
+							<IntegrationCard
+								key={integration?.id ?? 'youtube'}
+								kind="youtube"
+								integration={integration}
+								onUpdate={handleRefresh}
+							/>
+						))}
 						<IntegrationCard
 							kind="gdrive"
 							integration={integrations.find((i) => i.kind === 'gdrive')}
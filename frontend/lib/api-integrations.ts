@@ -58,6 +58,12 @@ export interface OAuthConfigResponse {
 	login_customer_id?: string | null
 }
 
+// URL интеграции вида или конкретной записи (например, одного из каналов YouTube)
+function integrationUrl(kind: string, integrationId?: string): string {
+	const base = `${API_BASE_URL}/api/v1/integrations/${kind}`
+	return integrationId ? `${base}/${integrationId}` : base
+}
+
 export async function getIntegrations(): Promise<IntegrationListResponse> {
 	const response = await fetch(`${API_BASE_URL}/api/v1/integrations/`)
 	
@@ -68,8 +74,8 @@ export async function getIntegrations(): Promise<IntegrationListResponse> {
 	return response.json()
 }
 
-export async function getIntegration(kind: string): Promise<IntegrationResponse> {
-	const response = await fetch(`${API_BASE_URL}/api/v1/integrations/${kind}`)
+export async function getIntegration(kind: string, integrationId?: string): Promise<IntegrationResponse> {
+	const response = await fetch(integrationUrl(kind, integrationId))
 	
 	if (!response.ok) {
 		if (response.status === 404) {
@@ -109,8 +115,11 @@ export async function connectTelegram(botToken: string): Promise<IntegrationConn
 	return response.json()
 }
 
-export async function disconnectIntegration(kind: string): Promise<IntegrationDisconnectResponse> {
-	const response = await fetch(`${API_BASE_URL}/api/v1/integrations/${kind}`, {
+export async function disconnectIntegration(
+	kind: string,
+	integrationId?: string
+): Promise<IntegrationDisconnectResponse> {
+	const response = await fetch(integrationUrl(kind, integrationId), {
 		method: 'DELETE',
 	})
 	
@@ -122,8 +131,8 @@ export async function disconnectIntegration(kind: string): Promise<IntegrationDi
 	return response.json()
 }
 
-export async function testIntegration(kind: string): Promise<IntegrationTestResponse> {
-	const response = await fetch(`${API_BASE_URL}/api/v1/integrations/${kind}/test`, {
+export async function testIntegration(kind: string, integrationId?: string): Promise<IntegrationTestResponse> {
+	const response = await fetch(`${integrationUrl(kind, integrationId)}/test`, {
 		method: 'POST',
 	})
 	
@@ -17,6 +17,39 @@ export interface UploadResponse {
 	versions: UploadVersionResponse[]
 }
 
+export interface UploadSourceResult {
+	source_id: string | null
+	original_filename: string
+	status: string
+	error_text: string | null
+	versions: UploadVersionResponse[]
+}
+
+export interface PublishJobResult {
+	id: string
+	status: string
+	youtube_url: string | null
+	error_text: string | null
+	retry_at: string | null
+}
+
+export interface UploadJobResponse {
+	id: string | null
+	kind: string
+	status: string
+	original_filename: string | null
+	error_text: string | null
+	attempts: number
+	result: UploadSourceResult | PublishJobResult | null
+	created_at: string | null
+	started_at: string | null
+	finished_at: string | null
+}
+
+export interface UploadJobsResponse {
+	items: UploadJobResponse[]
+}
+
 export interface UploadItemResponse {
 	id: string
 	source_id: string
@@ -28,6 +61,7 @@ export interface UploadItemResponse {
 	youtube_url: string | null
 	status: string
 	error_text: string | null
+	attempts: number
 	uploaded_at: string | null
 	created_at: string
 }
@@ -37,6 +71,29 @@ export interface UploadListResponse {
 	total: number
 }
 
+export interface YouTubeQuotaChannel {
+	integration_id: string
+	account_name: string | null
+	capacity: number
+	remaining: number
+	used_today: number
+	uploads_available: number
+	blocked_until: string | null
+	next_upload_at: string
+	projected_exhaustion_at: string | null
+}
+
+export interface YouTubeQuotaResponse {
+	upload_cost: number
+	channels: YouTubeQuotaChannel[]
+	remaining: number
+	uploads_available: number
+	pending_uploads: number
+	next_upload_at: string | null
+	projected_exhaustion_at: string | null
+	resets_at: string
+}
+
 export interface UploadRequest {
 	generate_orientations: boolean
 	orientations: string[]
@@ -46,7 +103,7 @@ export async function uploadVideo(
 	files: File[],
 	generateOrientations: boolean = false,
 	orientations: string[] = []
-): Promise<UploadResponse> {
+): Promise<UploadJobsResponse> {
 	const formData = new FormData()
 	files.forEach((file) => {
 		formData.append('files', file)
@@ -75,6 +132,39 @@ export async function uploadVideo(
 	return response.json()
 }
 
+export async function getUploadJob(jobId: string): Promise<UploadJobResponse> {
+	const response = await fetch(`${API_BASE_URL}/api/v1/uploads/jobs/${jobId}`)
+
+	if (!response.ok) {
+		throw new Error('Ошибка получения статуса задачи')
+	}
+
+	return response.json()
+}
+
+export async function createVariants(
+	sourceId: string,
+	count: number,
+	orientation?: string
+): Promise<UploadJobResponse> {
+	const params = new URLSearchParams({ count: String(count) })
+	if (orientation) {
+		params.append('orientation', orientation)
+	}
+
+	const response = await fetch(
+		`${API_BASE_URL}/api/v1/uploads/sources/${sourceId}/variants?${params.toString()}`,
+		{ method: 'POST' }
+	)
+
+	if (!response.ok) {
+		const error = await response.json()
+		throw new Error(error.detail || 'Ошибка создания вариантов')
+	}
+
+	return response.json()
+}
+
 export async function getUploads(skip: number = 0, limit: number = 50): Promise<UploadListResponse> {
 	const response = await fetch(
 		`${API_BASE_URL}/api/v1/uploads/?skip=${skip}&limit=${limit}`
@@ -87,7 +177,19 @@ export async function getUploads(skip: number = 0, limit: number = 50): Promise<
 	return response.json()
 }
 
-export async function retryUpload(uploadId: string): Promise<{ status: string; youtube_url: string }> {
+export async function getYouTubeQuota(): Promise<YouTubeQuotaResponse> {
+	const response = await fetch(`${API_BASE_URL}/api/v1/uploads/quota`)
+
+	if (!response.ok) {
+		throw new Error('Ошибка получения квоты YouTube')
+	}
+
+	return response.json()
+}
+
+export async function retryUpload(
+	uploadId: string
+): Promise<{ status: string; youtube_url?: string; retry_at?: string }> {
 	const response = await fetch(`${API_BASE_URL}/api/v1/uploads/${uploadId}/retry`, {
 		method: 'POST',
 	})